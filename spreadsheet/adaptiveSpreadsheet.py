@@ -0,0 +1,245 @@
+from array import array
+
+from spreadsheet.cell import Cell
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+from spreadsheet.arraySpreadsheet import ArraySpreadsheet
+from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+from spreadsheet.sparseLinkedlistSpreadsheet import SparseLinkedListSpreadsheet
+from spreadsheet.loader import cellsToColumns
+
+
+# ------------------------------------------------------------------------
+# Spreadsheet that picks its own backend.
+#
+# It delegates to an array, CSR or sparse linked-list spreadsheet. Every
+# decision window it compares a cost estimate for the operations it saw
+# in that window under each layout, using the current density
+# (nnz / area). When another layout would be clearly cheaper, it moves
+# the data there with a bulk entriesArrays() -> buildFromArrays()
+# conversion.
+#
+# Inserts follow ArraySpreadsheet: insertRow(i) puts the new row at
+# index i, for 0 <= i <= rowNum().  Backends that insert after the
+# given index are called with i - 1.
+# ------------------------------------------------------------------------
+
+BACKENDS = {
+    'array': ArraySpreadsheet,
+    'csr': CSRSpreadsheet,
+    'sparselinkedlist': SparseLinkedListSpreadsheet,
+}
+
+# Backends whose insertRow(i)/insertCol(i) insert after index i
+INSERTS_AFTER = {'csr', 'sparselinkedlist'}
+
+# Below this density the dense array backend is not considered, as its memory grows with area
+MIN_ARRAY_DENSITY = 0.05
+
+# Operations between decisions, at least this many and at least nnz / 8 so the checks stay amortised
+MIN_WINDOW = 1000
+
+# A migration must save this multiple of its own cost (one pass over the cells) to happen
+MIGRATION_FACTOR = 4
+
+
+def estimateCost(approach: str, numRows: int, numColumns: int, nnz: int, mix: dict) -> float:
+    """
+    Rough cost, in elementary steps, of running the operation mix on one backend.
+
+    @param mix Counts of 'update', 'insertRow', 'insertCol' and 'scan' (find/entries) operations.
+    """
+
+    if approach == 'array':
+        # Index maps make updates and inserts O(1); scans visit every position
+        perOp = {'update': 1, 'insertRow': 1, 'insertCol': 1, 'scan': numRows * numColumns}
+    elif approach == 'csr':
+        # Updates may shift the packed arrays (cheap memmove); row pointers catch up once per scan
+        perOp = {'update': nnz / 64, 'insertRow': numRows / 64, 'insertCol': nnz, 'scan': nnz + numRows / 64}
+    else:
+        # Positional walks along the header lists
+        perOp = {'update': (numRows + numColumns) / 2, 'insertRow': numRows / 2, 'insertCol': numColumns / 2,
+                 'scan': nnz + numRows + numColumns}
+
+    return sum(count * perOp[op] for op, count in mix.items())
+
+
+class AdaptiveSpreadsheet(BaseSpreadsheet):
+
+    def __init__(self):
+        self.approach: str = 'csr'
+        self.spreadsheet: BaseSpreadsheet = CSRSpreadsheet()
+
+        self.mix = {'update': 0, 'insertRow': 0, 'insertCol': 0, 'scan': 0}
+        self.operations = 0
+        self.window = MIN_WINDOW
+        self.migrations = 0
+
+        # Indexes registered on this sheet, re-attached to each new backend
+        self.addedIndexes = []
+        self.valueIndexEnabled = False
+
+
+    def buildSpreadsheet(self, lCells: [Cell]):
+        self.buildFromArrays(*cellsToColumns(lCells))
+
+
+    def buildFromArrays(self, rows: array, cols: array, vals: array):
+        numRows = max(rows) + 1
+        numColumns = max(cols) + 1
+        density = len(rows) / (numRows * numColumns)
+
+        # With no operations seen yet, pick on density alone
+        self._switchTo('array' if density >= MIN_ARRAY_DENSITY * 4 else 'csr')
+        self.spreadsheet.buildFromArrays(rows, cols, vals)
+        self._resetWindow(len(rows))
+
+
+    def appendRow(self) -> bool:
+        return self.spreadsheet.appendRow()
+
+
+    def appendCol(self) -> bool:
+        return self.spreadsheet.appendCol()
+
+
+    def appendRows(self, count: int) -> bool:
+        return self.spreadsheet.appendRows(count)
+
+
+    def appendCols(self, count: int) -> bool:
+        return self.spreadsheet.appendCols(count)
+
+
+    def insertRow(self, rowIndex: int) -> bool:
+        return self.insertRows(rowIndex, 1)
+
+
+    def insertCol(self, colIndex: int) -> bool:
+        return self.insertCols(colIndex, 1)
+
+
+    def insertRows(self, rowIndex: int, count: int) -> bool:
+        if rowIndex < 0 or rowIndex > self.rowNum():
+            return False
+
+        self._record('insertRow', count)
+        if self.approach in INSERTS_AFTER:
+            rowIndex -= 1
+        return self.spreadsheet.insertRows(rowIndex, count)
+
+
+    def insertCols(self, colIndex: int, count: int) -> bool:
+        if colIndex < 0 or colIndex > self.colNum():
+            return False
+
+        self._record('insertCol', count)
+        if self.approach in INSERTS_AFTER:
+            colIndex -= 1
+        return self.spreadsheet.insertCols(colIndex, count)
+
+
+    def update(self, rowIndex: int, colIndex: int, value: float) -> bool:
+        self._record('update', 1)
+        return self.spreadsheet.update(rowIndex, colIndex, value)
+
+
+    def updateMany(self, updates: [(int, int, float)]) -> [bool]:
+        self._record('update', len(updates))
+        return self.spreadsheet.updateMany(updates)
+
+
+    def rowNum(self) -> int:
+        return self.spreadsheet.rowNum()
+
+
+    def colNum(self) -> int:
+        return self.spreadsheet.colNum()
+
+
+    def find(self, value: float) -> [(int, int)]:
+        self._record('scan', 1)
+        return self.spreadsheet.find(value)
+
+
+    def entries(self) -> [Cell]:
+        self._record('scan', 1)
+        return self.spreadsheet.entries()
+
+
+    def entriesArrays(self) -> (array, array, array):
+        self._record('scan', 1)
+        return self.spreadsheet.entriesArrays()
+
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]:
+        return self.spreadsheet.getRange(r0, c0, r1, c1)
+
+
+    def csrArrays(self) -> (array, array, array):
+        return self.spreadsheet.csrArrays()
+
+
+    def addIndex(self, index) -> None:
+        self.addedIndexes.append(index)
+        self.spreadsheet.addIndex(index)
+
+
+    def enableValueIndex(self) -> None:
+        self.valueIndexEnabled = True
+        self.spreadsheet.enableValueIndex()
+
+
+    def _record(self, op: str, count: int) -> None:
+        self.mix[op] += count
+        self.operations += count
+        if self.operations >= self.window:
+            self._decide()
+
+
+    def _decide(self) -> None:
+        """
+        End of a decision window: move to the cheapest layout for the observed mix if it is worth the conversion.
+        """
+
+        rows, cols, vals = self.spreadsheet.entriesArrays()
+        nnz = len(rows)
+        numRows = self.rowNum()
+        numColumns = self.colNum()
+
+        candidates = [approach for approach in BACKENDS
+                      if approach != 'array' or nnz >= MIN_ARRAY_DENSITY * numRows * numColumns]
+        costs = {approach: estimateCost(approach, numRows, numColumns, nnz, self.mix) for approach in candidates}
+        best = min(costs, key = costs.get)
+
+        current = costs.get(self.approach, float('inf'))
+        if best != self.approach and nnz > 0 and current - costs[best] > MIGRATION_FACTOR * (nnz + numRows):
+            self._switchTo(best)
+            self.spreadsheet.buildFromArrays(rows, cols, vals)
+
+            # Trailing empty rows and columns have no cells to size the build from
+            self.spreadsheet.appendRows(numRows - self.spreadsheet.rowNum())
+            self.spreadsheet.appendCols(numColumns - self.spreadsheet.colNum())
+            self.migrations += 1
+
+        self._resetWindow(nnz)
+
+
+    def _switchTo(self, approach: str) -> None:
+        """
+        Replace the backend with an empty one of the given approach, with this sheet's indexes attached.
+        Its buildFromArrays() then rebuilds the indexes.
+        """
+
+        self.approach = approach
+        self.spreadsheet = BACKENDS[approach]()
+        for index in self.addedIndexes:
+            self.spreadsheet.addIndex(index)
+        if self.valueIndexEnabled:
+            self.spreadsheet.enableValueIndex()
+
+
+    def _resetWindow(self, nnz: int) -> None:
+        for op in self.mix:
+            self.mix[op] = 0
+        self.operations = 0
+        self.window = max(MIN_WINDOW, nnz // 8)
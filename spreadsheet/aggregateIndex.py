@@ -0,0 +1,262 @@
+from array import array
+from bisect import bisect_left
+
+from spreadsheet.cell import Cell
+from spreadsheet.fenwickTree import FenwickTree
+
+
+# ------------------------------------------------------------------------
+# Maintained aggregates over the cells of a spreadsheet.
+#
+# Per-row and per-column sums and counts, the total count and a count per
+# value (for min and max) are updated on every change through the
+# BaseSpreadsheet notify hooks. Fenwick trees over the row and column
+# sums answer sums of whole rows or columns in O(log n). They are dropped
+# when a row or column is inserted and rebuilt by the next query, as in
+# CSRSpreadsheet.
+#
+# Rectangle sums use RectangleSums, a 2D structure over the filled
+# positions. Changing the value of a filled cell updates it in place.
+# Filling a new cell or inserting a line changes the positions, so it is
+# dropped and rebuilt on demand.
+# ------------------------------------------------------------------------
+
+class AggregateIndex:
+
+    needsCells = True
+
+    def __init__(self):
+        self.rowSums: list = []
+        self.rowCounts: list = []
+        self.colSums: list = []
+        self.colCounts: list = []
+        self.rowTree: FenwickTree = None
+        self.colTree: FenwickTree = None
+
+        # value -> number of cells holding it, with lazily recomputed extremes
+        self.valueCounts: dict = {}
+        self.minValue: float = None
+        self.maxValue: float = None
+        self.extremesStale = False
+
+        self.count = 0
+
+        # Built by the owner on demand, dropped when the filled positions change
+        self.rectangles: RectangleSums = None
+
+
+    def rebuild(self, lCells: [Cell]) -> None:
+        """
+        Discard the aggregates and rebuild them from a list of cells.
+        """
+
+        self.rebuildFromArrays([cell.row for cell in lCells], [cell.col for cell in lCells], [cell.val for cell in lCells])
+
+
+    def rebuildFromArrays(self, rows, cols, vals) -> None:
+        """
+        Discard the aggregates and rebuild them from parallel row, column and value arrays.
+        """
+
+        self.__init__()
+        for row, col, val in zip(rows, cols, vals):
+            self._add(row, col, val)
+
+
+    def update(self, rowIndex: int, colIndex: int, oldValue: float, newValue: float) -> None:
+        if oldValue is not None:
+            self._remove(rowIndex, colIndex, oldValue)
+            if self.rectangles is not None:
+                self.rectangles.add(rowIndex, colIndex, newValue - oldValue)
+        else:
+            self.rectangles = None
+
+        self._add(rowIndex, colIndex, newValue)
+
+
+    def insertRow(self, rowIndex: int) -> None:
+        if rowIndex < len(self.rowSums):
+            self.rowSums.insert(rowIndex, 0.0)
+            self.rowCounts.insert(rowIndex, 0)
+            self.rowTree = None
+        self.rectangles = None
+
+
+    def insertCol(self, colIndex: int) -> None:
+        if colIndex < len(self.colSums):
+            self.colSums.insert(colIndex, 0.0)
+            self.colCounts.insert(colIndex, 0)
+            self.colTree = None
+        self.rectangles = None
+
+
+    def rowSum(self, rowIndex: int) -> float:
+        return self.rowSums[rowIndex] if 0 <= rowIndex < len(self.rowSums) else 0.0
+
+
+    def colSum(self, colIndex: int) -> float:
+        return self.colSums[colIndex] if 0 <= colIndex < len(self.colSums) else 0.0
+
+
+    def rowRangeSum(self, start: int, end: int) -> float:
+        """
+        @return Sum of rows [start, end), in O(log rows).
+        """
+
+        if self.rowTree is None:
+            self.rowTree = FenwickTree(self.rowSums)
+
+        return self.rowTree.rangeSum(start, end)
+
+
+    def colRangeSum(self, start: int, end: int) -> float:
+        """
+        @return Sum of columns [start, end), in O(log columns).
+        """
+
+        if self.colTree is None:
+            self.colTree = FenwickTree(self.colSums)
+
+        return self.colTree.rangeSum(start, end)
+
+
+    def min(self) -> float:
+        if self.extremesStale:
+            self._recomputeExtremes()
+
+        return self.minValue
+
+
+    def max(self) -> float:
+        if self.extremesStale:
+            self._recomputeExtremes()
+
+        return self.maxValue
+
+
+    def _add(self, rowIndex: int, colIndex: int, value: float) -> None:
+        """
+        Count a newly filled cell.
+        """
+
+        if rowIndex >= len(self.rowSums):
+            # Appended rows are not notified, so the lists grow on first use
+            grow = rowIndex + 1 - len(self.rowSums)
+            self.rowSums.extend([0.0] * grow)
+            self.rowCounts.extend([0] * grow)
+            self.rowTree = None
+        if colIndex >= len(self.colSums):
+            grow = colIndex + 1 - len(self.colSums)
+            self.colSums.extend([0.0] * grow)
+            self.colCounts.extend([0] * grow)
+            self.colTree = None
+
+        self._shift(rowIndex, colIndex, value, 1)
+
+        self.valueCounts[value] = self.valueCounts.get(value, 0) + 1
+        if not self.extremesStale:
+            if self.minValue is None or value < self.minValue:
+                self.minValue = value
+            if self.maxValue is None or value > self.maxValue:
+                self.maxValue = value
+
+
+    def _remove(self, rowIndex: int, colIndex: int, value: float) -> None:
+        """
+        Uncount a cell's old value.
+        """
+
+        self._shift(rowIndex, colIndex, -value, -1)
+
+        remaining = self.valueCounts[value] - 1
+        if remaining:
+            self.valueCounts[value] = remaining
+            return
+
+        del self.valueCounts[value]
+        if value == self.minValue or value == self.maxValue:
+            self.extremesStale = True
+
+
+    def _shift(self, rowIndex: int, colIndex: int, value: float, counted: int) -> None:
+        self.rowSums[rowIndex] += value
+        self.colSums[colIndex] += value
+        self.rowCounts[rowIndex] += counted
+        self.colCounts[colIndex] += counted
+        self.count += counted
+
+        if self.rowTree is not None:
+            self.rowTree.add(rowIndex, value)
+        if self.colTree is not None:
+            self.colTree.add(colIndex, value)
+
+
+    def _recomputeExtremes(self) -> None:
+        self.minValue = min(self.valueCounts, default=None)
+        self.maxValue = max(self.valueCounts, default=None)
+        self.extremesStale = False
+
+
+
+
+class RectangleSums:
+    '''
+    2D sums over a fixed set of sparse cells: a Fenwick tree over the rows that have cells, where each node
+    keeps its cells sorted by column in a Fenwick tree of its own.  Building is O(nnz log rows), and a
+    rectangle sum or changing the value of one of the cells is O(log rows * log nnz).
+    '''
+
+    def __init__(self, rows, cols, vals):
+        # Fenwick positions are the distinct non-empty rows, so empty rows cost nothing
+        self.rowKeys: list = sorted(set(rows))
+        size = len(self.rowKeys)
+        position = {row: i + 1 for i, row in enumerate(self.rowKeys)}
+
+        buckets = [[] for i in range(size + 1)]
+        for row, col, val in zip(rows, cols, vals):
+            i = position[row]
+            while i <= size:
+                buckets[i].append((col, val))
+                i += i & -i
+
+        self.nodeCols: list = []
+        self.nodeSums: list = []
+        for bucket in buckets:
+            bucket.sort()
+            self.nodeCols.append(array('q', [col for col, val in bucket]))
+            self.nodeSums.append(FenwickTree([val for col, val in bucket]))
+
+
+    def add(self, rowIndex: int, colIndex: int, delta: float) -> None:
+        """
+        Add delta to the value of the cell at (rowIndex, colIndex), which must be one of the cells built from.
+        """
+
+        size = len(self.rowKeys)
+        i = bisect_left(self.rowKeys, rowIndex) + 1
+        while i <= size:
+            # Prefixes are cut at column boundaries, so any of the node's entries in this column will do
+            self.nodeSums[i].add(bisect_left(self.nodeCols[i], colIndex), delta)
+            i += i & -i
+
+
+    def sum(self, r0: int, c0: int, r1: int, c1: int) -> float:
+        """
+        @return Sum of the cells in rows [r0, r1) and columns [c0, c1).
+        """
+
+        return self._prefix(r1, c1) - self._prefix(r0, c1) - self._prefix(r1, c0) + self._prefix(r0, c0)
+
+
+    def _prefix(self, rowEnd: int, colEnd: int) -> float:
+        """
+        @return Sum of the cells with row < rowEnd and col < colEnd.
+        """
+
+        total = 0.0
+        i = bisect_left(self.rowKeys, rowEnd)
+        while i > 0:
+            total += self.nodeSums[i].prefixSum(bisect_left(self.nodeCols[i], colEnd))
+            i -= i & -i
+
+        return total
@@ -1,5 +1,9 @@
+from array import array
+
 from spreadsheet.cell import Cell
 from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+from spreadsheet.loader import cellsToColumns
+from spreadsheet.instrumentation import counters
 
 
 # ------------------------------------------------------------------------
@@ -13,69 +17,200 @@ from spreadsheet.baseSpreadsheet import BaseSpreadsheet
 class ArraySpreadsheet(BaseSpreadsheet):
 
     def __init__(self):
+        # Physical storage. Rows only grow on update, so a short row reads as None past its end
         self.array = []
 
+        # Logical -> physical index maps. Inserting a row or column only splices these
+        self.rowMap = []
+        self.colMap = []
+        self.physCols = 0
+
     def buildSpreadsheet(self, lCells: [Cell]):
-        n_row = max((cell.row for cell in lCells))
-        n_col = max((cell.col for cell in lCells))
+        self.buildFromArrays(*cellsToColumns(lCells))
+
+    def buildFromArrays(self, rows: array, cols: array, vals: array):
+        n_row = max(rows)
+        n_col = max(cols)
 
         self.array = [[None] * (n_col + 1) for _ in range(n_row + 1)]
+        self.rowMap = list(range(n_row + 1))
+        self.colMap = list(range(n_col + 1))
+        self.physCols = n_col + 1
 
-        for cell in lCells:
-            self.array[cell.row][cell.col] = cell.val
+        for row, col, val in zip(rows, cols, vals):
+            self.array[row][col] = val
+
+        if self.indexes:
+            self._notifyBuild()
 
     def appendRow(self) -> bool:
-        self.array.append([None] * self.colNum())
+        self.rowMap.append(len(self.array))
+        self.array.append([])
         return True
 
     def appendCol(self) -> bool:
-        for row in self.array:
-            row.append(None)
+        self.colMap.append(self.physCols)
+        self.physCols += 1
         return True
 
     def insertRow(self, rowIndex: int) -> bool:
         if rowIndex > self.rowNum() or rowIndex < 0:
             return False
 
-        self.array.insert(rowIndex, [None] * self.colNum())
+        self.rowMap.insert(rowIndex, len(self.array))
+        self.array.append([])
+        if self.indexes:
+            self._notifyInsertRow(rowIndex)
         return True
 
     def insertCol(self, colIndex: int) -> bool:
         if colIndex > self.colNum() or colIndex < 0:
             return False
 
-        for row in self.array:
-            row.insert(colIndex, None)
+        if counters.enabled:
+            counters.add('array.insertCol.indexShifted', self.colNum() - colIndex)
+
+        self.colMap.insert(colIndex, self.physCols)
+        self.physCols += 1
+        if self.indexes:
+            self._notifyInsertCol(colIndex)
+        return True
+
+    def appendRows(self, count: int) -> bool:
+        self.rowMap.extend(range(len(self.array), len(self.array) + count))
+        self.array.extend([] for _ in range(count))
+        return True
+
+    def appendCols(self, count: int) -> bool:
+        self.colMap.extend(range(self.physCols, self.physCols + count))
+        self.physCols += count
+        return True
+
+    def insertRows(self, rowIndex: int, count: int) -> bool:
+        if rowIndex > self.rowNum() or rowIndex < 0:
+            return False
+
+        self.rowMap[rowIndex:rowIndex] = range(len(self.array), len(self.array) + count)
+        self.array.extend([] for _ in range(count))
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertRow(rowIndex)
+        return True
+
+    def insertCols(self, colIndex: int, count: int) -> bool:
+        if colIndex > self.colNum() or colIndex < 0:
+            return False
+
+        if counters.enabled:
+            counters.add('array.insertCol.indexShifted', self.colNum() - colIndex)
 
+        self.colMap[colIndex:colIndex] = range(self.physCols, self.physCols + count)
+        self.physCols += count
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertCol(colIndex)
         return True
 
     def update(self, rowIndex: int, colIndex: int, value: float) -> bool:
         if rowIndex < 0 or rowIndex >= self.rowNum() or colIndex < 0 or colIndex >= self.colNum():
             return False
 
-        self.array[rowIndex][colIndex] = value
+        row = self.array[self.rowMap[rowIndex]]
+        physCol = self.colMap[colIndex]
+        if physCol >= len(row):
+            row.extend([None] * (physCol + 1 - len(row)))
+
+        if self.indexes:
+            self._notifyUpdate(rowIndex, colIndex, row[physCol], value)
+
+        row[physCol] = value
         return True
 
     def rowNum(self) -> int:
-        return len(self.array)
+        return len(self.rowMap)
 
     def colNum(self) -> int:
-        return len(self.array[0]) if self.array else 0
+        return len(self.colMap)
 
     def find(self, value: float) -> [(int, int)]:
+        if self.valueIndex is not None:
+            return self.valueIndex.find(value)
+
         location = []
-        for row_num, row in enumerate(self.array):
-            for col_num, val in enumerate(row):
-                if val == value:
-                    location.append((row_num, col_num))
+        logicalCol = self._logicalCols()
+        for row_num, physRow in enumerate(self.rowMap):
+            row = self.array[physRow]
+            if value not in row:
+                continue
+
+            cols = [logicalCol[phys_col] for phys_col, val in enumerate(row) if val == value]
+            cols.sort()
+            location.extend((row_num, col_num) for col_num in cols)
 
         return location
 
     def entries(self) -> [Cell]:
         entries = []
-        for row_num, row in enumerate(self.array):
-            for col_num, value in enumerate(row):
-                if value is not None:
-                    entries.append(Cell(row_num, col_num, value))
+        for row_num, physRow in enumerate(self.rowMap):
+            row = self.array[physRow]
+            length = len(row)
+            if length == 0:
+                continue
+
+            for col_num, physCol in enumerate(self.colMap):
+                if physCol < length:
+                    value = row[physCol]
+                    if value is not None:
+                        entries.append(Cell(row_num, col_num, value))
 
         return entries
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]:
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        if r0 >= r1 or c0 >= c1:
+            return []
+
+        # Only the window's slices of the index maps are visited
+        cells = []
+        physCols = self.colMap[c0:c1]
+        for row_num, physRow in enumerate(self.rowMap[r0:r1], r0):
+            row = self.array[physRow]
+            length = len(row)
+            for col_num, physCol in enumerate(physCols, c0):
+                if physCol < length:
+                    value = row[physCol]
+                    if value is not None:
+                        cells.append(Cell(row_num, col_num, value))
+
+        return cells
+
+    def entriesArrays(self) -> (array, array, array):
+        rows = array('q')
+        cols = array('q')
+        vals = array('d')
+        for row_num, physRow in enumerate(self.rowMap):
+            row = self.array[physRow]
+            length = len(row)
+            if length == 0:
+                continue
+
+            for col_num, physCol in enumerate(self.colMap):
+                if physCol < length:
+                    value = row[physCol]
+                    if value is not None:
+                        rows.append(row_num)
+                        cols.append(col_num)
+                        vals.append(value)
+
+        return rows, cols, vals
+
+    def _logicalCols(self) -> [int]:
+        """
+        @return Inverse of colMap, mapping each physical column to its logical index.
+        """
+
+        logicalCol = [0] * self.physCols
+        for col_num, physCol in enumerate(self.colMap):
+            logicalCol[physCol] = col_num
+
+        return logicalCol
@@ -1,14 +1,34 @@
+from array import array
+from itertools import accumulate
+
 from spreadsheet.cell import Cell
+from spreadsheet.loader import cellsToColumns, expandRowPointers
+from spreadsheet.snapshot import readSnapshot, writeSnapshot
+from spreadsheet.valueIndex import ValueIndex
+from spreadsheet.sortedValueIndex import SortedValueIndex
+from spreadsheet.aggregateIndex import AggregateIndex, RectangleSums
 
 
 # -------------------------------------------------
-# Base class for spreadsheet implementations. DON'T CHANGE THIS FILE.
+# Base class for spreadsheet implementations.
 #
 # __author__ = 'Jeffrey Chan'
 # __copyright__ = 'Copyright 2023, RMIT University'
 # -------------------------------------------------
 
 class BaseSpreadsheet:
+    # Secondary indexes the backend keeps in sync on every change, see addIndex()
+    indexes = ()
+
+    # Optional value -> positions index used by find(), see enableValueIndex()
+    valueIndex = None
+
+    # Optional ordered index used by findRange() and findGreater(), see enableSortedIndex()
+    sortedIndex = None
+
+    # Optional maintained sums, counts and extremes used by the aggregate queries, see enableAggregates()
+    aggregates = None
+
     def buildSpreadsheet(self, lCells: [Cell]):
         """
         Construct the data structure to store nodes.
@@ -17,6 +37,17 @@ class BaseSpreadsheet:
         pass
 
 
+    def buildFromArrays(self, rows: array, cols: array, vals: array):
+        """
+        Construct the data structure from parallel row, column and value arrays, e.g. from loader.loadColumns().
+        @param rows: row index of each cell
+        @param cols: column index of each cell
+        @param vals: value of each cell
+        """
+
+        self.buildSpreadsheet([Cell(row, col, val) for row, col, val in zip(rows, cols, vals)])
+
+
     def appendRow(self)->bool:
         """
         Appends an empty row to the spreadsheet.
@@ -103,9 +134,352 @@ class BaseSpreadsheet:
         pass
 
 
+    def findRange(self, lo: float, hi: float) -> [(int, int)]:
+        """
+        Find the cells whose value v satisfies lo <= v <= hi.
+
+        @return List of cells (row, col) in row-major order.
+        """
+
+        if self.sortedIndex is not None:
+            return self._currentSortedIndex().between(lo, hi)
+
+        return self.findWhere(lambda value: lo <= value <= hi)
+
+
+    def findGreater(self, value: float) -> [(int, int)]:
+        """
+        Find the cells whose value is greater than value.
+
+        @return List of cells (row, col) in row-major order.
+        """
+
+        if self.sortedIndex is not None:
+            return self._currentSortedIndex().greater(value)
+
+        return self.findWhere(lambda cellValue: cellValue > value)
+
+
+    def findWhere(self, predicate) -> [(int, int)]:
+        """
+        Find the cells whose value satisfies a predicate.  Always a scan over the cells.
+
+        @param predicate Function taking a cell value and returning True for a match.
+
+        @return List of cells (row, col) in row-major order.
+        """
+
+        rows, cols, vals = self.entriesArrays()
+
+        return [(row, col) for row, col, value in zip(rows, cols, vals) if predicate(value)]
+
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]:
+        """
+        Read a rectangular window without materialising the rest of the sheet.
+
+        @return The cells with values in rows [r0, r1) and columns [c0, c1), clipped to the sheet, in row-major order.
+        """
+
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        rows, cols, vals = self.entriesArrays()
+
+        return [Cell(row, col, val) for row, col, val in zip(rows, cols, vals) if r0 <= row < r1 and c0 <= col < c1]
+
+
+    def setRange(self, r0: int, c0: int, values: [[float]]) -> bool:
+        """
+        Write a block of values with its top-left cell at (r0, c0), as update() calls would.
+
+        @param values List of rows, each a list of values.  None leaves that cell as it is.
+
+        @return True if the block fits in the sheet and was written, or False, with nothing written, if not.
+        """
+
+        width = max(map(len, values), default=0)
+        if r0 < 0 or c0 < 0 or r0 + len(values) > self.rowNum() or c0 + width > self.colNum():
+            return False
+
+        self.updateMany([(r0 + i, c0 + j, value) for i, row in enumerate(values) for j, value in enumerate(row) if value is not None])
+
+        return True
+
+
+    def rowSum(self, rowIndex: int) -> float:
+        """
+        @return Sum of the values in row rowIndex, or 0 if the row does not exist.
+        """
+
+        if self.aggregates is not None:
+            return self.aggregates.rowSum(rowIndex)
+
+        return self.rangeSum(rowIndex, 0, rowIndex + 1, self.colNum())
+
+
+    def colSum(self, colIndex: int) -> float:
+        """
+        @return Sum of the values in column colIndex, or 0 if the column does not exist.
+        """
+
+        if self.aggregates is not None:
+            return self.aggregates.colSum(colIndex)
+
+        return self.rangeSum(0, colIndex, self.rowNum(), colIndex + 1)
+
+
+    def rangeSum(self, r0: int, c0: int, r1: int, c1: int) -> float:
+        """
+        @return Sum of the values in rows [r0, r1) and columns [c0, c1), clipped to the sheet.
+        """
+
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        if r0 >= r1 or c0 >= c1:
+            return 0.0
+
+        aggregates = self.aggregates
+        if aggregates is not None:
+            # Whole rows or whole columns come from the Fenwick trees
+            if c0 == 0 and c1 == self.colNum():
+                return aggregates.rowRangeSum(r0, r1)
+            if r0 == 0 and r1 == self.rowNum():
+                return aggregates.colRangeSum(c0, c1)
+
+            # Rebuilding the 2D sums only pays off for windows that would scan about as many cells
+            if aggregates.rectangles is None and (r1 - r0) * (c1 - c0) >= aggregates.count:
+                aggregates.rectangles = RectangleSums(*self.entriesArrays())
+            if aggregates.rectangles is not None:
+                return aggregates.rectangles.sum(r0, c0, r1, c1)
+
+        return sum(cell.val for cell in self.getRange(r0, c0, r1, c1))
+
+
+    def count(self) -> int:
+        """
+        @return Number of cells that have values.
+        """
+
+        if self.aggregates is not None:
+            return self.aggregates.count
+
+        return len(self.entriesArrays()[2])
+
+
+    def min(self) -> float:
+        """
+        @return Smallest value in the sheet, or None if it has no values.
+        """
+
+        if self.aggregates is not None:
+            return self.aggregates.min()
+
+        value = min(self.entriesArrays()[2], default=None)
+        return None if value is None else float(value)
+
+
+    def max(self) -> float:
+        """
+        @return Largest value in the sheet, or None if it has no values.
+        """
+
+        if self.aggregates is not None:
+            return self.aggregates.max()
+
+        value = max(self.entriesArrays()[2], default=None)
+        return None if value is None else float(value)
+
+
     def entries(self) -> [Cell]:
         """
         @return A list of cells that have values (i.e., all non None cells).
         """
 
         return []
+
+
+    def entriesArrays(self) -> (array, array, array):
+        """
+        Same cells as entries(), as parallel row, column and value arrays, without allocating a Cell per entry.
+
+        @return (rows, cols, vals) as array('q'), array('q') and array('d'), in row-major order.
+        """
+
+        return cellsToColumns(self.entries())
+
+
+    def csrArrays(self) -> (array, array, array):
+        """
+        @return (rowPtr, colIdx, vals): the cells in compressed sparse row form.  The entries of row i are at
+            positions rowPtr[i] to rowPtr[i + 1] - 1 of colIdx and vals.
+        """
+
+        rows, cols, vals = self.entriesArrays()
+        counts = [0] * (self.rowNum() + 1)
+        for row in rows:
+            counts[row + 1] += 1
+
+        return array('q', accumulate(counts)), cols, vals
+
+
+    def save(self, path: str) -> None:
+        """
+        Write the spreadsheet to a binary snapshot file, see spreadsheet/snapshot.py.
+        """
+
+        rowPtr, colIdx, vals = self.csrArrays()
+        sumA = array('d', accumulate((sum(vals[rowPtr[row]:rowPtr[row + 1]]) for row in range(self.rowNum())), initial=0.0))
+        writeSnapshot(path, self.rowNum(), self.colNum(), rowPtr, sumA, colIdx, vals)
+
+
+    def load(self, path: str) -> None:
+        """
+        Replace the contents of the spreadsheet with a snapshot written by save().
+        """
+
+        snapshot = readSnapshot(path, mapped=False)
+        self.buildFromArrays(expandRowPointers(snapshot.rowPtr), snapshot.colIdx, snapshot.vals)
+
+        # Trailing empty rows and columns have no cells to size the build from
+        self.appendRows(snapshot.numRows - self.rowNum())
+        self.appendCols(snapshot.numColumns - self.colNum())
+
+
+    def appendRows(self, count: int) -> bool:
+        """
+        Appends count empty rows, as count calls to appendRow() would.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        return all([self.appendRow() for i in range(count)])
+
+
+    def appendCols(self, count: int) -> bool:
+        """
+        Appends count empty columns, as count calls to appendCol() would.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        return all([self.appendCol() for i in range(count)])
+
+
+    def insertRows(self, rowIndex: int, count: int) -> bool:
+        """
+        Inserts count empty rows, as count calls to insertRow(rowIndex) would.
+
+        @return True if operation was successful, or False if not, e.g., rowIndex is invalid.
+        """
+
+        return all([self.insertRow(rowIndex) for i in range(count)])
+
+
+    def insertCols(self, colIndex: int, count: int) -> bool:
+        """
+        Inserts count empty columns, as count calls to insertCol(colIndex) would.
+
+        @return True if operation was successful, or False if not, e.g., colIndex is invalid.
+        """
+
+        return all([self.insertCol(colIndex) for i in range(count)])
+
+
+    def updateMany(self, updates: [(int, int, float)]) -> [bool]:
+        """
+        Applies a run of updates in order, as calls to update() would.
+
+        @param updates List of (rowIndex, colIndex, value).
+
+        @return update()'s result for each entry of updates.
+        """
+
+        return [self.update(rowIndex, colIndex, value) for rowIndex, colIndex, value in updates]
+
+
+    def addIndex(self, index) -> None:
+        """
+        Register a secondary index.  Backends call its update(), insertRow() and insertCol()
+        after every change and rebuild() after buildSpreadsheet().  rebuild() is passed the cells,
+        or None if the index sets needsCells to False.
+
+        @param index Object implementing the ValueIndex interface.
+        """
+
+        self.indexes = self.indexes + (index,)
+
+
+    def enableValueIndex(self) -> None:
+        """
+        Index the current cells by value, so find() costs O(matches) instead of O(cells).
+        The index is maintained incrementally by update(), insertRow() and insertCol().
+        """
+
+        self.valueIndex = ValueIndex(self.entries())
+        self.addIndex(self.valueIndex)
+
+
+    def enableSortedIndex(self) -> None:
+        """
+        Keep an ordered index of the cell values, so findRange() and findGreater() cost O(log n + matches)
+        instead of a scan.  It is brought up to date lazily, on the next range query after a change.
+        """
+
+        self.sortedIndex = SortedValueIndex()
+        self.addIndex(self.sortedIndex)
+
+
+    def enableAggregates(self) -> None:
+        """
+        Maintain per-row and per-column sums and counts, the cell count and the extremes on every change,
+        so rowSum(), colSum(), count(), min(), max() and whole-row or whole-column rangeSum() do not scan.
+        """
+
+        self.aggregates = AggregateIndex()
+        self.aggregates.rebuildFromArrays(*self.entriesArrays())
+        self.addIndex(self.aggregates)
+
+
+    def _clipRange(self, r0: int, c0: int, r1: int, c1: int) -> (int, int, int, int):
+        """
+        @return The window [r0, r1) x [c0, c1) clipped to the sheet.  It may be empty, with r1 <= r0 or c1 <= c0.
+        """
+
+        return max(r0, 0), max(c0, 0), min(r1, self.rowNum()), min(c1, self.colNum())
+
+
+    def _currentSortedIndex(self) -> SortedValueIndex:
+        if self.sortedIndex.stale:
+            self.sortedIndex.rebuildFromArrays(*self.entriesArrays())
+
+        return self.sortedIndex
+
+
+    def _notifyBuild(self) -> None:
+        # The cells are only listed if some index reads them, and then only once
+        lCells = None
+        for index in self.indexes:
+            if index.needsCells and lCells is None:
+                lCells = self.entries()
+            index.rebuild(lCells if index.needsCells else None)
+
+
+    def _notifyUpdate(self, rowIndex: int, colIndex: int, oldValue: float, newValue: float) -> None:
+        for index in self.indexes:
+            index.update(rowIndex, colIndex, oldValue, newValue)
+
+
+    def _notifyInsertRow(self, rowIndex: int) -> None:
+        """
+        @param rowIndex Position of the newly inserted empty row.
+        """
+
+        for index in self.indexes:
+            index.insertRow(rowIndex)
+
+
+    def _notifyInsertCol(self, colIndex: int) -> None:
+        """
+        @param colIndex Position of the newly inserted empty column.
+        """
+
+        for index in self.indexes:
+            index.insertCol(colIndex)
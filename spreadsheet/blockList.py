@@ -0,0 +1,89 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+
+# ------------------------------------------------------------------------
+# Positional index over a sequence, stored as a list of bounded blocks
+# (a simple rope). Lookup bisects the block start offsets, O(log n), and
+# insert only shifts items inside one block. The start offsets are
+# rebuilt lazily after a block is added or changes size in the middle.
+# ------------------------------------------------------------------------
+
+class BlockList:
+
+    # Blocks are split in half once they grow past twice this size
+    blockSize = 512
+
+    def __init__(self, items=()):
+        items = list(items)
+        size = self.blockSize
+        self.blocks: list = [items[i:i + size] for i in range(0, len(items), size)] or [[]]
+        self.length = len(items)
+        self.starts: list = None
+
+
+    def __len__(self) -> int:
+        return self.length
+
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+
+    def __getitem__(self, index: int):
+        if index < 0 or index >= self.length:
+            raise IndexError('BlockList index out of range')
+
+        blockIndex, offset = self._locate(index)
+        return self.blocks[blockIndex][offset]
+
+
+    def append(self, item) -> None:
+        # The last block's start offset does not move, so starts stays valid unless it splits
+        block = self.blocks[-1]
+        block.append(item)
+        self.length += 1
+
+        if len(block) > 2 * self.blockSize:
+            self._split(len(self.blocks) - 1)
+
+
+    def insert(self, index: int, item) -> None:
+        """
+        Insert item so it ends up at position index, as list.insert does.
+        """
+
+        if index >= self.length:
+            self.append(item)
+            return
+
+        blockIndex, offset = self._locate(max(index, 0))
+        block = self.blocks[blockIndex]
+        block.insert(offset, item)
+        self.length += 1
+
+        if len(block) > 2 * self.blockSize:
+            self._split(blockIndex)
+        elif blockIndex < len(self.blocks) - 1:
+            self.starts = None
+
+
+    def _locate(self, index: int) -> (int, int):
+        """
+        @return (block index, offset within block) of position index.
+        """
+
+        if self.starts is None:
+            self.starts = [0]
+            self.starts.extend(accumulate(len(block) for block in self.blocks[:-1]))
+
+        blockIndex = bisect_right(self.starts, index) - 1
+        return blockIndex, index - self.starts[blockIndex]
+
+
+    def _split(self, blockIndex: int) -> None:
+        block = self.blocks[blockIndex]
+        half = len(block) // 2
+        self.blocks[blockIndex:blockIndex + 1] = [block[:half], block[half:]]
+        self.starts = None
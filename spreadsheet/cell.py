@@ -6,6 +6,8 @@
 
 # Class representing a cell and its value.
 class Cell:
+    __slots__ = ('row', 'col', 'val')
+
     def __init__(self, row: int, col: int, val: float):
         # a cell object has the row, column and value
         self.row = row
@@ -0,0 +1,507 @@
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+from spreadsheet.cell import Cell
+from spreadsheet.loader import expandRowPointers
+from spreadsheet.snapshot import readSnapshot, writeSnapshot
+from spreadsheet.instrumentation import counters
+from bisect import bisect_left, bisect_right
+from array import array
+from itertools import accumulate
+
+
+# ------------------------------------------------------------------------
+# CSR spreadsheet stored as a list of row blocks.
+#
+# Each block is a small CSR structure of its own: local row pointers,
+# colA/valA for its rows only, and per-row sums. A new cell only shifts
+# entries and row pointers within its block, so update() is bounded by
+# the block size rather than by nnz + rows. Block start rows are found
+# by bisecting a start offset list, rebuilt lazily after a block changes
+# its number of rows (as in BlockList).
+#
+# Inserts follow CSRSpreadsheet: insertRow(i) adds the new row after i.
+# ------------------------------------------------------------------------
+
+# Target rows per block.  Blocks are split once they grow past twice this
+BLOCK_ROWS = 64
+
+# Blocks with more than this many entries are split between rows, to bound the shift on insert
+MAX_BLOCK_ENTRIES = 8192
+
+
+class RowBlock:
+    '''
+    A run of consecutive rows in CSR form, with row pointers relative to the block.
+    '''
+
+    __slots__ = ('numRows', 'rowPtr', 'colA', 'valA', 'rowSums')
+
+    def __init__(self, numRows: int, rowPtr: array, colA: array, valA: array, rowSums: array):
+        self.numRows = numRows
+        self.rowPtr = rowPtr
+        self.colA = colA
+        self.valA = valA
+        self.rowSums = rowSums
+
+
+def emptyBlock(numRows: int) -> RowBlock:
+    return RowBlock(numRows, array('q', [0]) * (numRows + 1), array('q'), array('d'), array('d', [0]) * numRows)
+
+
+
+
+class ChunkedCSRSpreadsheet(BaseSpreadsheet):
+
+    def __init__(self):
+        self.numRows = 0
+        self.numColumns = 0
+
+        self.blocks: list = []
+
+        # First row of each block, or None when it needs rebuilding
+        self.starts: list = None
+
+
+    def buildSpreadsheet(self, lCells: [Cell]) -> None:
+        """
+        Construct the data structure to store nodes.
+        @param lCells: list of cells to be stored
+        """
+
+        # CSRSpreadsheet does the sorting and deduplication, then its arrays are cut into blocks
+        csr = CSRSpreadsheet()
+        csr.buildSpreadsheet(lCells)
+        self._buildBlocks(csr.numRows, csr.numColumns, csr.rowA, csr.colA, csr.valA)
+
+
+    def buildFromArrays(self, rows: array, cols: array, vals: array) -> None:
+        """
+        Construct the data structure from parallel row, column and value arrays.
+        """
+
+        csr = CSRSpreadsheet()
+        csr.buildFromArrays(rows, cols, vals)
+        self._buildBlocks(csr.numRows, csr.numColumns, csr.rowA, csr.colA, csr.valA)
+
+
+    def appendRow(self) -> bool:
+        """
+        Appends an empty row to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        return self.appendRows(1)
+
+
+    def appendCol(self) -> bool:
+        """
+        Appends an empty column to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        return self.appendCols(1)
+
+
+    def appendRows(self, count: int) -> bool:
+        """
+        Appends count empty rows to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        # Top up the last block, if there is one, then add new blocks.  Start offsets of existing blocks do not move
+        fill = 0
+        if self.blocks:
+            last = self.blocks[-1]
+            fill = min(count, max(BLOCK_ROWS - last.numRows, 0))
+            if fill:
+                self._insertEmptyRows(last, last.numRows, fill)
+
+        remaining = count - fill
+        while remaining > 0:
+            size = min(remaining, BLOCK_ROWS)
+            self.blocks.append(emptyBlock(size))
+            remaining -= size
+        if count > fill:
+            self.starts = None
+
+        self.numRows += count
+
+        return True
+
+
+    def appendCols(self, count: int) -> bool:
+        """
+        Appends count empty columns to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        self.numColumns += count
+
+        return True
+
+
+    def insertRow(self, rowIndex: int) -> bool:
+        """
+        Inserts an empty row into the spreadsheet.
+
+        @param rowIndex Index of the existing row that will be before the newly inserted row.  If inserting as first row, specify rowIndex to be -1.
+
+        @return True if operation was successful, or False if not, e.g., rowIndex is invalid.
+        """
+
+        return self.insertRows(rowIndex, 1)
+
+
+    def insertRows(self, rowIndex: int, count: int) -> bool:
+        """
+        Inserts count empty rows after rowIndex, as count calls to insertRow(rowIndex) would.
+
+        @return True if operation was successful, or False if not, e.g., rowIndex is invalid.
+        """
+
+        if rowIndex < -1 or rowIndex >= self.numRows:
+            return False
+
+        if rowIndex == self.numRows - 1:
+            self.appendRows(count)
+        else:
+            # Only the block holding the row after the insert point changes
+            blockIndex, localRow = self._locate(rowIndex + 1)
+            block = self.blocks[blockIndex]
+            self._insertEmptyRows(block, localRow, count)
+            self.numRows += count
+            self.starts = None
+
+            if block.numRows > 2 * BLOCK_ROWS:
+                self._split(blockIndex)
+
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertRow(rowIndex + 1)
+
+        return True
+
+
+    def insertCol(self, colIndex: int) -> bool:
+        """
+        Inserts an empty column into the spreadsheet.
+
+        @param colIndex Index of the existing column that will be before the newly inserted column.  If inserting as first column, specify colIndex to be -1.
+
+        @return True if operation was successful, or False if not, e.g., colIndex is invalid.
+        """
+
+        return self.insertCols(colIndex, 1)
+
+
+    def insertCols(self, colIndex: int, count: int) -> bool:
+        """
+        Inserts count empty columns after colIndex, as count calls to insertCol(colIndex) would.
+
+        @return True if operation was successful, or False if not, e.g., colIndex is invalid.
+        """
+
+        if colIndex < -1 or colIndex >= self.numColumns:
+            return False
+
+        for block in self.blocks:
+            if counters.enabled:
+                counters.add('chunkedcsr.insertCol.entriesRewritten', len(block.colA))
+
+            block.colA = array('q', [column + count if column > colIndex else column for column in block.colA])
+
+        self.numColumns += count
+
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertCol(colIndex + 1)
+
+        return True
+
+
+    def update(self, rowIndex: int, colIndex: int, value: float) -> bool:
+        """
+        Update the cell with the input/argument value.
+
+        @param rowIndex Index of row to update.
+        @param colIndex Index of column to update.
+        @param value Value to update.  Can assume they are floats.
+
+        @return True if cell can be updated.  False if cannot, e.g., row or column indices do not exist.
+        """
+
+        if rowIndex >= self.numRows or colIndex >= self.numColumns or rowIndex < 0 or colIndex < 0:
+            return False
+
+        blockIndex, localRow = self._locate(rowIndex)
+        block = self.blocks[blockIndex]
+
+        rowPtr = block.rowPtr
+        start = rowPtr[localRow]
+        end = rowPtr[localRow + 1]
+        index = bisect_left(block.colA, colIndex, start, end)
+
+        if index < end and block.colA[index] == colIndex:
+            oldValue = block.valA[index]
+            block.valA[index] = value
+            block.rowSums[localRow] += value - oldValue
+        else:
+            oldValue = None
+            if counters.enabled:
+                counters.add('chunkedcsr.update.elementsShifted', len(block.valA) - index)
+                counters.add('chunkedcsr.update.rowsTouched', block.numRows - localRow)
+
+            block.valA.insert(index, value)
+            block.colA.insert(index, colIndex)
+            for i in range(localRow + 1, block.numRows + 1):
+                rowPtr[i] += 1
+            block.rowSums[localRow] += value
+
+            if len(block.valA) > MAX_BLOCK_ENTRIES and block.numRows > 1:
+                self._split(blockIndex)
+
+        if self.indexes:
+            self._notifyUpdate(rowIndex, colIndex, oldValue, value)
+
+        return True
+
+
+    def rowNum(self) -> int:
+        """
+        @return Number of rows the spreadsheet has.
+        """
+
+        return self.numRows
+
+
+    def colNum(self) -> int:
+        """
+        @return Number of column the spreadsheet has.
+        """
+
+        return self.numColumns
+
+
+    def rowSum(self, rowIndex: int) -> float:
+        """
+        @return Sum of the values in row rowIndex, or 0 if the row does not exist.
+        """
+
+        if rowIndex < 0 or rowIndex >= self.numRows:
+            return 0.0
+
+        blockIndex, localRow = self._locate(rowIndex)
+        return self.blocks[blockIndex].rowSums[localRow]
+
+
+    def find(self, value: float) -> [(int, int)]:
+        """
+        Find and return a list of cells that contain the value 'value'.
+
+        @param value value to search for.
+
+        @return List of cells (row, col) that contains the input value.
+        """
+
+        if self.valueIndex is not None:
+            return self.valueIndex.find(value)
+
+        result: list[tuple[int, int]] = []
+
+        firstRow = 0
+        for block in self.blocks:
+            # array.index scans each block's packed buffer in C, so only matches reach Python
+            i = -1
+            while True:
+                try:
+                    i = block.valA.index(value, i + 1)
+                except ValueError:
+                    break
+
+                # Rows can be empty, so take the last row starting at or before i
+                row = bisect_right(block.rowPtr, i) - 1
+                result.append((firstRow + row, block.colA[i]))
+
+            firstRow += block.numRows
+
+        return result
+
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]:
+        """
+        @return The cells with values in rows [r0, r1) and columns [c0, c1), clipped to the sheet, in row-major order.
+        """
+
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        if r0 >= r1:
+            return []
+
+        result: list[Cell] = []
+
+        # Locate the first row once, then walk the rows block by block
+        blockIndex, localRow = self._locate(r0)
+        row = r0
+        while row < r1:
+            block = self.blocks[blockIndex]
+            colA = block.colA
+            for localRow in range(localRow, min(block.numRows, localRow + r1 - row)):
+                end = block.rowPtr[localRow + 1]
+                start = bisect_left(colA, c0, block.rowPtr[localRow], end)
+                end = bisect_left(colA, c1, start, end)
+                result.extend(Cell(row, column, val) for column, val in zip(colA[start:end], block.valA[start:end]))
+                row += 1
+
+            blockIndex += 1
+            localRow = 0
+
+        return result
+
+
+    def entries(self) -> [Cell]:
+        """
+        return a list of cells that have values (i.e., all non None cells).
+        """
+
+        rows, cols, vals = self.entriesArrays()
+
+        return [Cell(row, column, val) for row, column, val in zip(rows, cols, vals)]
+
+
+    def entriesArrays(self) -> (array, array, array):
+        """
+        @return (rows, cols, vals) parallel arrays of all non None cells, without allocating Cells.
+        """
+
+        rowA, colA, valA = self.csrArrays()
+
+        return expandRowPointers(rowA), colA, valA
+
+
+    def csrArrays(self) -> (array, array, array):
+        """
+        @return (rowPtr, colIdx, vals) for the whole sheet, concatenated from the blocks.
+        """
+
+        rowA = array('q', [0])
+        colA = array('q')
+        valA = array('d')
+        for block in self.blocks:
+            offset = len(colA)
+            rowA.extend(array('q', [ptr + offset for ptr in block.rowPtr[1:]]))
+            colA.extend(block.colA)
+            valA.extend(block.valA)
+
+        return rowA, colA, valA
+
+
+    def save(self, path: str) -> None:
+        """
+        Write the spreadsheet to a binary snapshot file.  Cumulative row sums are rebuilt from the per-row sums.
+        """
+
+        rowA, colA, valA = self.csrArrays()
+        sumA = array('d', [0])
+        sumA.extend(accumulate(rowSum for block in self.blocks for rowSum in block.rowSums))
+
+        writeSnapshot(path, self.numRows, self.numColumns, rowA, sumA, colA, valA)
+
+
+    def load(self, path: str) -> None:
+        """
+        Replace the contents of the spreadsheet with a snapshot written by save().
+        """
+
+        snapshot = readSnapshot(path, mapped = False)
+        self._buildBlocks(snapshot.numRows, snapshot.numColumns, snapshot.rowPtr, snapshot.colIdx, snapshot.vals)
+
+
+    def _buildBlocks(self, numRows: int, numColumns: int, rowA, colA, valA) -> None:
+        """
+        Cut whole-sheet CSR arrays into blocks of at most BLOCK_ROWS rows and, where rows allow, MAX_BLOCK_ENTRIES entries.
+        """
+
+        self.numRows = numRows
+        self.numColumns = numColumns
+        self.blocks = []
+        self.starts = None
+
+        first = 0
+        while first < numRows:
+            last = first + 1
+            while last < numRows and last - first < BLOCK_ROWS and rowA[last + 1] - rowA[first] <= MAX_BLOCK_ENTRIES:
+                last += 1
+
+            begin = rowA[first]
+            end = rowA[last]
+            rowSums = array('d', [sum(valA[rowA[row]:rowA[row + 1]]) for row in range(first, last)])
+            self.blocks.append(RowBlock(last - first, array('q', [ptr - begin for ptr in rowA[first:last + 1]]),
+                                        array('q', colA[begin:end]), array('d', valA[begin:end]), rowSums))
+            first = last
+
+        if self.indexes:
+            self._notifyBuild()
+
+
+    def _locate(self, row: int) -> (int, int):
+        """
+        @return (block index, row within block) of row.
+        """
+
+        if self.starts is None:
+            self.starts = [0]
+            self.starts.extend(accumulate(block.numRows for block in self.blocks[:-1]))
+
+        blockIndex = bisect_right(self.starts, row) - 1
+        return blockIndex, row - self.starts[blockIndex]
+
+
+    def _insertEmptyRows(self, block: RowBlock, localRow: int, count: int) -> None:
+        """
+        Insert count empty rows into block so the first lands at localRow.
+        """
+
+        block.rowPtr[localRow + 1:localRow + 1] = array('q', [block.rowPtr[localRow]]) * count
+        block.rowSums[localRow:localRow] = array('d', [0]) * count
+        block.numRows += count
+
+
+    def _split(self, blockIndex: int) -> None:
+        """
+        Split a block that has too many rows or entries, repeatedly, until every piece is in bounds
+        or is a single row.
+        """
+
+        pending = [blockIndex]
+        while pending:
+            blockIndex = pending.pop()
+            block = self.blocks[blockIndex]
+            nnz = len(block.valA)
+
+            if block.numRows > 2 * BLOCK_ROWS:
+                at = block.numRows // 2
+            elif nnz > MAX_BLOCK_ENTRIES and block.numRows > 1:
+                # Split at the row boundary nearest the middle entry
+                at = min(max(bisect_left(block.rowPtr, nnz // 2), 1), block.numRows - 1)
+            else:
+                continue
+
+            offset = block.rowPtr[at]
+            tail = RowBlock(block.numRows - at, array('q', [ptr - offset for ptr in block.rowPtr[at:]]),
+                            block.colA[offset:], block.valA[offset:], block.rowSums[at:])
+
+            block.numRows = at
+            del block.rowPtr[at + 1:]
+            del block.colA[offset:]
+            del block.valA[offset:]
+            del block.rowSums[at:]
+
+            self.blocks.insert(blockIndex + 1, tail)
+            self.starts = None
+
+            # Later blocks first, so splitting them does not move blockIndex
+            pending.append(blockIndex)
+            pending.append(blockIndex + 1)
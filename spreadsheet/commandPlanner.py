@@ -0,0 +1,66 @@
+# ------------------------------------------------------------------------
+# Command planner for the file-based driver.
+# Parses command lines and groups runs of consecutive commands that can be
+# executed as one bulk operation: AR -> appendRows(k), AC -> appendCols(k),
+# IR i -> insertRows(i, k), IC i -> insertCols(i, k) and U -> updateMany().
+# ------------------------------------------------------------------------
+
+# Commands whose consecutive runs are batched. IR/IC runs also need the same index.
+BATCHED = {'AR', 'AC', 'IR', 'IC', 'U'}
+
+
+def parseCommand(line: str) -> (str, tuple):
+    """
+    Split a command line into its upper-cased command and typed arguments.
+    Unknown commands keep the whole line as their only argument.
+
+    @return (command, args), or None for a blank line.
+    """
+
+    commandValues = line.split()
+    if not commandValues:
+        return None
+
+    command = commandValues[0].upper()
+    if command in ('AR', 'AC', 'R', 'C', 'E'):
+        return command, ()
+    if command in ('IR', 'IC'):
+        return command, (int(commandValues[1]),)
+    if command == 'U':
+        return command, (int(commandValues[1]), int(commandValues[2]), float(commandValues[3]))
+    if command in ('F', 'FG'):
+        return command, (float(commandValues[1]),)
+    if command == 'FR':
+        return command, (float(commandValues[1]), float(commandValues[2]))
+
+    return command, (line,)
+
+
+def planCommands(lines) -> (str, [tuple]):
+    """
+    Group consecutive compatible commands.
+
+    @param lines Iterable of command lines, e.g. an open command file.
+
+    @return Generator of (command, batch) where batch is the list of args of each grouped command, in order.
+    """
+
+    command = None
+    batch = []
+    for line in lines:
+        parsed = parseCommand(line)
+        if parsed is None:
+            continue
+
+        nextCommand, args = parsed
+        if batch and nextCommand == command and command in BATCHED and (command not in ('IR', 'IC') or args == batch[0]):
+            batch.append(args)
+            continue
+
+        if batch:
+            yield command, batch
+        command = nextCommand
+        batch = [args]
+
+    if batch:
+        yield command, batch
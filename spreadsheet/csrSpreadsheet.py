@@ -1,5 +1,13 @@
 from spreadsheet.baseSpreadsheet import BaseSpreadsheet
 from spreadsheet.cell import Cell
+from spreadsheet.loader import cellsToColumns, expandRowPointers
+from spreadsheet.snapshot import readSnapshot, writeSnapshot
+from spreadsheet.instrumentation import counters
+from spreadsheet.fenwickTree import FenwickTree
+from bisect import bisect_left, bisect_right
+from array import array
+from itertools import accumulate, groupby, islice
+from operator import add, itemgetter, lt, sub
 
 # ------------------------------------------------------------------------
 # This class is required TO BE IMPLEMENTED
@@ -9,6 +17,10 @@ from spreadsheet.cell import Cell
 # __copyright__ = 'Copyright 2023, RMIT University'
 # ------------------------------------------------------------------------
 
+# updateMany() merges a batch in one O(nnz) pass once it adds this many new cells.  Below that,
+# each new cell's array insert is cheaper than rewriting every entry
+MERGE_MIN_INSERTS = 32
+
 
 
 
@@ -18,9 +30,34 @@ class CSRSpreadsheet(BaseSpreadsheet):
         self.numRows = 0
         self.numColumns = 0
         
-        self.colA: list = []
-        self.valA: list = []
-        self.sumA: list = [0]
+        # Typed contiguous buffers (8 bytes per entry) rather than lists of boxed ints/floats
+        self.colA: array = array('q')
+        self.valA: array = array('d')
+
+        # Sum of each row, plus a Fenwick tree over them for O(log rows) range sums.  The tree
+        # is dropped when rows are inserted and rebuilt by the next range query
+        self.rowSums: array = array('d')
+        self.sumTree: FenwickTree = None
+
+        # Row pointers: the entries of row i live in colA/valA[rowA[i]:rowA[i + 1]]
+        self.rowA: array = array('q', [0])
+
+        # True while the arrays above are read-only memoryviews over a snapshot mapped by load()
+        self.mapped = False
+        self.snapshotBuffer = None
+
+        # Column inserts not yet applied to colA, as (colIndex, count) in order.  They are applied
+        # in one pass the next time colA is read, so a run of insertCol() costs O(nnz) once
+        self.pendingCols = []
+
+        # Rows that gained a cell through update() since rowA was last rewritten, one entry per new cell.
+        # rowShift counts them per row so update() can still find row bounds in O(log rows), and the
+        # next read folds them into rowA in one O(rows) pass
+        self.pendingRows = []
+        self.rowShift: FenwickTree = None
+
+        # Column-major mirror (colPtr, rowIdx, vals) built on demand by cscArrays(), dropped on any change
+        self.csc = None
 
 
     def buildSpreadsheet(self, lCells: [Cell]) -> None:
@@ -28,31 +65,56 @@ class CSRSpreadsheet(BaseSpreadsheet):
         Construct the data structure to store nodes.
         @param lCells: list of cells to be stored
         """
-        
-        self.numRows = max((cell.row for cell in lCells)) + 1
-        self.numColumns = max((cell.col for cell in lCells)) + 1
-        
-        # Sort in order of what order they'll be in valA
-        lCells.sort(key = lambda x: x.row * self.numColumns + self.numColumns)
-        
-        currSum = 0
 
-        for cell in lCells:
-            self.valA.append(cell.val)
-            self.colA.append(cell.col)
-            
-            # First create sumA entries
-            for i in range(len(self.sumA) - 1, cell.row + 1):
-                self.sumA.append(self.sumA[-1])
+        self.buildFromArrays(*cellsToColumns(lCells))
+
+
+    def buildFromArrays(self, rows: array, cols: array, vals: array) -> None:
+        """
+        Construct the data structure from parallel row, column and value arrays.
+        """
+
+        self.mapped = False
+        self.snapshotBuffer = None
+        self.pendingCols = []
+        self.pendingRows = []
+        self.rowShift = None
+        self.csc = None
+
+        self.numRows = max(rows) + 1
+        self.numColumns = max(cols) + 1
 
-            # Then add this cell to all applicable sumA entries
-            for i in range(cell.row + 1, len(self.sumA)):
-                self.sumA[i] += cell.val
+        # One integer key per cell orders cells by (row, col)
+        numColumns = self.numColumns
+        keys = [row * numColumns + col for row, col in zip(rows, cols)]
+
+        # Data files are usually written in row-major order already, so only sort when needed
+        if all(map(lt, keys, islice(keys, 1, None))):
+            self.colA = array('q', cols)
+            self.valA = array('d', vals)
+        else:
+            # Stable sort, so when a (row, col) repeats the last cell in the input wins
+            order = sorted(range(len(keys)), key = keys.__getitem__)
+            unique = [i for i, j in zip(order, islice(order, 1, None)) if keys[i] != keys[j]]
+            unique.append(order[-1])
 
+            rows = [rows[i] for i in unique]
+            self.colA = array('q', [cols[i] for i in unique])
+            self.valA = array('d', [vals[i] for i in unique])
 
+        # Count and sum each row in one pass, then prefix the counts into rowA
+        counts = [0] * (self.numRows + 1)
+        sums = array('d', [0]) * self.numRows
+        for row, val in zip(rows, self.valA):
+            counts[row + 1] += 1
+            sums[row] += val
 
-        # TO BE IMPLEMENTED
-        pass
+        self.rowA = array('q', accumulate(counts))
+        self.rowSums = sums
+        self.sumTree = None
+
+        if self.indexes:
+            self._notifyBuild()
 
 
     def appendRow(self) -> bool:
@@ -62,10 +124,7 @@ class CSRSpreadsheet(BaseSpreadsheet):
         @return True if operation was successful, or False if not.
         """
 
-        self.numRows += 1
-        self.sumA.append(self.sumA[-1])
-        
-        return True
+        return self.appendRows(1)
 
 
     def appendCol(self) -> bool:
@@ -75,10 +134,43 @@ class CSRSpreadsheet(BaseSpreadsheet):
         @return True if operation was successful, or False if not.
         """
 
-        self.numColumns += 1
-        
+        return self.appendCols(1)
+
+
+    def appendRows(self, count: int) -> bool:
+        """
+        Appends count empty rows to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        if self.mapped:
+            self._ensureWritable()
+        if self.pendingRows:
+            self._applyPendingRows()
+
+        self.csc = None
+        self.sumTree = None
+        self.numRows += count
+        self.rowSums.extend(array('d', [0]) * count)
+        self.rowA.extend(array('q', [self.rowA[-1]]) * count)
+
+        return True
+
+
+    def appendCols(self, count: int) -> bool:
+        """
+        Appends count empty columns to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        self.csc = None
+        self.numColumns += count
+
         return True
 
+
     def insertRow(self, rowIndex: int) -> bool:
         """
         Inserts an empty row into the spreadsheet.
@@ -88,14 +180,36 @@ class CSRSpreadsheet(BaseSpreadsheet):
         @return True if operation was successful, or False if not, e.g., rowIndex is invalid.
         """
         
+        return self.insertRows(rowIndex, 1)
+
+
+    def insertRows(self, rowIndex: int, count: int) -> bool:
+        """
+        Inserts count empty rows after rowIndex, as count calls to insertRow(rowIndex) would.
+
+        @return True if operation was successful, or False if not, e.g., rowIndex is invalid.
+        """
+
         # Description is confusing, do I do it after or before index?
         # I'm going to do it after because that's what the document says
         
         if rowIndex < -1 or rowIndex >= self.numRows:
             return False
-        
-        self.numRows += 1
-        self.sumA.insert(rowIndex + 2, self.sumA[rowIndex + 1])
+
+        if self.mapped:
+            self._ensureWritable()
+        if self.pendingRows:
+            self._applyPendingRows()
+
+        self.csc = None
+        self.sumTree = None
+        self.numRows += count
+        self.rowSums[rowIndex + 1:rowIndex + 1] = array('d', [0]) * count
+        self.rowA[rowIndex + 2:rowIndex + 2] = array('q', [self.rowA[rowIndex + 1]]) * count
+
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertRow(rowIndex + 1)
 
         return True
 
@@ -109,16 +223,29 @@ class CSRSpreadsheet(BaseSpreadsheet):
         return True if operation was successful, or False if not, e.g., colIndex is invalid.
         """
         
+        return self.insertCols(colIndex, 1)
+
+
+    def insertCols(self, colIndex: int, count: int) -> bool:
+        """
+        Inserts count empty columns after colIndex, as count calls to insertCol(colIndex) would.
+
+        @return True if operation was successful, or False if not, e.g., colIndex is invalid.
+        """
+
         # Inserts *after* index
 
         if colIndex < -1 or colIndex >= self.numColumns:
             return False
-        
-        for i , column in enumerate(self.colA):
-            if column > colIndex:
-                self.colA[i] += 1
-        
-        self.numColumns += 1
+
+        # Defer rewriting colA until it is next read
+        self.pendingCols.append((colIndex, count))
+        self.csc = None
+        self.numColumns += count
+
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertCol(colIndex + 1)
 
         return True
 
@@ -138,54 +265,139 @@ class CSRSpreadsheet(BaseSpreadsheet):
         if rowIndex >= self.numRows or colIndex >= self.numColumns or rowIndex < 0 or colIndex < 0:
             return False
 
-        # First find index of valA to insert it in
-        replace = False
-        index: int = None
-
-        row = 0
-        sum = 0
-        for i, currVal in enumerate(self.valA):
-            column = self.colA[i]
-            
-            while round(sum, 4) == round(self.sumA[row + 1], 4):
-                row += 1
-            
-            # Got to the coordinates, and there is no value there
-            if row > rowIndex or (row == rowIndex and column > colIndex):
-                index = i
-                break
-
-            # Got to the coordinates, but there is already a value there
-            if row == rowIndex and column == colIndex:
-                index = i
-                replace = True
-                break
-            
-            sum += currVal
-        
-        
-        # If it got to the end without finding something, that means we're appending it at the end
-        if index is None:
-            index = len(self.valA)
+        if self.mapped:
+            self._ensureWritable()
+        if self.pendingCols:
+            self._applyPendingCols()
+        self.csc = None
 
-        
-        if not replace:
+        # Columns are sorted within a row, so binary search only this row's slice
+        start, end = self._rowBounds(rowIndex)
+        index = bisect_left(self.colA, colIndex, start, end)
+
+        if index < end and self.colA[index] == colIndex:
+            oldValue = self.valA[index]
+            diff = value - oldValue
+            self.valA[index] = value
+        else:
+            oldValue = None
+            diff = value
+            if counters.enabled:
+                counters.add('csr.update.elementsShifted', len(self.valA) - index)
             self.valA.insert(index, value)
             self.colA.insert(index, colIndex)
-            for i in range(rowIndex + 1, self.numRows + 1):
-                self.sumA[i] += value
-        else:
-            prevValue = self.valA[index]
-            self.valA[index] = value
-            for i in range(rowIndex + 1, self.numRows + 1):
-                self.sumA[i] += value - prevValue
- 
-        
 
-        # REPLACE WITH APPROPRIATE RETURN VALUE
+            # The later row pointers are shifted by the next read, not per new cell
+            if self.rowShift is None:
+                self.rowShift = FenwickTree.zeros(self.numRows)
+            self.rowShift.add(rowIndex, 1)
+            self.pendingRows.append(rowIndex)
+
+        self.rowSums[rowIndex] += diff
+        if self.sumTree is not None:
+            self.sumTree.add(rowIndex, diff)
+
+        if self.indexes:
+            self._notifyUpdate(rowIndex, colIndex, oldValue, value)
+
         return True
 
 
+    def updateMany(self, updates: [(int, int, float)]) -> [bool]:
+        """
+        Applies a run of updates in order, as calls to update() would.  A batch that adds at least
+        MERGE_MIN_INSERTS new cells is merged into colA/valA in one pass and rebuilds rowA once;
+        smaller ones go through update() cell by cell.
+
+        @param updates List of (rowIndex, colIndex, value).
+
+        @return update()'s result for each entry of updates.
+        """
+
+        results = [0 <= rowIndex < self.numRows and 0 <= colIndex < self.numColumns for rowIndex, colIndex, value in updates]
+        valid = [update for update, result in zip(updates, results) if result]
+        if not valid:
+            return results
+
+        if self.mapped:
+            self._ensureWritable()
+        if self.pendingCols:
+            self._applyPendingCols()
+
+        # Changing existing cells and adding a few new ones is cheaper cell by cell than rewriting every entry
+        colA = self.colA
+        inserts = 0
+        for rowIndex, colIndex, value in valid:
+            start, end = self._rowBounds(rowIndex)
+            index = bisect_left(colA, colIndex, start, end)
+            if index == end or colA[index] != colIndex:
+                inserts += 1
+                if inserts >= MERGE_MIN_INSERTS:
+                    break
+        else:
+            return [self.update(rowIndex, colIndex, value) for rowIndex, colIndex, value in updates]
+
+        if self.pendingRows:
+            self._applyPendingRows()
+        self.csc = None
+
+        # Stable sort, then keep only the last update to each cell
+        valid.sort(key = itemgetter(0, 1))
+        valid = [update for update, after in zip(valid, valid[1:] + [None]) if after is None or after[:2] != update[:2]]
+
+        valA = self.valA
+        newColA = array('q')
+        newValA = array('d')
+
+        # Per-row change in entry count, offset by one like rowA
+        added = [0] * (self.numRows + 1)
+        rowSums = self.rowSums
+        sumTree = self.sumTree
+
+        copied = 0
+        for row, rowUpdates in groupby(valid, key = itemgetter(0)):
+            i = self.rowA[row]
+            end = self.rowA[row + 1]
+            for _, column, value in rowUpdates:
+                index = bisect_left(colA, column, i, end)
+
+                # Untouched entries are copied over in slices
+                newColA.extend(colA[copied:index])
+                newValA.extend(valA[copied:index])
+
+                if index < end and colA[index] == column:
+                    oldValue = valA[index]
+                    diff = value - oldValue
+                    index += 1
+                else:
+                    oldValue = None
+                    diff = value
+                    added[row + 1] += 1
+
+                rowSums[row] += diff
+                if sumTree is not None:
+                    sumTree.add(row, diff)
+
+                newColA.append(column)
+                newValA.append(value)
+                copied = i = index
+
+                if self.indexes:
+                    self._notifyUpdate(row, column, oldValue, value)
+
+        newColA.extend(colA[copied:])
+        newValA.extend(valA[copied:])
+
+        if counters.enabled:
+            counters.add('csr.updateMany.elementsCopied', len(newValA))
+
+        self.colA = newColA
+        self.valA = newValA
+        self.rowA = array('q', map(add, self.rowA, accumulate(added)))
+
+        return results
+
+
     def rowNum(self)->int:
         """
         @return Number of rows the spreadsheet has.
@@ -213,77 +425,351 @@ class CSRSpreadsheet(BaseSpreadsheet):
         @return List of cells (row, col) that contains the input value.
 	    """
 
-        result: list[tuple[int, int]] = []
+        if self.valueIndex is not None:
+            return self.valueIndex.find(value)
 
-        row = 0
-        sum = 0
-        for i, currVal in enumerate(self.valA):
-            column = self.colA[i]
-            
-            while round(sum, 4) == round(self.sumA[row + 1], 4):
-                row += 1
-            
-            if currVal == value:
-                result.append((row, column))
+        self._applyPending()
 
-            sum += currVal
+        result: list[tuple[int, int]] = []
 
+        if self.mapped:
+            # Mapped snapshot views have no index(), so scan them directly
+            matches = [i for i, currVal in enumerate(self.valA) if currVal == value]
+        else:
+            # array.index scans the packed buffer in C, so only matches reach Python
+            matches = []
+            i = -1
+            while True:
+                try:
+                    i = self.valA.index(value, i + 1)
+                except ValueError:
+                    break
+                matches.append(i)
+
+        for i in matches:
+            # Rows can be empty, so take the last row starting at or before i
+            row = bisect_right(self.rowA, i) - 1
+            result.append((row, self.colA[i]))
 
-        # REPLACE WITH APPROPRIATE RETURN VALUE
         return result
 
 
 
 
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]:
+        """
+        @return The cells with values in rows [r0, r1) and columns [c0, c1), clipped to the sheet, in row-major order.
+            Each row's column span is found by bisecting its slice of colA.
+        """
+
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        self._applyPending()
+
+        result: list[Cell] = []
+
+        colA = self.colA
+        valA = self.valA
+        for row in range(r0, r1):
+            end = self.rowA[row + 1]
+            start = bisect_left(colA, c0, self.rowA[row], end)
+            end = bisect_left(colA, c1, start, end)
+            if start < end:
+                result.extend(Cell(row, column, val) for column, val in zip(colA[start:end], valA[start:end]))
+
+        return result
+
+
     def entries(self) -> [Cell]:
         """
         return a list of cells that have values (i.e., all non None cells).
         """
         
+        self._applyPending()
+
         result: list[Cell] = []
 
-        row = 0
-        sum = 0
-        for i, currVal in enumerate(self.valA):
-            column = self.colA[i]
-            
-            # If the sum matches, move on to the next row
-            # What about when the row reaches its sum before the end, because of negatives?
-            # Apparently we don't need to cover that case, according to Jeffrey Chan
-            while round(sum, 4) == round(self.sumA[row + 1], 4):
-                row += 1
-            
-            result.append(Cell(row, column, currVal))
-            sum += currVal
+        colA = self.colA
+        valA = self.valA
+        for row in range(self.numRows):
+            start = self.rowA[row]
+            end = self.rowA[row + 1]
+            if start == end:
+                continue
 
+            result.extend(Cell(row, column, val) for column, val in zip(colA[start:end], valA[start:end]))
 
         return result
 
 
+    def entriesArrays(self) -> (array, array, array):
+        """
+        @return (rows, cols, vals) parallel arrays of all non None cells, without allocating Cells.
+        """
+
+        self._applyPending()
+
+        return expandRowPointers(self.rowA), array('q', self.colA), array('d', self.valA)
+
+
+    def csrArrays(self) -> (array, array, array):
+        """
+        @return (rowA, colA, valA) themselves, not copies.  Treat them as read-only.
+        """
+
+        self._applyPending()
+
+        return self.rowA, self.colA, self.valA
+
+
+    def rowSum(self, rowIndex: int) -> float:
+        """
+        @return Sum of the values in row rowIndex, or 0 if the row does not exist.
+        """
+
+        if rowIndex < 0 or rowIndex >= self.numRows:
+            return 0.0
+
+        return self.rowSums[rowIndex]
+
+
+    def rowRangeSum(self, start: int, end: int) -> float:
+        """
+        @return Sum of the values in rows [start, end), in O(log rows).
+        """
+
+        start = max(start, 0)
+        end = min(end, self.numRows)
+        if start >= end:
+            return 0.0
+
+        if self.sumTree is None:
+            self.sumTree = FenwickTree(self.rowSums)
+
+        return self.sumTree.rangeSum(start, end)
+
+
+    def rangeSum(self, r0: int, c0: int, r1: int, c1: int) -> float:
+        """
+        @return Sum of the values in rows [r0, r1) and columns [c0, c1).  Whole-row windows use the row sum tree.
+        """
+
+        if c0 <= 0 and c1 >= self.numColumns > 0:
+            return self.rowRangeSum(r0, r1)
+
+        return super().rangeSum(r0, c0, r1, c1)
+
+
+    def cscArrays(self) -> (array, array, array):
+        """
+        Column-major (CSC) mirror of the cells, built on first use and kept until the spreadsheet changes.
+
+        @return (colPtr, rowIdx, vals): the entries of column j are rowIdx/vals[colPtr[j]:colPtr[j + 1]], in row order.
+            Treat them as read-only.
+        """
+
+        if self.csc is None:
+            self.csc = self._buildCsc()
+
+        return self.csc
+
+
+    def colEntries(self, colIndex: int) -> [Cell]:
+        """
+        @return The cells that have values in column colIndex, in row order.
+        """
+
+        if colIndex < 0 or colIndex >= self.numColumns:
+            return []
+
+        colPtr, rowIdx, vals = self.cscArrays()
+        start = colPtr[colIndex]
+        end = colPtr[colIndex + 1]
+
+        return [Cell(row, colIndex, val) for row, val in zip(rowIdx[start:end], vals[start:end])]
+
+
+    def findInCol(self, colIndex: int, value: float) -> [(int, int)]:
+        """
+        Find the cells of column colIndex that contain the value 'value'.
+
+        @return List of cells (row, col) that contain the input value, in row order.
+        """
+
+        if colIndex < 0 or colIndex >= self.numColumns:
+            return []
+
+        colPtr, rowIdx, vals = self.cscArrays()
+        start = colPtr[colIndex]
+        end = colPtr[colIndex + 1]
+
+        return [(row, colIndex) for row, val in zip(rowIdx[start:end], vals[start:end]) if val == value]
+
+
+    def save(self, path: str) -> None:
+        """
+        Write the spreadsheet to a binary snapshot file, straight from the CSR arrays.
+        """
+
+        self._applyPending()
+
+        # The snapshot stores cumulative row sums
+        sumA = array('d', accumulate(self.rowSums, initial=0.0))
+        writeSnapshot(path, self.numRows, self.numColumns, self.rowA, sumA, self.colA, self.valA)
+
+
+    def load(self, path: str, mapped: bool = True) -> None:
+        """
+        Replace the contents of the spreadsheet with a snapshot written by save().
+
+        @param mapped If True, memory-map the snapshot and use it in place, so loading costs no copying or parsing.
+            The arrays are copied out of the mapping on the first change to the spreadsheet.
+        """
+
+        snapshot = readSnapshot(path, mapped)
+
+        self.numRows = snapshot.numRows
+        self.numColumns = snapshot.numColumns
+        self.rowA = snapshot.rowPtr
+        self.rowSums = array('d', map(sub, islice(snapshot.sumA, 1, None), snapshot.sumA))
+        self.sumTree = None
+        self.colA = snapshot.colIdx
+        self.valA = snapshot.vals
+        self.snapshotBuffer = snapshot.buffer
+        self.mapped = snapshot.buffer is not None
+        self.pendingCols = []
+        self.pendingRows = []
+        self.rowShift = None
+        self.csc = None
+
+        if self.indexes:
+            self._notifyBuild()
+
+
+    def _ensureWritable(self) -> None:
+        """
+        Copy mapped snapshot views into arrays so they can be changed.
+        """
+
+        for name, typecode in (('rowA', 'q'), ('colA', 'q'), ('valA', 'd')):
+            copied = array(typecode)
+            copied.frombytes(getattr(self, name).cast('B'))
+            setattr(self, name, copied)
+
+        self.mapped = False
+        self.snapshotBuffer = None
+
+
+    def _applyPending(self) -> None:
+        """
+        Bring rowA and colA up to date before they are read.
+        """
+
+        if self.pendingCols:
+            self._applyPendingCols()
+        if self.pendingRows:
+            self._applyPendingRows()
+
+
+    def _rowBounds(self, rowIndex: int) -> (int, int):
+        """
+        @return Start and end of row rowIndex in colA/valA, counting cells added since rowA was last rewritten.
+        """
+
+        start = self.rowA[rowIndex]
+        end = self.rowA[rowIndex + 1]
+        if self.rowShift is not None:
+            start += int(self.rowShift.prefixSum(rowIndex))
+            end += int(self.rowShift.prefixSum(rowIndex + 1))
+
+        return start, end
+
+
+    def _applyPendingRows(self) -> None:
+        """
+        Shift the row pointers for every cell update() added since rowA was last rewritten, in one pass.
+        """
+
+        added = [0] * (self.numRows + 1)
+        for rowIndex in self.pendingRows:
+            added[rowIndex + 1] += 1
+
+        self.rowA = array('q', map(add, self.rowA, accumulate(added)))
+        self.pendingRows = []
+        self.rowShift = None
+
+
+    def _applyPendingCols(self) -> None:
+        """
+        Rewrite colA for all deferred column inserts at once, through an old to new column mapping.
+        """
+
+        if self.mapped:
+            self._ensureWritable()
+
+        # Columns before the pending inserts, then shift them by each insert in turn
+        inserted = sum(count for colIndex, count in self.pendingCols)
+        mapping = list(range(self.numColumns - inserted))
+        for colIndex, count in self.pendingCols:
+            # mapping is increasing, so only the columns after the first shifted one move
+            start = bisect_right(mapping, colIndex)
+            mapping[start:] = [column + count for column in mapping[start:]]
+
+        if counters.enabled:
+            counters.add('csr.insertCol.entriesRewritten', len(self.colA))
+
+        self.colA = array('q', map(mapping.__getitem__, self.colA))
+        self.pendingCols = []
+
+
+    def _buildCsc(self) -> (array, array, array):
+        """
+        Transpose the CSR arrays into (colPtr, rowIdx, vals).
+        """
+
+        rowA, colA, valA = self.csrArrays()
+
+        counts = [0] * (self.numColumns + 1)
+        for column in colA:
+            counts[column + 1] += 1
+
+        colPtr = array('q', accumulate(counts))
+
+        # Counting sort: each cell goes to the next free slot of its column.  Cells are visited in
+        # row order, so every column's rows come out sorted
+        nextSlot = colPtr.tolist()
+        rowIdx = array('q', bytes(8 * len(colA)))
+        vals = array('d', bytes(8 * len(colA)))
+        for row, column, val in zip(expandRowPointers(rowA), colA, valA):
+            slot = nextSlot[column]
+            rowIdx[slot] = row
+            vals[slot] = val
+            nextSlot[column] = slot + 1
+
+        if counters.enabled:
+            counters.add('csr.csc.entriesBuilt', len(colA))
+
+        return colPtr, rowIdx, vals
+
+
     def debug(self) -> None:
-        print(f'colA: {self.colA}')
-        print(f'valA: {self.valA}')
-        print(f'sumA: {self.sumA}')
+        self._applyPending()
+
+        print(f'colA: {self.colA.tolist()}')
+        print(f'valA: {self.valA.tolist()}')
+        print(f'rowSums: {self.rowSums.tolist()}')
+        print(f'rowA: {self.rowA.tolist()}')
         print(f'numRows: {self.numRows}')
         print(f'numColumns: {self.numColumns}')
 
     def toList(self) -> [list]:
+        self._applyPending()
+
         # All zero list with the right size
         outputList = [[0 for i in range(self.numColumns)] for i in range(self.numRows)]
 
-        row = 0
-        sum = 0
-        for i, currVal in enumerate(self.valA):
-            column = self.colA[i]
-            
-            # If the sum matches, move on to the next row
-            # What about when the row reaches its sum before the end, because of negatives?
-            # Apparently we don't need to cover that case, according to Jeffrey Chan
-            while round(sum, 4) == round(self.sumA[row + 1], 4):
-                row += 1
-            
-            outputList[row][column] = currVal
-            sum += currVal
+        for row in range(self.numRows):
+            for i in range(self.rowA[row], self.rowA[row + 1]):
+                outputList[row][self.colA[i]] = self.valA[i]
         
         return outputList
 
@@ -0,0 +1,76 @@
+from array import array
+
+
+# ------------------------------------------------------------------------
+# Fenwick (binary indexed) tree over an array of floats.
+# Point add and prefix sum are both O(log n). Building from a sequence
+# is O(n).
+# ------------------------------------------------------------------------
+
+class FenwickTree:
+
+    def __init__(self, values=()):
+        # tree[i] (1-based) holds the sum of values (i - lowbit(i), i]
+        tree = array('d', [0.0])
+        tree.extend(values)
+        size = len(tree) - 1
+
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+
+        self.tree: array = tree
+        self.size = size
+
+
+    @classmethod
+    def zeros(cls, size: int) -> 'FenwickTree':
+        """
+        @return A tree over size zeros, allocated in one block without the build loop.
+        """
+
+        tree = cls()
+        tree.tree = array('d', bytes(8 * (size + 1)))
+        tree.size = size
+
+        return tree
+
+
+    def __len__(self) -> int:
+        return self.size
+
+
+    def add(self, index: int, delta: float) -> None:
+        """
+        Add delta to the value at index (0-based).
+        """
+
+        tree = self.tree
+        i = index + 1
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+
+    def prefixSum(self, count: int) -> float:
+        """
+        @return Sum of the first count values.
+        """
+
+        tree = self.tree
+        total = 0.0
+        i = min(count, self.size)
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+
+        return total
+
+
+    def rangeSum(self, start: int, end: int) -> float:
+        """
+        @return Sum of the values in [start, end).
+        """
+
+        return self.prefixSum(end) - self.prefixSum(start)
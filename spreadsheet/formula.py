@@ -0,0 +1,794 @@
+import re
+from array import array
+from collections import deque
+
+from spreadsheet.cell import Cell
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+
+
+# ------------------------------------------------------------------------
+# Formula cells.
+#
+# A formula such as '=SUM(A1:B10) * 2 + C3' is parsed once into a small
+# expression tree. References use A1 notation: column letters then a
+# 1-based row, so A1 is (0, 0). Supported: numbers, references,
+# + - * / and unary minus, parentheses, and the functions SUM, MIN, MAX,
+# AVERAGE and COUNT over references and ranges.
+#
+# FormulaGraph holds the formulas and the dependency graph between them.
+# It is registered on a backend through addIndex(), so row and column
+# inserts rewrite references. FormulaSpreadsheet wraps a backend. After
+# every change it recomputes only the formulas downstream of the changed
+# cells, in topological order, and stores their results as ordinary cell
+# values.
+#
+# Range references and formula positions are bucketed by TILE_SIZE square
+# tiles, so finding the formulas that read a cell, or the formulas inside
+# a range, only looks at the tiles involved.
+# ------------------------------------------------------------------------
+
+FUNCTIONS = {'SUM', 'MIN', 'MAX', 'AVERAGE', 'COUNT'}
+
+TOKEN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)|([A-Za-z]+\d+(?::[A-Za-z]+\d+)?)|([A-Za-z]+)\s*\(|(\S))')
+REFERENCE = re.compile(r'([A-Za-z]+)(\d+)')
+
+# Side of the square tiles that range references and formula positions are bucketed by
+TILE_SIZE = 64
+
+# Binding strength of the binary operators, for parsing and for printing with minimal parentheses
+PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+UNARY_PRECEDENCE = 3
+
+
+class FormulaError(ValueError):
+    '''
+    Raised for formula text that cannot be parsed.
+    '''
+
+
+class EvaluationError(FormulaError):
+    '''
+    Raised while evaluating a formula, e.g. on division by zero.  FormulaSpreadsheet records it in errors.
+    '''
+
+
+
+
+def columnIndex(letters: str) -> int:
+    """
+    @return 0-based column of A1-style column letters: A -> 0, Z -> 25, AA -> 26.
+    """
+
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - ord('A') + 1
+
+    return index - 1
+
+
+def columnLetters(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+
+    return letters
+
+
+def parseReference(text: str) -> (int, int):
+    """
+    @return (row, col) of an A1-style reference.
+    """
+
+    match = REFERENCE.fullmatch(text)
+    row = int(match.group(2)) - 1
+    if row < 0:
+        raise FormulaError('Row numbers start at 1: ' + text)
+
+    return row, columnIndex(match.group(1))
+
+
+class Formula:
+    '''
+    A parsed formula.  Nodes are tuples:
+    ('num', value), ('ref', row, col), ('range', r0, c0, r1, c1) for the half-open rectangle [r0, r1) x [c0, c1),
+    ('neg', node), ('bin', op, left, right) and ('call', name, [args]).
+    '''
+
+    __slots__ = ('tree',)
+
+    def __init__(self, tree: tuple):
+        self.tree = tree
+
+
+    def references(self) -> [(int, int, int, int)]:
+        """
+        @return Every cell or range the formula reads, as half-open rectangles (r0, c0, r1, c1).
+        """
+
+        result = []
+        stack = [self.tree]
+        while stack:
+            node = stack.pop()
+            kind = node[0]
+            if kind == 'ref':
+                result.append((node[1], node[2], node[1] + 1, node[2] + 1))
+            elif kind == 'range':
+                result.append(node[1:])
+            elif kind == 'neg':
+                stack.append(node[1])
+            elif kind == 'bin':
+                stack.extend(node[2:])
+            elif kind == 'call':
+                stack.extend(node[2])
+
+        return result
+
+
+    def shifted(self, axis: int, position: int) -> 'Formula':
+        """
+        @return This formula after an empty row (axis 0) or column (axis 1) is inserted at position.
+            References at or after it move by one, and ranges that span it grow by one.
+        """
+
+        def shift(node):
+            kind = node[0]
+            if kind == 'ref':
+                coords = list(node[1:])
+                if coords[axis] >= position:
+                    coords[axis] += 1
+                return ('ref',) + tuple(coords)
+            if kind == 'range':
+                coords = list(node[1:])
+                if coords[axis] >= position:
+                    coords[axis] += 1
+                    coords[axis + 2] += 1
+                elif coords[axis + 2] > position:
+                    coords[axis + 2] += 1
+                return ('range',) + tuple(coords)
+            if kind == 'neg':
+                return ('neg', shift(node[1]))
+            if kind == 'bin':
+                return ('bin', node[1], shift(node[2]), shift(node[3]))
+            if kind == 'call':
+                return ('call', node[1], [shift(arg) for arg in node[2]])
+            return node
+
+        return Formula(shift(self.tree))
+
+
+    def text(self) -> str:
+        """
+        @return The formula in A1 notation, starting with '='.
+        """
+
+        return '=' + _format(self.tree, 0)
+
+
+
+
+def parseFormula(text: str) -> Formula:
+    """
+    Parse formula text, with or without the leading '='.
+
+    @raise FormulaError If the text is not a valid formula.
+    """
+
+    text = text.strip()
+    if text.startswith('='):
+        text = text[1:]
+
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None:
+            break
+        number, reference, function, symbol = match.groups()
+        if number is not None:
+            tokens.append(('num', float(number)))
+        elif reference is not None:
+            tokens.append(('ref', reference))
+        elif function is not None:
+            if function.upper() not in FUNCTIONS:
+                raise FormulaError('Unknown function: ' + function)
+            tokens.append(('call', function.upper()))
+        else:
+            tokens.append(('sym', symbol))
+        position = match.end()
+
+    parser = _Parser(tokens)
+    tree = parser.expression(0)
+    if parser.position != len(tokens):
+        raise FormulaError('Unexpected input in formula: ' + text)
+
+    return Formula(tree)
+
+
+class _Parser:
+    '''
+    Precedence climbing over the token list.
+    '''
+
+    def __init__(self, tokens: list):
+        self.tokens = tokens
+        self.position = 0
+
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+
+    def take(self):
+        token = self.peek()
+        if token[0] is None:
+            raise FormulaError('Formula ends too early')
+        self.position += 1
+        return token
+
+
+    def expect(self, symbol: str) -> None:
+        if self.take() != ('sym', symbol):
+            raise FormulaError('Expected ' + symbol)
+
+
+    def expression(self, minPrecedence: int) -> tuple:
+        left = self.unary()
+        while True:
+            kind, value = self.peek()
+            if kind != 'sym' or value not in PRECEDENCE or PRECEDENCE[value] < minPrecedence:
+                return left
+            self.position += 1
+            # Left associative: the right operand only takes tighter operators
+            right = self.expression(PRECEDENCE[value] + 1)
+            left = ('bin', value, left, right)
+
+
+    def unary(self) -> tuple:
+        kind, value = self.peek()
+        if (kind, value) == ('sym', '-'):
+            self.position += 1
+            return ('neg', self.unary())
+        if (kind, value) == ('sym', '+'):
+            self.position += 1
+            return self.unary()
+        return self.primary()
+
+
+    def primary(self) -> tuple:
+        kind, value = self.take()
+        if kind == 'num':
+            return ('num', value)
+        if kind == 'ref':
+            if ':' in value:
+                raise FormulaError('Ranges are only allowed as function arguments: ' + value)
+            return ('ref',) + parseReference(value)
+        if kind == 'call':
+            args = []
+            if self.peek() != ('sym', ')'):
+                while True:
+                    args.append(self.argument())
+                    if self.peek() != ('sym', ','):
+                        break
+                    self.position += 1
+            self.expect(')')
+            return ('call', value, args)
+        if (kind, value) == ('sym', '('):
+            node = self.expression(0)
+            self.expect(')')
+            return node
+
+        raise FormulaError('Unexpected ' + str(value))
+
+
+    def argument(self) -> tuple:
+        kind, value = self.peek()
+        if kind == 'ref' and ':' in value:
+            self.position += 1
+            first, last = value.split(':')
+            r0, c0 = parseReference(first)
+            r1, c1 = parseReference(last)
+            return ('range', min(r0, r1), min(c0, c1), max(r0, r1) + 1, max(c0, c1) + 1)
+        return self.expression(0)
+
+
+def _format(node: tuple, parentPrecedence: int) -> str:
+    kind = node[0]
+    if kind == 'num':
+        return repr(node[1]) if node[1] != int(node[1]) else str(int(node[1]))
+    if kind == 'ref':
+        return columnLetters(node[2]) + str(node[1] + 1)
+    if kind == 'range':
+        r0, c0, r1, c1 = node[1:]
+        return columnLetters(c0) + str(r0 + 1) + ':' + columnLetters(c1 - 1) + str(r1)
+    if kind == 'neg':
+        return '-' + _format(node[1], UNARY_PRECEDENCE)
+    if kind == 'call':
+        return node[1] + '(' + ', '.join(_format(arg, 0) for arg in node[2]) + ')'
+
+    precedence = PRECEDENCE[node[1]]
+    text = _format(node[2], precedence) + ' ' + node[1] + ' ' + _format(node[3], precedence + 1)
+    return '(' + text + ')' if precedence < parentPrecedence else text
+
+
+
+
+class FormulaGraph:
+    '''
+    Formulas by position, and which formulas read which cells.  Implements the index interface of
+    BaseSpreadsheet.addIndex(), so inserts on the backend rewrite references and positions.
+    '''
+
+    # A rebuild only marks every formula for recomputing
+    needsCells = False
+
+    def __init__(self):
+        self.formulas: dict = {}
+
+        # Reverse edges: cell -> formula positions reading it as a single reference, and
+        # tile -> (rect, formula position) for every range reference overlapping the tile
+        self.cellReaders: dict = {}
+        self.rangeReaders: dict = {}
+
+        # tile -> formula positions inside it
+        self.formulaTiles: dict = {}
+
+        # True after the backend was rebuilt under the formulas, until they are all recomputed
+        self.rebuilt = False
+
+
+    def clear(self) -> None:
+        self.__init__()
+
+
+    def get(self, position: (int, int)) -> Formula:
+        return self.formulas.get(position)
+
+
+    def set(self, position: (int, int), formula: Formula) -> bool:
+        """
+        Store a formula at position, unless it would make a cycle.
+
+        @return True if stored, False if the formula depends on its own cell.
+        """
+
+        if self.reaches(formula, position):
+            return False
+
+        self.remove(position)
+        self._add(position, formula)
+
+        return True
+
+
+    def remove(self, position: (int, int)) -> None:
+        formula = self.formulas.pop(position, None)
+        if formula is None:
+            return
+
+        _discard(self.formulaTiles, _tile(position), position)
+        for rect in set(formula.references()):
+            r0, c0, r1, c1 = rect
+            if r1 - r0 == 1 and c1 - c0 == 1:
+                _discard(self.cellReaders, (r0, c0), position)
+            else:
+                for tile in _tiles(rect):
+                    _discard(self.rangeReaders, tile, (rect, position))
+
+
+    def readers(self, position: (int, int)) -> set:
+        """
+        @return Positions of the formulas that read the cell at position.
+        """
+
+        row, col = position
+        result = set(self.cellReaders.get(position, ()))
+        for (r0, c0, r1, c1), reader in self.rangeReaders.get(_tile(position), ()):
+            if r0 <= row < r1 and c0 <= col < c1:
+                result.add(reader)
+
+        return result
+
+
+    def within(self, rect: (int, int, int, int)) -> [(int, int)]:
+        """
+        @return Positions of the formulas inside the half-open rectangle rect.
+        """
+
+        r0, c0, r1, c1 = rect
+        tiles = ((r1 - 1) // TILE_SIZE - r0 // TILE_SIZE + 1) * ((c1 - 1) // TILE_SIZE - c0 // TILE_SIZE + 1)
+        if tiles > len(self.formulaTiles):
+            # A range over more tiles than hold formulas: check the occupied tiles instead
+            candidates = (position for bucket in self.formulaTiles.values() for position in bucket)
+        else:
+            candidates = (position for tile in _tiles(rect) for position in self.formulaTiles.get(tile, ()))
+
+        return [(row, col) for row, col in candidates if r0 <= row < r1 and c0 <= col < c1]
+
+
+    def reaches(self, formula: Formula, target: (int, int)) -> bool:
+        """
+        @return True if formula reads target, directly or through other formulas.
+        """
+
+        pending = list(formula.references())
+        visited = set()
+        while pending:
+            rect = pending.pop()
+            r0, c0, r1, c1 = rect
+            if r0 <= target[0] < r1 and c0 <= target[1] < c1:
+                return True
+
+            for position in self.within(rect):
+                if position not in visited:
+                    visited.add(position)
+                    pending.extend(self.formulas[position].references())
+
+        return False
+
+
+    def downstream(self, changed) -> [(int, int)]:
+        """
+        @param changed Positions whose values changed.  Formula positions among them are included in the result.
+
+        @return Every formula affected by the changed cells, in an order where each comes after the formulas it reads.
+        """
+
+        # Formulas reachable from the changed cells
+        affected = {position for position in changed if position in self.formulas}
+        queue = deque(changed)
+        while queue:
+            for reader in self.readers(queue.popleft()):
+                if reader not in affected:
+                    affected.add(reader)
+                    queue.append(reader)
+
+        # Kahn's algorithm over the affected formulas
+        inDegree = dict.fromkeys(affected, 0)
+        edges = {}
+        for position in affected:
+            edges[position] = [reader for reader in self.readers(position) if reader in affected]
+            for reader in edges[position]:
+                inDegree[reader] += 1
+
+        order = []
+        queue = deque(sorted(position for position, degree in inDegree.items() if degree == 0))
+        while queue:
+            position = queue.popleft()
+            order.append(position)
+            for reader in edges[position]:
+                inDegree[reader] -= 1
+                if inDegree[reader] == 0:
+                    queue.append(reader)
+
+        if len(order) != len(affected):
+            # set() refuses cycles, so this only happens if the graph was corrupted
+            raise FormulaError('Cycle between formulas at ' + str(sorted(set(affected) - set(order))))
+
+        return order
+
+
+    # ----- index interface -----
+
+    def rebuild(self, lCells: [Cell]) -> None:
+        """
+        The backend was rebuilt, e.g. by an AdaptiveSpreadsheet migration.  The formulas stay, and the owner
+        recomputes them all after the operation that caused the rebuild.
+        """
+
+        self.rebuilt = True
+
+
+    def update(self, rowIndex: int, colIndex: int, oldValue: float, newValue: float) -> None:
+        pass
+
+
+    def insertRow(self, rowIndex: int) -> None:
+        self._shift(0, rowIndex)
+
+
+    def insertCol(self, colIndex: int) -> None:
+        self._shift(1, colIndex)
+
+
+    def _shift(self, axis: int, position: int) -> None:
+        """
+        Move formulas and references for a line inserted at position, rebuilding the reverse edges.
+        """
+
+        formulas = self.formulas
+        rebuilt = self.rebuilt
+        self.__init__()
+        self.rebuilt = rebuilt
+        for cell, formula in formulas.items():
+            cell = list(cell)
+            if cell[axis] >= position:
+                cell[axis] += 1
+            self._add(tuple(cell), formula.shifted(axis, position))
+
+
+    def _add(self, position: (int, int), formula: Formula) -> None:
+        self.formulas[position] = formula
+        self.formulaTiles.setdefault(_tile(position), set()).add(position)
+        for rect in set(formula.references()):
+            r0, c0, r1, c1 = rect
+            if r1 - r0 == 1 and c1 - c0 == 1:
+                self.cellReaders.setdefault((r0, c0), set()).add(position)
+            else:
+                for tile in _tiles(rect):
+                    self.rangeReaders.setdefault(tile, set()).add((rect, position))
+
+
+
+
+def _tile(position: (int, int)) -> (int, int):
+    return position[0] // TILE_SIZE, position[1] // TILE_SIZE
+
+
+def _tiles(rect: (int, int, int, int)):
+    """
+    Tiles overlapping the half-open rectangle rect.
+    """
+
+    r0, c0, r1, c1 = rect
+    for tileRow in range(r0 // TILE_SIZE, (r1 - 1) // TILE_SIZE + 1):
+        for tileCol in range(c0 // TILE_SIZE, (c1 - 1) // TILE_SIZE + 1):
+            yield tileRow, tileCol
+
+
+def _discard(buckets: dict, key, item) -> None:
+    bucket = buckets[key]
+    bucket.discard(item)
+    if not bucket:
+        del buckets[key]
+
+
+
+
+class FormulaSpreadsheet(BaseSpreadsheet):
+    '''
+    Wraps a backend and adds formula cells.  A formula's result is stored in the backend as the cell's value,
+    so find(), entries() and the aggregates see it like any other value.
+    '''
+
+    def __init__(self, spreadsheet: BaseSpreadsheet):
+        self.spreadsheet = spreadsheet
+        self.graph = FormulaGraph()
+        spreadsheet.addIndex(self.graph)
+
+        # position -> message for formulas that could not be evaluated, e.g. division by zero
+        self.errors: dict = {}
+
+
+    def setFormula(self, rowIndex: int, colIndex: int, text: str) -> bool:
+        """
+        Store a formula in a cell and compute it and everything downstream of it.
+
+        @return True if stored.  False if the cell does not exist or the formula would depend on its own cell.
+
+        @raise FormulaError If the text is not a valid formula.
+        """
+
+        if rowIndex < 0 or rowIndex >= self.rowNum() or colIndex < 0 or colIndex >= self.colNum():
+            return False
+
+        if not self.graph.set((rowIndex, colIndex), parseFormula(text)):
+            return False
+
+        self._recalculate([(rowIndex, colIndex)])
+        return True
+
+
+    def getFormula(self, rowIndex: int, colIndex: int) -> str:
+        """
+        @return The formula of a cell in A1 notation, or None if it holds a plain value.
+        """
+
+        formula = self.graph.get((rowIndex, colIndex))
+        return None if formula is None else formula.text()
+
+
+    def buildSpreadsheet(self, lCells: [Cell]):
+        """
+        Replace the whole sheet with plain values, dropping all formulas.
+        """
+
+        self.spreadsheet.buildSpreadsheet(lCells)
+        self.graph.clear()
+        self.errors = {}
+
+
+    def buildFromArrays(self, rows: array, cols: array, vals: array):
+        self.spreadsheet.buildFromArrays(rows, cols, vals)
+        self.graph.clear()
+        self.errors = {}
+
+
+    # Every call that reaches the backend is followed by _recalculate(), in case the backend was
+    # rebuilt under the formulas, e.g. by an AdaptiveSpreadsheet migration
+
+    def appendRow(self) -> bool:
+        return self.appendRows(1)
+
+
+    def appendCol(self) -> bool:
+        return self.appendCols(1)
+
+
+    def appendRows(self, count: int) -> bool:
+        result = self.spreadsheet.appendRows(count)
+        self._recalculate([])
+        return result
+
+
+    def appendCols(self, count: int) -> bool:
+        result = self.spreadsheet.appendCols(count)
+        self._recalculate([])
+        return result
+
+
+    # Inserted lines are empty, so no value changes.  The graph rewrites references through its index hooks
+
+    def insertRow(self, rowIndex: int) -> bool:
+        return self.insertRows(rowIndex, 1)
+
+
+    def insertCol(self, colIndex: int) -> bool:
+        return self.insertCols(colIndex, 1)
+
+
+    def insertRows(self, rowIndex: int, count: int) -> bool:
+        result = self.spreadsheet.insertRows(rowIndex, count)
+        self._recalculate([])
+        return result
+
+
+    def insertCols(self, colIndex: int, count: int) -> bool:
+        result = self.spreadsheet.insertCols(colIndex, count)
+        self._recalculate([])
+        return result
+
+
+    def update(self, rowIndex: int, colIndex: int, value: float) -> bool:
+        """
+        Set a plain value, replacing any formula in the cell, then recompute the formulas downstream of it.
+        """
+
+        return self.updateMany([(rowIndex, colIndex, value)])[0]
+
+
+    def updateMany(self, updates: [(int, int, float)]) -> [bool]:
+        results = self.spreadsheet.updateMany(updates)
+
+        changed = [(rowIndex, colIndex) for (rowIndex, colIndex, value), result in zip(updates, results) if result]
+        for position in changed:
+            self.graph.remove(position)
+            self.errors.pop(position, None)
+
+        self._recalculate(changed)
+        return results
+
+
+    def rowNum(self) -> int:
+        return self.spreadsheet.rowNum()
+
+
+    def colNum(self) -> int:
+        return self.spreadsheet.colNum()
+
+
+    def find(self, value: float) -> [(int, int)]:
+        result = self.spreadsheet.find(value)
+        self._recalculate([])
+        return result
+
+
+    def entries(self) -> [Cell]:
+        result = self.spreadsheet.entries()
+        self._recalculate([])
+        return result
+
+
+    def entriesArrays(self) -> (array, array, array):
+        result = self.spreadsheet.entriesArrays()
+        self._recalculate([])
+        return result
+
+
+    def csrArrays(self) -> (array, array, array):
+        return self.spreadsheet.csrArrays()
+
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]:
+        return self.spreadsheet.getRange(r0, c0, r1, c1)
+
+
+    def addIndex(self, index) -> None:
+        self.spreadsheet.addIndex(index)
+
+
+    def enableValueIndex(self) -> None:
+        self.spreadsheet.enableValueIndex()
+
+
+    def _recalculate(self, changed: [(int, int)]) -> None:
+        """
+        Recompute the formulas downstream of the changed cells, each after the formulas it reads.
+        After the backend was rebuilt, every formula is recomputed.
+        """
+
+        if self.graph.rebuilt:
+            self.graph.rebuilt = False
+            changed = list(changed) + list(self.graph.formulas)
+        if not changed:
+            return
+
+        for position in self.graph.downstream(changed):
+            try:
+                value = self._evaluate(self.graph.get(position).tree)
+            except EvaluationError as error:
+                # Keep the cell's last value, but remember that it is not current.  Formulas reading it fail too
+                self.errors[position] = str(error)
+                continue
+
+            self.errors.pop(position, None)
+            # Later formulas may read this one, so store it before evaluating them
+            self.spreadsheet.update(position[0], position[1], value)
+
+
+    def _evaluate(self, node: tuple) -> float:
+        kind = node[0]
+        if kind == 'num':
+            return node[1]
+        if kind == 'ref':
+            self._checkErrors(node[1], node[2], node[1] + 1, node[2] + 1)
+            cells = self.spreadsheet.getRange(node[1], node[2], node[1] + 1, node[2] + 1)
+            return cells[0].val if cells else 0.0
+        if kind == 'neg':
+            return -self._evaluate(node[1])
+        if kind == 'bin':
+            left = self._evaluate(node[2])
+            right = self._evaluate(node[3])
+            op = node[1]
+            if op == '+':
+                return left + right
+            if op == '-':
+                return left - right
+            if op == '*':
+                return left * right
+            if right == 0:
+                raise EvaluationError('division by zero')
+            return left / right
+
+        # Function call: ranges contribute their non-empty cells, other arguments their value
+        values = []
+        for arg in node[2]:
+            if arg[0] == 'range':
+                self._checkErrors(*arg[1:])
+                values.extend(cell.val for cell in self.spreadsheet.getRange(*arg[1:]))
+            else:
+                values.append(self._evaluate(arg))
+
+        name = node[1]
+        if name == 'SUM':
+            return float(sum(values))
+        if name == 'COUNT':
+            return float(len(values))
+        if name == 'AVERAGE':
+            if not values:
+                raise EvaluationError('AVERAGE of an empty range')
+            return sum(values) / len(values)
+        if not values:
+            return 0.0
+        return float(min(values) if name == 'MIN' else max(values))
+
+
+    def _checkErrors(self, r0: int, c0: int, r1: int, c1: int) -> None:
+        """
+        @raise EvaluationError If a cell in rows [r0, r1) and columns [c0, c1) holds a formula that failed.
+        """
+
+        for row, col in self.errors:
+            if r0 <= row < r1 and c0 <= col < c1:
+                raise EvaluationError('reads ' + columnLetters(col) + str(row + 1) + ', which has an error')
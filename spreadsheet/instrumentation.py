@@ -0,0 +1,118 @@
+import json
+import math
+from array import array
+from time import perf_counter_ns
+
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+
+
+# ------------------------------------------------------------------------
+# Opt-in instrumentation.
+#
+# InstrumentedSpreadsheet wraps any backend and records call counts and
+# latencies of every BaseSpreadsheet operation.  The backends also bump
+# named work counters (nodes traversed, elements shifted, rows touched)
+# through the module-level 'counters' object; each bump is guarded by
+# 'if counters.enabled', so the cost when disabled is one attribute test.
+# ------------------------------------------------------------------------
+
+class Counters:
+
+    def __init__(self):
+        self.enabled = False
+        self.values: dict = {}
+
+
+    def add(self, name: str, amount: int = 1) -> None:
+        self.values[name] = self.values.get(name, 0) + amount
+
+
+    def reset(self) -> None:
+        self.values = {}
+
+
+counters = Counters()
+
+
+def percentile(sortedValues, fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted sequence: the smallest value with at least
+    fraction of the values at or below it.
+    """
+
+    # Rounding away float noise first keeps e.g. 0.07 * 100 from ranking as 8
+    rank = math.ceil(round(fraction * len(sortedValues), 9))
+    index = min(len(sortedValues) - 1, max(0, rank - 1))
+    return sortedValues[index]
+
+
+def summarise(values) -> dict:
+    """
+    @return Count, mean, median, p95, p99 and max of latencies in ns, converted to microseconds.
+    """
+
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'mean_us': sum(values) / len(values) / 1000,
+        'median_us': percentile(values, 0.5) / 1000,
+        'p95_us': percentile(values, 0.95) / 1000,
+        'p99_us': percentile(values, 0.99) / 1000,
+        'max_us': values[-1] / 1000,
+    }
+
+
+# Public BaseSpreadsheet methods, all timed by InstrumentedSpreadsheet
+OPERATIONS = [name for name, member in vars(BaseSpreadsheet).items() if callable(member) and not name.startswith('_')]
+
+
+class InstrumentedSpreadsheet:
+    '''
+    Proxy around a spreadsheet that times each BaseSpreadsheet operation.
+    Anything else is passed straight through to the wrapped spreadsheet.
+    '''
+
+    def __init__(self, spreadsheet: BaseSpreadsheet):
+        self.spreadsheet = spreadsheet
+        self.latencies: dict = {}
+
+
+    def __getattr__(self, name):
+        return getattr(self.spreadsheet, name)
+
+
+    def stats(self) -> dict:
+        """
+        @return {'operations': {name: latency summary}, 'counters': {name: total}}.
+        """
+
+        return {
+            'operations': {name: summarise(values) for name, values in sorted(self.latencies.items())},
+            'counters': dict(sorted(counters.values.items())),
+        }
+
+
+    def dumpStats(self, outputFile) -> None:
+        json.dump(self.stats(), outputFile, indent=2)
+        outputFile.write('\n')
+
+
+def _timed(name: str):
+    def method(self, *args):
+        start = perf_counter_ns()
+        result = getattr(self.spreadsheet, name)(*args)
+        elapsed = perf_counter_ns() - start
+
+        latencies = self.latencies.get(name)
+        if latencies is None:
+            latencies = self.latencies[name] = array('q')
+        latencies.append(elapsed)
+
+        return result
+
+    method.__name__ = name
+    return method
+
+
+for _name in OPERATIONS:
+    setattr(InstrumentedSpreadsheet, _name, _timed(_name))
@@ -1,5 +1,9 @@
 from spreadsheet.baseSpreadsheet import BaseSpreadsheet
 from spreadsheet.cell import Cell
+from spreadsheet.loader import cellsToColumns
+from spreadsheet.instrumentation import counters
+from array import array
+from spreadsheet.blockList import BlockList
 from collections import namedtuple
 
 # Using "# type: ignore" because VSCode doesn't like python 3.6.8 style list type hints
@@ -9,6 +13,8 @@ class ListNode:
     Define a node in the linked list
     '''
 
+    __slots__ = ('prev', 'next', 'value')
+
     def __init__(self, prev, value=None, next=None):
         self.prev: ListNode = prev
         self.next: ListNode = next
@@ -24,48 +30,54 @@ class ListNode:
         self.value = value
                
     
-    # def walk(self, indent=0):
-    #         if isinstance(self.value, ListNode):
-    #             print("Value is node")
-    #             self.value.walk(indent + 1)
-    #         else:
-    #             print(f'{"   "*indent}{self.value}')
-
-    #         if self.next is not None:
-    #             self.next.walk(indent)
+    def iterate(self):
+        '''
+        Yield this node and every node after it, following next pointers
+        '''
+
+        curr = self
+        while curr is not None:
+            yield curr
+            curr = curr.next
+
+
+    def iterCells(self, row=0):
+        '''
+        Yield (row, col, value) for every cell of this row node and the rows after it.
+        Iterative, so it is not bounded by the recursion limit.
+        '''
+
+        for rowNode in self.iterate():
+            for col, node in enumerate(rowNode.value.head.iterate()):
+                yield row, col, node.value
+            row += 1
+
+
     def walk(self, indent=0):
-        if isinstance(self.value, dict):
-            self.value['head'].walk(indent + 1)
-            print()
-        else:
-            if self.value is None:
+        for node in self.iterate():
+            if isinstance(node.value, RowList):
+                node.value.head.walk(indent + 1)
+                print()
+            elif node.value is None:
                 print('_', end = ' ')
             else:
-                print(self.value, end=' ')
-    
-        if self.next is not None:
-            self.next.walk(indent)
+                print(node.value, end=' ')
     
 
-    def find(self, value, coords = (0, -1), outputList = None) -> [(int, int)]: # type: ignore
-        if outputList is None:
-            outputList = []
 
-        if isinstance(self.value, dict):
-            self.value['head'].find(value, (coords[0], coords[1] + 1), outputList)
-        else:
-            if value is None:
-                if self.value is not None:
-                    outputList.append(Cell(coords[0], coords[1], self.value))
-            elif self.value == value:
-                outputList.append((coords))
-        
-        if self.next is not None:
-            newCoords = (coords[0] + 1, coords[1]) if isinstance(self.value, dict) else (coords[0], coords[1] + 1)
-            self.next.find(value, newCoords, outputList)
-        
-        return outputList
-    
+
+class RowList:
+    '''
+    Value of a row node: the row's first and last cell nodes plus a positional index over its cells
+    '''
+
+    __slots__ = ('head', 'tail', 'cells')
+
+    def __init__(self, head: ListNode, tail: ListNode, cells: BlockList):
+        self.head = head
+        self.tail = tail
+        self.cells = cells
+
 
 
 
@@ -83,6 +95,9 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         self.head: ListNode = None
         self.tail: ListNode = None
 
+        # Positional index over the row nodes. Each row's value also holds a 'cells' index over its cell nodes
+        self.rows: BlockList = BlockList()
+
         self.numRows = 0
         self.numColumns = 0
 
@@ -92,12 +107,20 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         Construct the data structure to store nodes.
         @param lCells: list of cells to be stored
         """
+
+        self.buildFromArrays(*cellsToColumns(lCells))
+
+
+    def buildFromArrays(self, rows: array, cols: array, vals: array): # type: ignore
+        """
+        Construct the data structure from parallel row, column and value arrays.
+        """
         
         currRow: ListNode = None
         self.head = None
         
-        self.numRows = max((cell.row for cell in lCells)) + 1
-        self.numColumns = max((cell.col for cell in lCells)) + 1
+        self.numRows = max(rows) + 1
+        self.numColumns = max(cols) + 1
         
         for i in range(self.numRows):
             # Create a new row node
@@ -108,18 +131,18 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
                 currRow.setNext(newRow)
             currRow = newRow
 
-            # Create all the cells in the row
-            newRowHead, newRowTail = self._makeNewRow(self.numColumns)
-
-            # Point the row node to the row head
-            currRow.setValue({'head': newRowHead, 'tail': newRowTail})
+            # Create all the cells in the row, and point the row node to them
+            currRow.setValue(self._newRowValue(self.numColumns))
         
         self.tail = currRow
+        self.rows = BlockList(self.head.iterate())
         
 
-        for cell in lCells:
-            node = self._findByIndex(cell.row, cell.col)
-            node.setValue(cell.val)
+        for row, col, val in zip(rows, cols, vals):
+            self._findByIndex(row, col).setValue(val)
+
+        if self.indexes:
+            self._notifyBuild()
         
 
     def appendRow(self):
@@ -128,11 +151,11 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         """
         
         newTail = ListNode(self.tail)
-        newTailHead, newTailTail = self._makeNewRow(self.numColumns)
-        
-        newTail.setValue({'head': newTailHead, 'tail': newTailTail})
+        newTail.setValue(self._newRowValue(self.numColumns))
+
         self.tail.setNext(newTail)
         self.tail = newTail
+        self.rows.append(newTail)
         self.numRows += 1
         
         return True
@@ -148,10 +171,11 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         curr = self.head
 
         while curr is not None: # For each row
-            newNode = ListNode(curr.value['tail'])
+            newNode = ListNode(curr.value.tail)
             
-            curr.value['tail'].setNext(newNode)
-            curr.value['tail'] = newNode
+            curr.value.tail.setNext(newNode)
+            curr.value.tail = newNode
+            curr.value.cells.append(newNode)
             
             curr = curr.next
         
@@ -174,28 +198,27 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
             return False
         
         if rowIndex == -1:
-            newRowHead, newRowTail = self._makeNewRow(self.numColumns)
-            
-            newRow = ListNode(None, {'head': newRowHead, 'tail': newRowTail}, self.head)
+            newRow = ListNode(None, self._newRowValue(self.numColumns), self.head)
             self.head.setPrev(newRow)
             self.head = newRow
         else:
-            # Make new row
-            newRowHead, newRowTail = self._makeNewRow(self.numColumns)
-
             # Find location to insert
-            curr = self.head
-            for i in range(rowIndex):
-                curr = curr.next
+            curr = self.rows[rowIndex]
            
             # Insert row
-            newRow = ListNode(curr, {'head': newRowHead, 'tail': newRowTail}, curr.next)
+            newRow = ListNode(curr, self._newRowValue(self.numColumns), curr.next)
             if curr.next is not None:
                 curr.next.setPrev(newRow)
+            else:
+                self.tail = newRow
             curr.setNext(newRow)
         
+        self.rows.insert(rowIndex + 1, newRow)
         self.numRows += 1
 
+        if self.indexes:
+            self._notifyInsertRow(rowIndex + 1)
+
         return True
 
 
@@ -209,28 +232,35 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         if colIndex < -1 or colIndex >= self.numColumns:
             return False
 
+        if counters.enabled:
+            counters.add('linkedlist.insertCol.rowsTouched', self.numRows)
 
         curr = self.head
         while curr is not None: # For all rows
             if colIndex == -1:
-                newNode = ListNode(None, next=curr.value['head'])
-                curr.value['head'].setPrev(newNode)
-                curr.value['head'] = newNode
+                newNode = ListNode(None, next=curr.value.head)
+                curr.value.head.setPrev(newNode)
+                curr.value.head = newNode
             else:
                 # Find where to insert
-                currNode = curr.value['head']
-                for i in range(colIndex):
-                    currNode = currNode.next
+                currNode = curr.value.cells[colIndex]
                 
                 newNode = ListNode(currNode, next=currNode.next)
                 if currNode.next is not None:
                     currNode.next.setPrev(newNode)
+                else:
+                    curr.value.tail = newNode
                 currNode.setNext(newNode)
 
+            curr.value.cells.insert(colIndex + 1, newNode)
+
             curr = curr.next
         
         self.numColumns += 1
 
+        if self.indexes:
+            self._notifyInsertCol(colIndex + 1)
+
         return True
 
 
@@ -245,10 +275,12 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         @return True if cell can be updated.  False if cannot, e.g., row or column indices do not exist.
         """
 
-        if rowIndex < 0 or rowIndex >= self.numRows or colIndex < 0 or colIndex >= self.numRows:
+        if rowIndex < 0 or rowIndex >= self.numRows or colIndex < 0 or colIndex >= self.numColumns:
             return False
 
         node = self._findByIndex(rowIndex, colIndex)
+        if self.indexes:
+            self._notifyUpdate(rowIndex, colIndex, node.value, value)
         node.setValue(value)
 
         return True
@@ -259,7 +291,7 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         @return Number of rows the spreadsheet has.
         """
 
-        return self.numColumns
+        return self.numRows
 
 
     def colNum(self)->int:
@@ -267,7 +299,7 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         @return Number of column the spreadsheet has.
         """
 
-        return self.numRows
+        return self.numColumns
 
 
 
@@ -280,7 +312,10 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         @return List of cells (row, col) that contains the input value.
 	    """
 
-        return self.head.find(value)
+        if self.valueIndex is not None:
+            return self.valueIndex.find(value)
+
+        return [(row, col) for row, col, cellValue in self._iterCells() if cellValue == value]
 
 
 
@@ -289,7 +324,64 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         @return A list of cells that have values (i.e., all non None cells).
         """
 
-        return self.head.find(None)
+        return [Cell(row, col, cellValue) for row, col, cellValue in self._iterCells() if cellValue is not None]
+
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]: # type: ignore
+        """
+        @return The cells with values in rows [r0, r1) and columns [c0, c1), clipped to the sheet, in row-major order.
+            Positions the first row and column once, then walks the window.
+        """
+
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        if r0 >= r1 or c0 >= c1:
+            return []
+
+        result = []
+        rowNode = self.rows[r0]
+        for row in range(r0, r1):
+            node = rowNode.value.cells[c0]
+            for col in range(c0, c1):
+                if node.value is not None:
+                    result.append(Cell(row, col, node.value))
+                node = node.next
+            rowNode = rowNode.next
+
+        return result
+
+
+    def entriesArrays(self) -> (array, array, array): # type: ignore
+        """
+        @return (rows, cols, vals) parallel arrays of all non None cells, without allocating Cells.
+        """
+
+        rows = array('q')
+        cols = array('q')
+        vals = array('d')
+        for row, col, cellValue in self._iterCells():
+            if cellValue is not None:
+                rows.append(row)
+                cols.append(col)
+                vals.append(cellValue)
+
+        return rows, cols, vals
+
+
+    def _iterCells(self):
+        """
+        Stream (row, col, value) for every position in row-major order, including empty ones.
+        """
+
+        if self.head is None:
+            return iter(())
+
+        return self.head.iterCells()
+
+
+    def _newRowValue(self, length) -> 'RowList':
+        head, tail = self._makeNewRow(length)
+
+        return RowList(head, tail, BlockList(head.iterate()))
 
 
     def _makeNewRow(self, length):
@@ -311,15 +403,8 @@ class LinkedListSpreadsheet(BaseSpreadsheet):
         self.head.walk()
     
     def _findByIndex(self, row: int, column: int) -> ListNode:
-        curr = self.head
-        for i in range(row):
-            curr = curr.next
-        
-        curr = curr.value['head']
-        for i in range(column):
-            curr = curr.next
-        
-        return curr
+        # O(log n) positional lookups instead of walking row + column nodes
+        return self.rows[row].value.cells[column]
 
         
 
@@ -0,0 +1,82 @@
+from array import array
+
+from spreadsheet.cell import Cell
+
+
+# ------------------------------------------------------------------------
+# Bulk loading of 'row col val' data files into columnar arrays, which
+# every backend's buildFromArrays() consumes directly, so no intermediate
+# Cell list is built.
+# ------------------------------------------------------------------------
+
+# Bytes read per chunk
+CHUNK_SIZE = 1 << 24
+
+
+def loadColumns(filename: str, chunkSize: int = CHUNK_SIZE) -> (array, array, array):
+    """
+    Parse a data file where each line is 'row col val'.
+
+    The file is read in large chunks and each chunk is tokenised with a single split(),
+    so the per-line Python work is limited to the int()/float() conversions done by map().
+
+    @param filename Path of the data file.
+    @param chunkSize Number of bytes to read at a time.
+
+    @return (rows, cols, vals) as array('q'), array('q') and array('d').
+    """
+
+    rows = array('q')
+    cols = array('q')
+    vals = array('d')
+
+    with open(filename, 'rb') as dataFile:
+        leftover = b''
+        while True:
+            chunk = dataFile.read(chunkSize)
+            if not chunk:
+                break
+
+            # Only parse whole lines, the partial last line is carried into the next chunk
+            chunk = leftover + chunk
+            end = chunk.rfind(b'\n') + 1
+            leftover = chunk[end:]
+            _parseInto(chunk[:end], rows, cols, vals)
+
+        _parseInto(leftover, rows, cols, vals)
+
+    return rows, cols, vals
+
+
+def cellsToColumns(lCells: [Cell]) -> (array, array, array):
+    """
+    @return (rows, cols, vals) arrays holding the same cells as lCells.
+    """
+
+    return (array('q', [cell.row for cell in lCells]),
+            array('q', [cell.col for cell in lCells]),
+            array('d', [cell.val for cell in lCells]))
+
+
+def expandRowPointers(rowPtr) -> array:
+    """
+    @return The row of each entry of a CSR structure, given its row pointers.
+    """
+
+    rows = array('q')
+    for row in range(len(rowPtr) - 1):
+        count = rowPtr[row + 1] - rowPtr[row]
+        if count:
+            rows.extend(array('q', [row]) * count)
+
+    return rows
+
+
+def _parseInto(data: bytes, rows: array, cols: array, vals: array) -> None:
+    tokens = data.split()
+    if len(tokens) % 3 != 0:
+        raise ValueError('data file lines must each hold row, column and value')
+
+    rows.extend(map(int, tokens[0::3]))
+    cols.extend(map(int, tokens[1::3]))
+    vals.extend(map(float, tokens[2::3]))
@@ -0,0 +1,191 @@
+import numpy as np
+
+from spreadsheet.cell import Cell
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+from spreadsheet.loader import cellsToColumns
+from spreadsheet.instrumentation import counters
+from spreadsheet.snapshot import readSnapshot, writeSnapshot
+
+
+# ------------------------------------------------------------------------
+# Dense NumPy-based spreadsheet implementation.
+# Empty cells hold NaN. The backing ndarray has spare capacity which grows
+# geometrically, so appendRow/appendCol are amortised O(1) allocations.
+# ------------------------------------------------------------------------
+
+class NumpySpreadsheet(BaseSpreadsheet):
+
+    def __init__(self):
+        self.data = np.full((0, 0), np.nan)
+        self.numRows = 0
+        self.numColumns = 0
+
+    def buildSpreadsheet(self, lCells: [Cell]):
+        self.buildFromArrays(*cellsToColumns(lCells))
+
+    def buildFromArrays(self, rows, cols, vals):
+        # Array-module buffers are wrapped without copying
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        vals = np.asarray(vals, dtype=np.float64)
+
+        self.numRows = int(rows.max()) + 1
+        self.numColumns = int(cols.max()) + 1
+
+        self.data = np.full((self.numRows, self.numColumns), np.nan)
+        self.data[rows, cols] = vals
+
+        if self.indexes:
+            self._notifyBuild()
+
+    def appendRow(self) -> bool:
+        return self.appendRows(1)
+
+    def appendCol(self) -> bool:
+        return self.appendCols(1)
+
+    def insertRow(self, rowIndex: int) -> bool:
+        return self.insertRows(rowIndex, 1)
+
+    def insertCol(self, colIndex: int) -> bool:
+        return self.insertCols(colIndex, 1)
+
+    def appendRows(self, count: int) -> bool:
+        self._reserve(self.numRows + count, self.numColumns)
+        self.numRows += count
+        return True
+
+    def appendCols(self, count: int) -> bool:
+        self._reserve(self.numRows, self.numColumns + count)
+        self.numColumns += count
+        return True
+
+    def insertRows(self, rowIndex: int, count: int) -> bool:
+        if rowIndex > self.numRows or rowIndex < 0:
+            return False
+
+        self._reserve(self.numRows + count, self.numColumns)
+        self.data[rowIndex + count:self.numRows + count] = self.data[rowIndex:self.numRows]
+        self.data[rowIndex:rowIndex + count] = np.nan
+        self.numRows += count
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertRow(rowIndex)
+        return True
+
+    def insertCols(self, colIndex: int, count: int) -> bool:
+        if colIndex > self.numColumns or colIndex < 0:
+            return False
+
+        if counters.enabled:
+            counters.add('numpy.insertCol.rowsTouched', self.numRows)
+
+        self._reserve(self.numRows, self.numColumns + count)
+        view = self.data[:self.numRows]
+        view[:, colIndex + count:self.numColumns + count] = view[:, colIndex:self.numColumns]
+        view[:, colIndex:colIndex + count] = np.nan
+        self.numColumns += count
+        if self.indexes:
+            for i in range(count):
+                self._notifyInsertCol(colIndex)
+        return True
+
+    def update(self, rowIndex: int, colIndex: int, value: float) -> bool:
+        if rowIndex < 0 or rowIndex >= self.numRows or colIndex < 0 or colIndex >= self.numColumns:
+            return False
+
+        if self.indexes:
+            oldValue = self.data[rowIndex, colIndex]
+            self._notifyUpdate(rowIndex, colIndex, None if np.isnan(oldValue) else float(oldValue), value)
+
+        self.data[rowIndex, colIndex] = value
+        return True
+
+    def rowNum(self) -> int:
+        return self.numRows
+
+    def colNum(self) -> int:
+        return self.numColumns
+
+    def find(self, value: float) -> [(int, int)]:
+        if self.valueIndex is not None:
+            return self.valueIndex.find(value)
+
+        rows, cols = np.nonzero(self._view() == value)
+        return list(zip(rows.tolist(), cols.tolist()))
+
+    def entries(self) -> [Cell]:
+        rows, cols, vals = self.entriesArrays()
+        return [Cell(row, col, val) for row, col, val in zip(rows.tolist(), cols.tolist(), vals.tolist())]
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]:
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        if r0 >= r1 or c0 >= c1:
+            return []
+
+        window = self.data[r0:r1, c0:c1]
+        rows, cols = np.nonzero(~np.isnan(window))
+        vals = window[rows, cols]
+        return [Cell(row, col, val) for row, col, val in zip((rows + r0).tolist(), (cols + c0).tolist(), vals.tolist())]
+
+    def entriesArrays(self) -> (np.ndarray, np.ndarray, np.ndarray):
+        view = self._view()
+        rows, cols = np.nonzero(~np.isnan(view))
+        return rows, cols, view[rows, cols]
+
+    def csrArrays(self) -> (np.ndarray, np.ndarray, np.ndarray):
+        rows, cols, vals = self.entriesArrays()
+        rowPtr = np.zeros(self.numRows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=self.numRows), out=rowPtr[1:])
+        return rowPtr, cols, vals
+
+    def save(self, path: str):
+        rowPtr, cols, vals = self.csrArrays()
+        sumA = np.zeros(self.numRows + 1)
+        np.cumsum(np.nansum(self._view(), axis=1), out=sumA[1:])
+        writeSnapshot(path, self.numRows, self.numColumns, rowPtr, sumA, cols.astype(np.int64), vals)
+
+    def load(self, path: str, mapped: bool = True):
+        """
+        Replace the contents of the spreadsheet with a snapshot written by save().
+        With mapped, the snapshot sections are read in place from an mmap and scattered into the dense array.
+        """
+
+        snapshot = readSnapshot(path, mapped)
+        rowPtr = np.frombuffer(snapshot.rowPtr, dtype=np.int64)
+        cols = np.frombuffer(snapshot.colIdx, dtype=np.int64)
+        vals = np.frombuffer(snapshot.vals, dtype=np.float64)
+
+        self.numRows = snapshot.numRows
+        self.numColumns = snapshot.numColumns
+        self.data = np.full((self.numRows, self.numColumns), np.nan)
+        self.data[np.repeat(np.arange(self.numRows), np.diff(rowPtr)), cols] = vals
+
+        if self.indexes:
+            self._notifyBuild()
+
+    def _view(self) -> np.ndarray:
+        """
+        @return View of the logical part of the backing array.
+        """
+
+        return self.data[:self.numRows, :self.numColumns]
+
+    def _reserve(self, rows: int, cols: int):
+        """
+        Make sure the backing array can hold rows x cols cells, doubling the capacity of each dimension that is too small.
+        """
+
+        capRows, capCols = self.data.shape
+        if rows <= capRows and cols <= capCols:
+            return
+
+        # A dimension that still fits keeps its capacity, so appending columns does not double the rows too
+        if rows > capRows:
+            capRows = max(rows, 2 * capRows)
+        if cols > capCols:
+            capCols = max(cols, 2 * capCols)
+
+        newData = np.full((capRows, capCols), np.nan)
+        newData[:self.numRows, :self.numColumns] = self._view()
+        self.data = newData
@@ -0,0 +1,93 @@
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+
+
+# ------------------------------------------------------------------------
+# Chunked output of find() and entries() results for the file-based driver.
+# Results are formatted and written a chunk of cells at a time, so memory
+# does not grow with the length of the full output line.
+# ------------------------------------------------------------------------
+
+# Cells formatted per write
+CHUNK_CELLS = 1 << 14
+
+# Bytes buffered by the output file before it hits the OS
+BUFFER_SIZE = 1 << 20
+
+# Same text as Cell.__str__ and the driver's (row,col) find output
+ENTRY_FORMAT = '({},{},{:.2f})'.format
+POSITION_FORMAT = '({},{})'.format
+
+
+def openOutput(outputFilename: str):
+    """
+    @return The output file opened for writing with a large buffer.
+    """
+
+    return open(outputFilename, 'w', buffering=BUFFER_SIZE)
+
+
+def writeFind(outputFile, value: float, lCells: [(int, int)]) -> None:
+    """
+    Write the output line of an F command.
+    """
+
+    outputFile.write("Printing output of find(" + str(value) + "): ")
+    _writePositions(outputFile, lCells)
+
+
+def writeFindRange(outputFile, lo: float, hi: float, lCells: [(int, int)]) -> None:
+    """
+    Write the output line of an FR command.
+    """
+
+    outputFile.write("Printing output of findRange(" + str(lo) + "," + str(hi) + "): ")
+    _writePositions(outputFile, lCells)
+
+
+def writeFindGreater(outputFile, value: float, lCells: [(int, int)]) -> None:
+    """
+    Write the output line of an FG command.
+    """
+
+    outputFile.write("Printing output of findGreater(" + str(value) + "): ")
+    _writePositions(outputFile, lCells)
+
+
+def _writePositions(outputFile, lCells: [(int, int)]) -> None:
+    for start in range(0, len(lCells), CHUNK_CELLS):
+        if start:
+            outputFile.write(" | ")
+        chunk = lCells[start:start + CHUNK_CELLS]
+        outputFile.write(" | ".join([POSITION_FORMAT(row, col) for row, col in chunk]))
+    outputFile.write("\n")
+
+
+def writeEntries(outputFile, spreadsheet: BaseSpreadsheet, scanner = None) -> None:
+    """
+    Write the output line of an E command, formatting straight from entriesArrays() rather than Cell objects.
+
+    @param scanner Optional ShardedScanner, to format large sheets in its worker processes.
+    """
+
+    shards = scanner.formatEntries(spreadsheet) if scanner is not None else None
+    if shards is not None:
+        # Each shard is written as it arrives, so only one is held at a time
+        outputFile.write("Printing output of entries(): ")
+        separator = ""
+        for shard in shards:
+            if shard:
+                outputFile.write(separator)
+                outputFile.write(shard)
+                separator = " | "
+        outputFile.write("\n")
+        return
+
+    rows, cols, vals = spreadsheet.entriesArrays()
+
+    outputFile.write("Printing output of entries(): ")
+    for start in range(0, len(rows), CHUNK_CELLS):
+        if start:
+            outputFile.write(" | ")
+        end = start + CHUNK_CELLS
+        outputFile.write(" | ".join(map(ENTRY_FORMAT, rows[start:end], cols[start:end], vals[start:end])))
+    outputFile.write("\n")
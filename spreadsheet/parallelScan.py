@@ -0,0 +1,344 @@
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+from spreadsheet.loader import expandRowPointers
+from spreadsheet.outputWriter import ENTRY_FORMAT
+from spreadsheet.instrumentation import counters
+
+
+# ------------------------------------------------------------------------
+# Sharded find() and entries() over a process pool.
+#
+# The sheet's CSR arrays (csrArrays()) are copied into a shared memory
+# block. The rows are cut into shards with about the same number of
+# entries each, and every worker scans its shard straight out of the
+# shared block, so the sheet itself is never pickled. Only each shard's
+# results come back, and they are joined in shard order, which keeps
+# them in (row, col) order.
+#
+# The block is kept and reused until the sheet changes; the scanner
+# hears about changes through the sheet's index hooks (addIndex()).
+# Copying costs about as much as one serial scan, so after a change the
+# first scan runs serially and the block is only published for the
+# second. Small sheets are always scanned in-process, as the round trips
+# to the pool cost more than they save.
+# ------------------------------------------------------------------------
+
+# Below this many entries, scan serially
+PARALLEL_MIN_ENTRIES = 1 << 16
+
+# Shards per worker, so one slow shard does not hold up the rest
+SHARDS_PER_WORKER = 4
+
+# Scans of an unchanged sheet before its arrays are copied to shared memory, so the copy is shared by at least this many
+PUBLISH_AFTER_SCANS = 2
+
+
+class ShardedScanner:
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool: ProcessPoolExecutor = None
+
+        # The sheet being scanned, the listener registered on it and its scans since it last changed
+        self.spreadsheet: BaseSpreadsheet = None
+        self.listener: ChangeListener = None
+        self.scansSinceChange = 0
+
+        # True once the sheet is known to be too small to shard, until it changes
+        self.serialUntilChange = False
+
+        # Shared copy of the sheet's CSR arrays, with (numRows, nnz, row ranges of the shards)
+        self.block: shared_memory.SharedMemory = None
+        self.layout: tuple = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *excInfo):
+        self.close()
+
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        self._release()
+
+
+    def find(self, spreadsheet: BaseSpreadsheet, value: float) -> [(int, int)]:
+        """
+        Same result as spreadsheet.find(value), scanned in parallel.
+        """
+
+        if spreadsheet.valueIndex is not None or not self._publish(spreadsheet):
+            return spreadsheet.find(value)
+
+        result = []
+        for rows, cols in self._scan('find', value):
+            result.extend(zip(_fromBytes('q', rows), _fromBytes('q', cols)))
+
+        return result
+
+
+    def entriesArrays(self, spreadsheet: BaseSpreadsheet) -> (array, array, array):
+        """
+        Same result as spreadsheet.entriesArrays(), gathered in parallel.
+        """
+
+        if not self._publish(spreadsheet):
+            return spreadsheet.entriesArrays()
+
+        rows = array('q')
+        cols = array('q')
+        vals = array('d')
+        for shardRows, shardCols, shardVals in self._scan('entries'):
+            rows.frombytes(shardRows)
+            cols.frombytes(shardCols)
+            vals.frombytes(shardVals)
+
+        return rows, cols, vals
+
+
+    def formatEntries(self, spreadsheet: BaseSpreadsheet):
+        """
+        Format the cells as the E command prints them, one string per shard, formatted by the workers.
+        Joining the non-empty strings with " | " gives the full output.
+
+        @return Iterator over the formatted shards in row order, each yielded as soon as it is done,
+            or None if the sheet is not worth sharding.
+        """
+
+        if not self._publish(spreadsheet):
+            return None
+
+        return self._scan('format')
+
+
+    def changed(self) -> None:
+        """
+        The scanned sheet changed, so its shared copy is out of date.
+        """
+
+        self.scansSinceChange = 0
+        self.serialUntilChange = False
+        self._freeBlock()
+
+
+    def _publish(self, spreadsheet: BaseSpreadsheet) -> bool:
+        """
+        Make sure the shared block holds spreadsheet's CSR arrays, if a sharded scan is worth it.
+
+        @return True if the next scan should be sharded.
+        """
+
+        if self.workers < 2:
+            return False
+
+        if spreadsheet is not self.spreadsheet:
+            self._release()
+            self.spreadsheet = spreadsheet
+            self.listener = ChangeListener(self)
+            spreadsheet.addIndex(self.listener)
+
+        if self.block is not None:
+            return True
+        if self.serialUntilChange:
+            return False
+
+        self.scansSinceChange += 1
+        if self.scansSinceChange < PUBLISH_AFTER_SCANS:
+            return False
+
+        rowPtr, colIdx, vals = spreadsheet.csrArrays()
+        numRows = len(rowPtr) - 1
+        nnz = len(vals)
+        if nnz < PARALLEL_MIN_ENTRIES:
+            self.serialUntilChange = True
+            return False
+
+        sections = [_asBytes(rowPtr, 'q'), _asBytes(colIdx, 'q'), _asBytes(vals, 'd')]
+        block = shared_memory.SharedMemory(create=True, size=max(sum(map(len, sections)), 1))
+        offset = 0
+        for section in sections:
+            block.buf[offset:offset + len(section)] = section
+            offset += len(section)
+            section.release()
+
+        # Cut at row boundaries nearest to equal shares of the entries
+        shards = self.workers * SHARDS_PER_WORKER
+        bounds = sorted({0, numRows} | {bisect_left(rowPtr, nnz * k // shards) for k in range(1, shards)})
+
+        if counters.enabled:
+            counters.add('parallel.publish.entries', nnz)
+
+        self.block = block
+        self.layout = (numRows, nnz, list(zip(bounds, bounds[1:])))
+
+        return True
+
+
+    def _scan(self, mode: str, value: float = None):
+        """
+        Run mode over every shard of the shared block and yield the shard results in order.
+        """
+
+        numRows, nnz, ranges = self.layout
+
+        if counters.enabled:
+            counters.add('parallel.scan.shards', len(ranges))
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        futures = [self.pool.submit(_scanShard, self.block.name, numRows, nnz, rowStart, rowEnd, mode, value)
+                   for rowStart, rowEnd in ranges]
+        for future in futures:
+            yield future.result()
+
+
+    def _freeBlock(self) -> None:
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+            self.layout = None
+
+
+    def _release(self) -> None:
+        """
+        Stop tracking the current sheet and free its shared copy.
+        """
+
+        self._freeBlock()
+        if self.listener is not None:
+            # The sheet has no way to remove an index, so the listener is just detached
+            self.listener.scanner = None
+        self.spreadsheet = None
+        self.listener = None
+        self.scansSinceChange = 0
+        self.serialUntilChange = False
+
+
+
+
+class ChangeListener:
+    '''
+    Registered on the scanned sheet through addIndex(), to tell the scanner when the sheet changes.
+    '''
+
+    __slots__ = ('scanner',)
+
+    # Any rebuild is a change, whatever the cells
+    needsCells = False
+
+    def __init__(self, scanner: ShardedScanner):
+        self.scanner = scanner
+
+
+    def _changed(self) -> None:
+        if self.scanner is not None:
+            self.scanner.changed()
+
+
+    def rebuild(self, lCells) -> None:
+        self._changed()
+
+
+    def update(self, rowIndex: int, colIndex: int, oldValue: float, newValue: float) -> None:
+        self._changed()
+
+
+    def insertRow(self, rowIndex: int) -> None:
+        self._changed()
+
+
+    def insertCol(self, colIndex: int) -> None:
+        self._changed()
+
+
+
+
+def _asBytes(values, typecode: str) -> memoryview:
+    """
+    @return A byte view of values, copied into an array first if it is not a contiguous buffer of 8-byte items.
+    """
+
+    view = memoryview(values)
+    if not view.c_contiguous or view.itemsize != 8:
+        view.release()
+        view = memoryview(array(typecode, values))
+
+    return view.cast('B')
+
+
+def _fromBytes(typecode: str, data: bytes) -> array:
+    result = array(typecode)
+    result.frombytes(data)
+    return result
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a block the parent created and will unlink.  Pool workers share the parent's resource
+    tracker, which already tracks the block, so attaching must not register or unregister it again.
+    """
+
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # Before 3.13 attaching always registers the name, a no-op for a tracker that already has it
+    return shared_memory.SharedMemory(name=name)
+
+
+def _scanShard(name: str, numRows: int, nnz: int, rowStart: int, rowEnd: int, mode: str, value: float):
+    """
+    Worker: copy rows [rowStart, rowEnd) out of the shared CSR block and run mode over them.
+    """
+
+    shm = _attach(name)
+    try:
+        buf = shm.buf
+        colStart = 8 * (numRows + 1)
+        valStart = colStart + 8 * nnz
+
+        with buf[:colStart].cast('q') as rowView:
+            rowPtr = array('q', rowView[rowStart:rowEnd + 1])
+
+        begin = rowPtr[0]
+        end = rowPtr[-1]
+        cols = array('q')
+        vals = array('d')
+        cols.frombytes(buf[colStart + 8 * begin:colStart + 8 * end])
+        vals.frombytes(buf[valStart + 8 * begin:valStart + 8 * end])
+        del buf
+    finally:
+        shm.close()
+
+    if mode == 'find':
+        rows = array('q')
+        matchCols = array('q')
+        i = -1
+        while True:
+            try:
+                i = vals.index(value, i + 1)
+            except ValueError:
+                break
+            # Rows can be empty, so take the last row starting at or before i
+            rows.append(rowStart + bisect_right(rowPtr, begin + i) - 1)
+            matchCols.append(cols[i])
+
+        return rows.tobytes(), matchCols.tobytes()
+
+    rows = array('q', map(rowStart.__add__, expandRowPointers(rowPtr)))
+    if mode == 'entries':
+        return rows.tobytes(), cols.tobytes(), vals.tobytes()
+
+    return " | ".join(map(ENTRY_FORMAT, rows, cols, vals))
@@ -0,0 +1,140 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections import namedtuple
+
+
+# ------------------------------------------------------------------------
+# Binary spreadsheet snapshots.
+#
+# Layout (all little-endian, every section 8-byte aligned):
+#   header   magic 'SSHT', version u32, numRows u64, numColumns u64, nnz u64
+#   rowPtr   (numRows + 1) x int64   - CSR row pointers
+#   sumA     (numRows + 1) x float64 - cumulative row sums
+#   colIdx   nnz x int64             - column of each entry, row-major
+#   vals     nnz x float64           - value of each entry
+#
+# readSnapshot() can mmap the file and return the sections as memoryviews
+# over the mapping, so loading does not copy or parse anything.
+# ------------------------------------------------------------------------
+
+MAGIC = b'SSHT'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQQ')
+
+# Buffer formats accepted as-is for each section type ('l' is NumPy's int64 on most platforms)
+_FORMATS = {'q': ('q', 'l'), 'd': ('d',)}
+
+Snapshot = namedtuple('Snapshot', ['numRows', 'numColumns', 'rowPtr', 'sumA', 'colIdx', 'vals', 'buffer'])
+
+
+def writeSnapshot(path: str, numRows: int, numColumns: int, rowPtr, sumA, colIdx, vals) -> None:
+    """
+    Write a snapshot. The sections can be any sequences of numbers; array/memoryview/ndarray
+    buffers of the right type are written without conversion.
+    """
+
+    sections = [_asArray(rowPtr, 'q'), _asArray(sumA, 'd'), _asArray(colIdx, 'q'), _asArray(vals, 'd')]
+
+    # The sections may be views over a mapping of path itself (CSRSpreadsheet.load()), so write a temporary
+    # file next to it and move it into place.  The old mapping keeps the replaced file alive until it is closed
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as snapshotFile:
+            snapshotFile.write(HEADER.pack(MAGIC, VERSION, numRows, numColumns, len(sections[2])))
+            for section in sections:
+                snapshotFile.write(section)
+        # mkstemp() creates the file private, so give it the permissions open() would have
+        os.chmod(temporary, _fileMode(path))
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def readSnapshot(path: str, mapped: bool = True) -> Snapshot:
+    """
+    Read a snapshot.
+
+    @param path Snapshot file.
+    @param mapped If True, return read-only memoryviews over an mmap of the file (zero-copy).
+                  Otherwise, or on big-endian hosts, return arrays copied out of the file.
+
+    @return Snapshot, whose buffer field holds the mapping (or None) and must outlive the sections.
+    """
+
+    with open(path, 'rb') as snapshotFile:
+        if mapped and sys.byteorder == 'little':
+            buffer = mmap.mmap(snapshotFile.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = snapshotFile.read()
+
+    magic, version, numRows, numColumns, nnz = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(path + ' is not a spreadsheet snapshot')
+
+    view = memoryview(buffer)
+    offset = HEADER.size
+    sections = []
+    for typecode, length in (('q', numRows + 1), ('d', numRows + 1), ('q', nnz), ('d', nnz)):
+        section = view[offset:offset + 8 * length]
+        offset += 8 * length
+
+        if isinstance(buffer, mmap.mmap):
+            sections.append(section.cast(typecode))
+        else:
+            copied = array(typecode)
+            copied.frombytes(section)
+            if sys.byteorder != 'little':
+                copied.byteswap()
+            sections.append(copied)
+
+    if not isinstance(buffer, mmap.mmap):
+        buffer = None
+
+    return Snapshot(numRows, numColumns, *sections, buffer)
+
+
+def isSnapshot(path: str) -> bool:
+    """
+    @return True if path starts with the snapshot magic bytes.
+    """
+
+    with open(path, 'rb') as snapshotFile:
+        return snapshotFile.read(len(MAGIC)) == MAGIC
+
+
+def _fileMode(path: str) -> int:
+    """
+    @return The permission bits of path if it exists, otherwise those of a new file under the current umask.
+    """
+
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _asArray(values, typecode: str):
+    """
+    @return values as a little-endian buffer of 8-byte items of the given type, converting only when needed.
+    """
+
+    if sys.byteorder == 'little':
+        try:
+            view = memoryview(values)
+        except TypeError:
+            view = None
+
+        if view is not None and view.c_contiguous and view.itemsize == 8 and view.format.lstrip('<=@') in _FORMATS[typecode]:
+            return view
+
+    converted = array(typecode, map(float if typecode == 'd' else int, values))
+    if sys.byteorder != 'little':
+        converted.byteswap()
+    return converted
@@ -0,0 +1,113 @@
+from bisect import bisect_left, bisect_right, insort
+from array import array
+
+from spreadsheet.cell import Cell
+
+
+# ------------------------------------------------------------------------
+# Ordered index of (value, row, col) keys for range queries.
+#
+# Updates from the BaseSpreadsheet notify hooks are queued and applied
+# on the next query, one bisect delete/insert each. Row and column
+# inserts shift coordinates everywhere, so they (and long update
+# queues) just mark the index stale. The owner then rebuilds it from
+# entriesArrays() before the next query.
+# ------------------------------------------------------------------------
+
+# Queued updates beyond this fraction of the index size mark it stale instead
+MAX_PENDING_FRACTION = 1 / 16
+
+# Sorts after any (value, row, col) key with the same value
+AFTER_ROWS = float('inf')
+
+
+class SortedValueIndex:
+
+    needsCells = True
+
+    def __init__(self):
+        self.keys: list = []
+        self.pending: list = []
+        self.stale = True
+
+
+    def rebuild(self, lCells: [Cell]) -> None:
+        """
+        Discard the index and rebuild it from a list of cells.
+        """
+
+        self.keys = sorted((cell.val, cell.row, cell.col) for cell in lCells)
+        self.pending = []
+        self.stale = False
+
+
+    def rebuildFromArrays(self, rows: array, cols: array, vals: array) -> None:
+        """
+        Discard the index and rebuild it from parallel row, column and value arrays.
+        """
+
+        self.keys = sorted(zip(vals, rows, cols))
+        self.pending = []
+        self.stale = False
+
+
+    def update(self, rowIndex: int, colIndex: int, oldValue: float, newValue: float) -> None:
+        """
+        Queue a cell's move from oldValue to newValue. oldValue is None if the cell was empty.
+        """
+
+        if self.stale:
+            return
+
+        self.pending.append((rowIndex, colIndex, oldValue, newValue))
+        if len(self.pending) > max(64, len(self.keys) * MAX_PENDING_FRACTION):
+            self.stale = True
+            self.pending = []
+
+
+    def insertRow(self, rowIndex: int) -> None:
+        self.stale = True
+        self.pending = []
+
+
+    def insertCol(self, colIndex: int) -> None:
+        self.stale = True
+        self.pending = []
+
+
+    def between(self, lo: float, hi: float) -> [(int, int)]:
+        """
+        @return Positions holding a value v with lo <= v <= hi, in row-major order.
+        """
+
+        keys = self._keys()
+        start = bisect_left(keys, (lo,))
+        end = bisect_right(keys, (hi, AFTER_ROWS))
+
+        return sorted((row, col) for value, row, col in keys[start:end])
+
+
+    def greater(self, value: float) -> [(int, int)]:
+        """
+        @return Positions holding a value greater than value, in row-major order.
+        """
+
+        keys = self._keys()
+        start = bisect_right(keys, (value, AFTER_ROWS))
+
+        return sorted((row, col) for cellValue, row, col in keys[start:])
+
+
+    def _keys(self) -> list:
+        """
+        @return The keys with queued updates applied.  The index must not be stale.
+        """
+
+        keys = self.keys
+        for rowIndex, colIndex, oldValue, newValue in self.pending:
+            if oldValue is not None:
+                del keys[bisect_left(keys, (oldValue, rowIndex, colIndex))]
+            insort(keys, (newValue, rowIndex, colIndex))
+        self.pending = []
+
+        return keys
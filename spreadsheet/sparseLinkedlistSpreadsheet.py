@@ -0,0 +1,399 @@
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+from spreadsheet.cell import Cell
+from spreadsheet.loader import cellsToColumns
+from spreadsheet.instrumentation import counters
+from array import array
+
+
+class HeaderNode:
+    '''
+    A row or column header. Headers form a doubly linked list in row/column order,
+    and each one points at the first non-empty cell in its row/column.
+    '''
+
+    __slots__ = ('prev', 'next', 'first')
+
+    def __init__(self, prev=None, next=None):
+        self.prev: HeaderNode = prev
+        self.next: HeaderNode = next
+        self.first: CellNode = None
+
+
+class CellNode:
+    '''
+    A non-empty cell, threaded into both its row (via right) and its column (via down).
+    '''
+
+    __slots__ = ('row', 'col', 'value', 'right', 'down')
+
+    def __init__(self, row: HeaderNode, col: HeaderNode, value: float):
+        self.row = row
+        self.col = col
+        self.value = value
+        self.right: CellNode = None
+        self.down: CellNode = None
+
+
+# ------------------------------------------------------------------------
+# Sparse orthogonal-list spreadsheet implementation.
+# Only non-empty cells have nodes, so memory scales with the number of
+# values rather than the sheet's area, and inserting a row or column is
+# a single header splice. Insert semantics match LinkedListSpreadsheet.
+# ------------------------------------------------------------------------
+
+class SparseLinkedListSpreadsheet(BaseSpreadsheet):
+
+    def __init__(self):
+        self.rowHead: HeaderNode = None
+        self.rowTail: HeaderNode = None
+        self.colHead: HeaderNode = None
+        self.colTail: HeaderNode = None
+
+        self.numRows = 0
+        self.numColumns = 0
+
+
+    def buildSpreadsheet(self, lCells: [Cell]): # type: ignore
+        """
+        Construct the data structure to store nodes.
+        @param lCells: list of cells to be stored
+        """
+
+        self.buildFromArrays(*cellsToColumns(lCells))
+
+
+    def buildFromArrays(self, rows: array, cols: array, vals: array): # type: ignore
+        """
+        Construct the data structure from parallel row, column and value arrays.
+        """
+
+        self.rowHead = self.rowTail = None
+        self.colHead = self.colTail = None
+        self.numRows = 0
+        self.numColumns = 0
+
+        for i in range(max(rows) + 1):
+            self.appendRow()
+        for i in range(max(cols) + 1):
+            self.appendCol()
+
+        rowHeaders = list(self._headers(self.rowHead))
+        colHeaders = list(self._headers(self.colHead))
+        rowTails: list = [None] * self.numRows
+        colTails: list = [None] * self.numColumns
+
+        # In row-major order every new cell goes at the end of both its row and its column
+        for i in sorted(range(len(rows)), key = lambda i: (rows[i], cols[i])):
+            row = rows[i]
+            col = cols[i]
+            last = rowTails[row]
+            if last is not None and last.col is colHeaders[col]:
+                last.value = vals[i]
+                continue
+
+            node = CellNode(rowHeaders[row], colHeaders[col], vals[i])
+            if last is None:
+                rowHeaders[row].first = node
+            else:
+                last.right = node
+            rowTails[row] = node
+
+            if colTails[col] is None:
+                colHeaders[col].first = node
+            else:
+                colTails[col].down = node
+            colTails[col] = node
+
+        if self.indexes:
+            self._notifyBuild()
+
+
+    def appendRow(self) -> bool:
+        """
+        Appends an empty row to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        self.rowHead, self.rowTail = self._appendHeader(self.rowHead, self.rowTail)
+        self.numRows += 1
+
+        return True
+
+
+    def appendCol(self) -> bool:
+        """
+        Appends an empty column to the spreadsheet.
+
+        @return True if operation was successful, or False if not.
+        """
+
+        self.colHead, self.colTail = self._appendHeader(self.colHead, self.colTail)
+        self.numColumns += 1
+
+        return True
+
+
+    def insertRow(self, rowIndex: int) -> bool:
+        """
+        Inserts an empty row into the spreadsheet.
+
+        @param rowIndex Index of the existing row that will be before the newly inserted row.  If inserting as first row, specify rowIndex to be -1.
+
+        @return True if operation was successful, or False if not, e.g., rowIndex is invalid.
+        """
+
+        if rowIndex < -1 or rowIndex >= self.numRows:
+            return False
+
+        self.rowHead, self.rowTail = self._insertHeader(self.rowHead, self.rowTail, rowIndex)
+        self.numRows += 1
+
+        if self.indexes:
+            self._notifyInsertRow(rowIndex + 1)
+
+        return True
+
+
+    def insertCol(self, colIndex: int) -> bool:
+        """
+        Inserts an empty column into the spreadsheet.
+
+        @param colIndex Index of the existing column that will be before the newly inserted column.  If inserting as first column, specify colIndex to be -1.
+
+        @return True if operation was successful, or False if not, e.g., colIndex is invalid.
+        """
+
+        if colIndex < -1 or colIndex >= self.numColumns:
+            return False
+
+        self.colHead, self.colTail = self._insertHeader(self.colHead, self.colTail, colIndex)
+        self.numColumns += 1
+
+        if self.indexes:
+            self._notifyInsertCol(colIndex + 1)
+
+        return True
+
+
+    def update(self, rowIndex: int, colIndex: int, value: float) -> bool:
+        """
+        Update the cell with the input/argument value.
+
+        @param rowIndex Index of row to update.
+        @param colIndex Index of column to update.
+        @param value Value to update.  Can assume they are floats.
+
+        @return True if cell can be updated.  False if cannot, e.g., row or column indices do not exist.
+        """
+
+        if rowIndex < 0 or rowIndex >= self.numRows or colIndex < 0 or colIndex >= self.numColumns:
+            return False
+
+        rowHeader = self._header(self.rowHead, rowIndex)
+        colHeader = self._header(self.colHead, colIndex)
+
+        left, node = self._locate(rowHeader.first, colIndex, self.colHead, lambda cell: cell.col, lambda cell: cell.right)
+        if node is not None:
+            if self.indexes:
+                self._notifyUpdate(rowIndex, colIndex, node.value, value)
+            node.value = value
+            return True
+
+        up, below = self._locate(colHeader.first, rowIndex, self.rowHead, lambda cell: cell.row, lambda cell: cell.down)
+
+        node = CellNode(rowHeader, colHeader, value)
+        if left is None:
+            node.right = rowHeader.first
+            rowHeader.first = node
+        else:
+            node.right = left.right
+            left.right = node
+
+        if up is None:
+            node.down = colHeader.first
+            colHeader.first = node
+        else:
+            node.down = up.down
+            up.down = node
+
+        if self.indexes:
+            self._notifyUpdate(rowIndex, colIndex, None, value)
+
+        return True
+
+
+    def rowNum(self) -> int:
+        """
+        @return Number of rows the spreadsheet has.
+        """
+
+        return self.numRows
+
+
+    def colNum(self) -> int:
+        """
+        @return Number of column the spreadsheet has.
+        """
+
+        return self.numColumns
+
+
+    def find(self, value: float) -> [(int, int)]: # type: ignore
+        """
+        Find and return a list of cells that contain the value 'value'.
+
+        @param value value to search for.
+
+        @return List of cells (row, col) that contains the input value.
+        """
+
+        if self.valueIndex is not None:
+            return self.valueIndex.find(value)
+
+        return [(row, col) for row, col, cellValue in self._iterCells() if cellValue == value]
+
+
+    def entries(self) -> [Cell]: # type: ignore
+        """
+        @return A list of cells that have values (i.e., all non None cells).
+        """
+
+        return [Cell(row, col, cellValue) for row, col, cellValue in self._iterCells()]
+
+
+    def getRange(self, r0: int, c0: int, r1: int, c1: int) -> [Cell]: # type: ignore
+        """
+        @return The cells with values in rows [r0, r1) and columns [c0, c1), clipped to the sheet, in row-major order.
+            Only the headers up to r1 and c1 and the window's rows are walked.
+        """
+
+        r0, c0, r1, c1 = self._clipRange(r0, c0, r1, c1)
+        if r0 >= r1 or c0 >= c1:
+            return []
+
+        # Index of each column header before c1.  A row's cells are in column order, so the
+        # first cell whose header is missing here is past the window
+        colIndex = {}
+        header = self.colHead
+        for col in range(c1):
+            colIndex[header] = col
+            header = header.next
+
+        result = []
+        header = self._header(self.rowHead, r0)
+        for row in range(r0, r1):
+            node = header.first
+            while node is not None and node.col in colIndex:
+                col = colIndex[node.col]
+                if col >= c0:
+                    result.append(Cell(row, col, node.value))
+                node = node.right
+            header = header.next
+
+        return result
+
+
+    def entriesArrays(self) -> (array, array, array): # type: ignore
+        """
+        @return (rows, cols, vals) parallel arrays of all non None cells, without allocating Cells.
+        """
+
+        rows = array('q')
+        cols = array('q')
+        vals = array('d')
+        for row, col, cellValue in self._iterCells():
+            rows.append(row)
+            cols.append(col)
+            vals.append(cellValue)
+
+        return rows, cols, vals
+
+
+    def _iterCells(self):
+        """
+        Stream (row, col, value) for every non-empty cell in row-major order.
+        """
+
+        colIndex = {header: i for i, header in enumerate(self._headers(self.colHead))}
+
+        for row, header in enumerate(self._headers(self.rowHead)):
+            node = header.first
+            while node is not None:
+                yield row, colIndex[node.col], node.value
+                node = node.right
+
+
+    def _headers(self, head: HeaderNode):
+        curr = head
+        while curr is not None:
+            yield curr
+            curr = curr.next
+
+
+    def _header(self, head: HeaderNode, index: int) -> HeaderNode:
+        if counters.enabled:
+            counters.add('sparselinkedlist.header.nodesTraversed', index)
+
+        curr = head
+        for i in range(index):
+            curr = curr.next
+
+        return curr
+
+
+    def _appendHeader(self, head: HeaderNode, tail: HeaderNode) -> (HeaderNode, HeaderNode):
+        newHeader = HeaderNode(tail)
+        if tail is None:
+            return newHeader, newHeader
+
+        tail.next = newHeader
+        return head, newHeader
+
+
+    def _insertHeader(self, head: HeaderNode, tail: HeaderNode, index: int) -> (HeaderNode, HeaderNode):
+        """
+        Splice a new header in after position index (-1 for the front) and return the new (head, tail).
+        """
+
+        if index == -1:
+            newHeader = HeaderNode(None, head)
+            if head is None:
+                return newHeader, newHeader
+            head.prev = newHeader
+            return newHeader, tail
+
+        prev = self._header(head, index)
+        newHeader = HeaderNode(prev, prev.next)
+        if prev.next is None:
+            tail = newHeader
+        else:
+            prev.next.prev = newHeader
+        prev.next = newHeader
+
+        return head, tail
+
+
+    def _locate(self, first: CellNode, index: int, headerHead: HeaderNode, headerOf, nextOf) -> (CellNode, CellNode):
+        """
+        Walk one row or column to the cell at position index of the other axis.
+        Cells only know their headers, so headers 0..index are walked in step with the cells.
+
+        @return (last cell before index or None, cell at index or None).
+        """
+
+        if counters.enabled:
+            counters.add('sparselinkedlist.locate.nodesTraversed', index + 1)
+
+        prev = None
+        node = first
+        header = headerHead
+        for i in range(index + 1):
+            if node is not None and headerOf(node) is header:
+                if i == index:
+                    return prev, node
+                prev = node
+                node = nextOf(node)
+            header = header.next
+
+        return prev, None
@@ -0,0 +1,128 @@
+from spreadsheet.cell import Cell
+
+
+# ------------------------------------------------------------------------
+# Hash index from cell value to the (row, col) positions holding it.
+# Backends keep it in sync through the BaseSpreadsheet notify hooks, so
+# find() costs O(matches) instead of a scan over every cell.
+#
+# Positions are stored as stable row and column ids, not indices, so an
+# inserted row or column does not rewrite any bucket. rowIds[i] is the id
+# of the row now at index i, and an insert only adds a new id to that
+# list. The reverse maps are rebuilt by the next find() after an insert.
+# ------------------------------------------------------------------------
+
+class ValueIndex:
+
+    # rebuild() reads the cells
+    needsCells = True
+
+    def __init__(self, lCells: [Cell] = None):
+        self.positions: dict = {}
+
+        # Index -> id for rows and columns.  Each list covers every line holding a cell and is a permutation
+        # of range(len), so a new id is len(list)
+        self.rowIds: list = []
+        self.colIds: list = []
+
+        # id -> index, or None until the next find() after an insert
+        self.rowIndexes: dict = None
+        self.colIndexes: dict = None
+
+        if lCells is not None:
+            self.rebuild(lCells)
+
+
+    def rebuild(self, lCells: [Cell]) -> None:
+        """
+        Discard the index and rebuild it from a list of cells.
+        """
+
+        self.__init__()
+
+        # Ids start out equal to indices
+        for cell in lCells:
+            self.positions.setdefault(cell.val, set()).add((cell.row, cell.col))
+        self.rowIds = list(range(max((cell.row for cell in lCells), default=-1) + 1))
+        self.colIds = list(range(max((cell.col for cell in lCells), default=-1) + 1))
+
+
+    def update(self, rowIndex: int, colIndex: int, oldValue: float, newValue: float) -> None:
+        """
+        Move a cell from oldValue's bucket to newValue's. oldValue is None if the cell was empty.
+        """
+
+        position = (_id(self.rowIds, rowIndex, self.rowIndexes), _id(self.colIds, colIndex, self.colIndexes))
+
+        if oldValue is not None:
+            bucket = self.positions[oldValue]
+            bucket.discard(position)
+            if not bucket:
+                del self.positions[oldValue]
+
+        self.positions.setdefault(newValue, set()).add(position)
+
+
+    def insertRow(self, rowIndex: int) -> None:
+        """
+        An empty row now sits at rowIndex, so every position at or below it moves down by one.
+        """
+
+        _insert(self.rowIds, rowIndex)
+        self.rowIndexes = None
+
+
+    def insertCol(self, colIndex: int) -> None:
+        """
+        An empty column now sits at colIndex, so every position at or right of it moves right by one.
+        """
+
+        _insert(self.colIds, colIndex)
+        self.colIndexes = None
+
+
+    def find(self, value: float) -> [(int, int)]:
+        """
+        @return Positions holding value, in row-major order.
+        """
+
+        bucket = self.positions.get(value, ())
+        if not bucket:
+            return []
+
+        if self.rowIndexes is None:
+            self.rowIndexes = dict(zip(self.rowIds, range(len(self.rowIds))))
+        if self.colIndexes is None:
+            self.colIndexes = dict(zip(self.colIds, range(len(self.colIds))))
+
+        rowIndexes = self.rowIndexes
+        colIndexes = self.colIndexes
+
+        return sorted((rowIndexes[row], colIndexes[col]) for row, col in bucket)
+
+
+
+
+def _id(ids: list, index: int, indexes: dict) -> int:
+    """
+    @return The id of the line at index, first growing ids (and indexes, if built) to cover it.
+    """
+
+    if index >= len(ids):
+        # Lines past the end hold no cells and have never moved, so their id is their index
+        grown = range(len(ids), index + 1)
+        ids.extend(grown)
+        if indexes is not None:
+            indexes.update(zip(grown, grown))
+
+    return ids[index]
+
+
+def _insert(ids: list, index: int) -> None:
+    """
+    Give the new line at index a fresh id.  Lines past the end of ids hold no cells, so they need no ids.
+    """
+
+    if index > len(ids):
+        ids.extend(range(len(ids), index))
+    ids.insert(index, len(ids))
@@ -0,0 +1,246 @@
+import argparse
+import csv
+import json
+import random
+import sys
+from array import array
+from time import perf_counter_ns
+
+from spreadsheet.baseSpreadsheet import BaseSpreadsheet
+from spreadsheet.instrumentation import summarise
+from spreadsheet.arraySpreadsheet import ArraySpreadsheet
+from spreadsheet.linkedlistSpreadsheet import LinkedListSpreadsheet
+from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+from spreadsheet.chunkedCsrSpreadsheet import ChunkedCSRSpreadsheet
+from spreadsheet.sparseLinkedlistSpreadsheet import SparseLinkedListSpreadsheet
+from spreadsheet.adaptiveSpreadsheet import AdaptiveSpreadsheet
+
+
+# -------------------------------------------------------------------
+# Benchmark harness for the spreadsheet implementations.
+#
+# For every approach and sheet size it generates a synthetic sheet of a
+# given density and a command stream with a given mix, then replays the
+# stream on a fresh sheet several times (after warm-up runs) and reports
+# per-operation latency statistics as JSON or CSV.
+#
+# Example:
+#   python3 spreadsheetBenchmark.py --approaches array,csr --sizes 100x100,1000x1000 \
+#       --density 0.05 --mix U=5,F=2,E=1,IR=1,IC=1 --commands 2000 --format csv
+# -------------------------------------------------------------------
+
+def makeNumpySpreadsheet() -> BaseSpreadsheet:
+    # Imported here so the other approaches still run without NumPy installed
+    from spreadsheet.numpySpreadsheet import NumpySpreadsheet
+    return NumpySpreadsheet()
+
+
+APPROACHES = {
+    'array': ArraySpreadsheet,
+    'linkedlist': LinkedListSpreadsheet,
+    'sparselinkedlist': SparseLinkedListSpreadsheet,
+    'csr': CSRSpreadsheet,
+    'chunkedcsr': ChunkedCSRSpreadsheet,
+    'numpy': makeNumpySpreadsheet,
+    'auto': AdaptiveSpreadsheet,
+}
+
+DEFAULT_MIX = 'U=4,F=2,E=1,AR=1,AC=1,IR=1,IC=1,R=1,C=1'
+
+# Values cells are drawn from, small so that find() has matches
+VALUES = [float(value) for value in range(-5, 6)]
+
+
+def generateCells(rng: random.Random, numRows: int, numColumns: int, density: float) -> (array, array, array):
+    """
+    @return (rows, cols, vals) of about density * numRows * numColumns distinct cells.
+        The last cell always exists so the built sheet has the full shape.
+    """
+
+    area = numRows * numColumns
+    count = max(1, min(area, round(area * density)))
+    positions = set(rng.sample(range(area), count)) if count < area else set(range(area))
+    positions.add(area - 1)
+
+    rows = array('q')
+    cols = array('q')
+    vals = array('d')
+    for position in sorted(positions):
+        rows.append(position // numColumns)
+        cols.append(position % numColumns)
+        vals.append(rng.choice(VALUES))
+
+    return rows, cols, vals
+
+
+def generateCommands(rng: random.Random, numRows: int, numColumns: int, mix: dict, count: int) -> [tuple]:
+    """
+    @return count commands as (command, args) drawn with the weights in mix.  Indices stay
+        within the sheet's shape as it grows through the stream.
+    """
+
+    commands = list(mix)
+    weights = [mix[command] for command in commands]
+    stream = []
+    for command in rng.choices(commands, weights, k=count):
+        if command == 'AR':
+            numRows += 1
+            args = ()
+        elif command == 'AC':
+            numColumns += 1
+            args = ()
+        elif command == 'IR':
+            args = (rng.randrange(numRows),)
+            numRows += 1
+        elif command == 'IC':
+            args = (rng.randrange(numColumns),)
+            numColumns += 1
+        elif command == 'U':
+            args = (rng.randrange(numRows), rng.randrange(numColumns), rng.choice(VALUES))
+        elif command == 'F':
+            args = (rng.choice(VALUES),)
+        else:
+            args = ()
+        stream.append((command, args))
+
+    return stream
+
+
+def runCommand(spreadsheet: BaseSpreadsheet, command: str, args: tuple):
+    if command == 'AR':
+        return spreadsheet.appendRow()
+    if command == 'AC':
+        return spreadsheet.appendCol()
+    if command == 'IR':
+        return spreadsheet.insertRow(*args)
+    if command == 'IC':
+        return spreadsheet.insertCol(*args)
+    if command == 'U':
+        return spreadsheet.update(*args)
+    if command == 'F':
+        return spreadsheet.find(*args)
+    if command == 'E':
+        return spreadsheet.entries()
+    if command == 'R':
+        return spreadsheet.rowNum()
+    if command == 'C':
+        return spreadsheet.colNum()
+    raise ValueError('unknown command ' + command)
+
+
+def replay(approach: str, cells: (array, array, array), stream: [tuple]) -> (int, dict):
+    """
+    Build a fresh sheet and run the stream on it, timing each command.
+
+    @return (build time in ns, {command: [latency in ns, ...]}).
+    """
+
+    spreadsheet = APPROACHES[approach]()
+    start = perf_counter_ns()
+    spreadsheet.buildFromArrays(*cells)
+    buildTime = perf_counter_ns() - start
+
+    latencies = {}
+    for command, args in stream:
+        start = perf_counter_ns()
+        runCommand(spreadsheet, command, args)
+        latencies.setdefault(command, []).append(perf_counter_ns() - start)
+
+    return buildTime, latencies
+
+
+def benchmark(approaches: [str], sizes: [(int, int)], density: float, mix: dict, numCommands: int,
+              repeats: int, warmup: int, seed: int) -> [dict]:
+    """
+    @return One result row per (approach, size, operation), plus a 'build' row per (approach, size).
+    """
+
+    results = []
+    for numRows, numColumns in sizes:
+        # Every approach replays the same sheet and commands
+        rng = random.Random(seed)
+        cells = generateCells(rng, numRows, numColumns, density)
+        stream = generateCommands(rng, numRows, numColumns, mix, numCommands)
+
+        for approach in approaches:
+            for i in range(warmup):
+                replay(approach, cells, stream)
+
+            buildTimes = []
+            latencies = {}
+            for i in range(repeats):
+                buildTime, runLatencies = replay(approach, cells, stream)
+                buildTimes.append(buildTime)
+                for command, values in runLatencies.items():
+                    latencies.setdefault(command, []).extend(values)
+
+            common = {'approach': approach, 'rows': numRows, 'cols': numColumns,
+                      'density': density, 'nnz': len(cells[0]), 'repeats': repeats}
+            results.append(dict(common, op='build', **summarise(buildTimes)))
+            for command in sorted(latencies):
+                results.append(dict(common, op=command, **summarise(latencies[command])))
+
+            print('benchmarked', approach, f'{numRows}x{numColumns}', file=sys.stderr)
+
+    return results
+
+
+def parseSizes(text: str) -> [(int, int)]:
+    sizes = []
+    for size in text.split(','):
+        numRows, numColumns = size.lower().split('x')
+        sizes.append((int(numRows), int(numColumns)))
+    return sizes
+
+
+def parseMix(text: str) -> dict:
+    mix = {}
+    for part in text.split(','):
+        command, weight = part.split('=')
+        command = command.strip().upper()
+        if command not in ('AR', 'AC', 'IR', 'IC', 'U', 'F', 'E', 'R', 'C'):
+            raise argparse.ArgumentTypeError('unknown command ' + command)
+        mix[command] = float(weight)
+    return mix
+
+
+def writeResults(results: [dict], outputFormat: str, outputFile) -> None:
+    if outputFormat == 'json':
+        json.dump(results, outputFile, indent=2)
+        outputFile.write('\n')
+    else:
+        writer = csv.DictWriter(outputFile, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the spreadsheet implementations.')
+    parser.add_argument('--approaches', default='array,linkedlist,csr',
+                        help='comma separated subset of ' + ', '.join(APPROACHES))
+    parser.add_argument('--sizes', type=parseSizes, default='100x100,300x300,1000x1000',
+                        help='comma separated ROWSxCOLS sheet sizes to sweep')
+    parser.add_argument('--density', type=float, default=0.05, help='fraction of non-empty cells')
+    parser.add_argument('--mix', type=parseMix, default=DEFAULT_MIX,
+                        help='command weights, e.g. ' + DEFAULT_MIX)
+    parser.add_argument('--commands', type=int, default=1000, help='commands per run')
+    parser.add_argument('--repeats', type=int, default=5, help='measured runs per configuration')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured runs per configuration')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['json', 'csv'], default='json')
+    parser.add_argument('--output', help='output file, stdout if omitted')
+    args = parser.parse_args()
+
+    approaches = args.approaches.split(',')
+    for approach in approaches:
+        if approach not in APPROACHES:
+            parser.error('unknown approach ' + approach)
+
+    results = benchmark(approaches, args.sizes, args.density, args.mix, args.commands,
+                        args.repeats, args.warmup, args.seed)
+
+    if args.output is None:
+        writeResults(results, args.format, sys.stdout)
+    else:
+        with open(args.output, 'w', newline='') as outputFile:
+            writeResults(results, args.format, outputFile)
@@ -1,13 +1,20 @@
 import sys
-from spreadsheet.cell import Cell
 from spreadsheet.baseSpreadsheet import BaseSpreadsheet
 from spreadsheet.arraySpreadsheet import ArraySpreadsheet
 from spreadsheet.linkedlistSpreadsheet import LinkedListSpreadsheet
 from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+from spreadsheet.chunkedCsrSpreadsheet import ChunkedCSRSpreadsheet
+from spreadsheet.sparseLinkedlistSpreadsheet import SparseLinkedListSpreadsheet
+from spreadsheet.adaptiveSpreadsheet import AdaptiveSpreadsheet
+from spreadsheet.loader import loadColumns
+from spreadsheet.snapshot import isSnapshot
+from spreadsheet.commandPlanner import planCommands
+from spreadsheet.outputWriter import openOutput, writeEntries, writeFind, writeFindGreater, writeFindRange
+from spreadsheet.instrumentation import counters, InstrumentedSpreadsheet
+from spreadsheet.parallelScan import ShardedScanner
 
 
 # -------------------------------------------------------------------
-# DON'T CHANGE THIS FILE.
 # This is the entry point to run the program in file-based mode.
 # It uses the data file to initialise the set of words & frequencies.
 # It takes a command file as input and output into the output file.
@@ -24,8 +31,10 @@ def usage():
 
     # On Teaching servers, use 'python3'
     # On Windows, you may need to use 'python' instead of 'python3' to get this to work
-    print('python3 spreadsheetFilebased.py', '<approach> <data fileName> <command fileName> <output fileName>')
-    print('<approach> = <array | linkedlist | csr>')
+    print('python3 spreadsheetFilebased.py', '<approach> <data fileName> <command fileName> <output fileName> [--stats] [--workers=<n>]')
+    print('<approach> = <array | linkedlist | sparselinkedlist | csr | chunkedcsr | numpy | auto>')
+    print('--stats prints per-operation latencies and backend counters to stderr at the end')
+    print('--workers=<n> scans large sheets for F and E commands in n processes')
     sys.exit(1)
 
 
@@ -33,6 +42,19 @@ if __name__ == '__main__':
     # Fetch the command line arguments
     args = sys.argv
 
+    # optional trailing flags
+    stats = False
+    workers = 1
+    while len(args) > 5 and args[-1].startswith('--'):
+        if args[-1] == '--stats':
+            stats = True
+        elif args[-1].startswith('--workers=') and args[-1][len('--workers='):].isdigit():
+            workers = int(args[-1][len('--workers='):])
+        else:
+            print('Unknown option.')
+            usage()
+        args = args[:-1]
+
     if len(args) != 5:
         print('Incorrect number of arguments.')
         usage()
@@ -45,26 +67,36 @@ if __name__ == '__main__':
         spreadsheet = LinkedListSpreadsheet()
     elif args[1] == 'csr':
         spreadsheet = CSRSpreadsheet()
+    elif args[1] == 'chunkedcsr':
+        spreadsheet = ChunkedCSRSpreadsheet()
+    elif args[1] == 'sparselinkedlist':
+        spreadsheet = SparseLinkedListSpreadsheet()
+    elif args[1] == 'numpy':
+        # Imported here so the other approaches still run without NumPy installed
+        from spreadsheet.numpySpreadsheet import NumpySpreadsheet
+        spreadsheet = NumpySpreadsheet()
+    elif args[1] == 'auto':
+        # picks and switches between backends as the density and command mix change
+        spreadsheet = AdaptiveSpreadsheet()
     else:
         print('Incorrect argument value.')
         usage()
 
+    if stats:
+        counters.enabled = True
+        spreadsheet = InstrumentedSpreadsheet(spreadsheet)
+
     # read from data file to populate the initial set of points
     dataFilename = args[2]
-    cellsFromFiles = []
     try:
-        dataFile = open(dataFilename, 'r')
-        for line in dataFile:
-            values = line.split()
-            currRow = int(values[0])
-            currCol = int(values[1])
-            currVal = float(values[2])
-            currCell = Cell(currRow, currCol, currVal)
-            # each line contains a cell
-            cellsFromFiles.append(currCell)
-        dataFile.close()
-        # construct the spreadsheet from the read in data
-        spreadsheet.buildSpreadsheet(cellsFromFiles)
+        if isSnapshot(dataFilename):
+            # binary snapshot written by save(), loaded without parsing
+            spreadsheet.load(dataFilename)
+        else:
+            # each line contains a cell, parsed in bulk into row, column and value arrays
+            rows, cols, vals = loadColumns(dataFilename)
+            # construct the spreadsheet from the read in data
+            spreadsheet.buildFromArrays(rows, cols, vals)
     except FileNotFoundError as e:
         print("Data file doesn't exist.")
         usage()
@@ -74,56 +106,58 @@ if __name__ == '__main__':
     # filename of output
     outputFilename = args[4]
 
+    # process pool for F and E on large sheets, only started when first needed
+    scanner = ShardedScanner(workers) if workers > 1 else None
+
     # Parse the commands in command file
     try:
         commandFile = open(commandFilename, 'r')
-        outputFile = open(outputFilename, 'w')
+        outputFile = openOutput(outputFilename)
 
-        # for each command
-        for line in commandFile:
-            commandValues = line.split()
-            command = commandValues[0]
-            command = command.upper()
+        # for each run of commands, grouped so compatible ones execute as one bulk operation
+        for command, batch in planCommands(commandFile):
             # append row
             if command == 'AR':
-                result = spreadsheet.appendRow()
-                if result:
-                    outputFile.write("Call to appendRow() returned success.\n")
-                else:
-                    outputFile.write("Call to appendRow() returned failture.\n")
+                result = spreadsheet.appendRows(len(batch))
+                for _ in batch:
+                    if result:
+                        outputFile.write("Call to appendRow() returned success.\n")
+                    else:
+                        outputFile.write("Call to appendRow() returned failture.\n")
             # append column
             elif command == 'AC':
-                result = spreadsheet.appendCol()
-                if result:
-                    outputFile.write("Call to appendCol() returned success.\n")
-                else:
-                    outputFile.write("Call to appendCol() returned failture.\n")
+                result = spreadsheet.appendCols(len(batch))
+                for _ in batch:
+                    if result:
+                        outputFile.write("Call to appendCol() returned success.\n")
+                    else:
+                        outputFile.write("Call to appendCol() returned failture.\n")
             # insert row
             elif command == 'IR':
-                rowIndex = int(commandValues[1])
-                result = spreadsheet.insertRow(rowIndex);
-                if result:
-                    outputFile.write("Call to insertRow(" + str(rowIndex) + ") returned success.\n")
-                else:
-                    outputFile.write("Call to insertRow(" + str(rowIndex) + ") returned failure.\n")
+                rowIndex = batch[0][0]
+                result = spreadsheet.insertRows(rowIndex, len(batch))
+                for _ in batch:
+                    if result:
+                        outputFile.write("Call to insertRow(" + str(rowIndex) + ") returned success.\n")
+                    else:
+                        outputFile.write("Call to insertRow(" + str(rowIndex) + ") returned failure.\n")
             # insert column
             elif command == 'IC':
-                colIndex = int(commandValues[1])
-                result = spreadsheet.insertCol(colIndex);
-                if result:
-                    outputFile.write("Call to insertCol(" + str(colIndex) + ") returned success.\n")
-                else:
-                    outputFile.write("Call to insertCol(" + str(colIndex) + ") returned failure.\n")
+                colIndex = batch[0][0]
+                result = spreadsheet.insertCols(colIndex, len(batch))
+                for _ in batch:
+                    if result:
+                        outputFile.write("Call to insertCol(" + str(colIndex) + ") returned success.\n")
+                    else:
+                        outputFile.write("Call to insertCol(" + str(colIndex) + ") returned failure.\n")
             # update value
             elif command == 'U':
-                rowIndex = int(commandValues[1])
-                colIndex = int(commandValues[2])
-                value = float(commandValues[3])
-                result = spreadsheet.update(rowIndex, colIndex, value);
-                if result:
-                    outputFile.write("Call to update(" + str(rowIndex) + "," + str(colIndex) + "," + str(value) + ") returned success.\n")
-                else:
-                    outputFile.write("Call to update(" + str(rowIndex) + "," + str(colIndex) + "," + str(value) + ") returned failure.\n")
+                results = spreadsheet.updateMany(batch)
+                for (rowIndex, colIndex, value), result in zip(batch, results):
+                    if result:
+                        outputFile.write("Call to update(" + str(rowIndex) + "," + str(colIndex) + "," + str(value) + ") returned success.\n")
+                    else:
+                        outputFile.write("Call to update(" + str(rowIndex) + "," + str(colIndex) + "," + str(value) + ") returned failure.\n")
             # number of rows
             elif command == 'R':
                 result = spreadsheet.rowNum();
@@ -134,23 +168,39 @@ if __name__ == '__main__':
                 outputFile.write("Number of columns = " + str(result) + "\n")
             # find value
             elif command == 'F':
-                value = float(commandValues[1])
-                lCells = spreadsheet.find(value);
-                outputFile.write("Printing output of find(" + str(value) + "): ")
-                outputFile.write(" | ".join(["".join(["(", str(cell[0]), ",", str(cell[1]), ")"]) for cell in lCells]))
-                outputFile.write("\n")
+                value = batch[0][0]
+                if scanner is not None:
+                    lCells = scanner.find(spreadsheet, value)
+                else:
+                    lCells = spreadsheet.find(value);
+                writeFind(outputFile, value, lCells)
+            # find values in [lo, hi]
+            elif command == 'FR':
+                lo, hi = batch[0]
+                # ordered value index, kept from the first range query on
+                if spreadsheet.sortedIndex is None:
+                    spreadsheet.enableSortedIndex()
+                writeFindRange(outputFile, lo, hi, spreadsheet.findRange(lo, hi))
+            # find values greater than value
+            elif command == 'FG':
+                value = batch[0][0]
+                if spreadsheet.sortedIndex is None:
+                    spreadsheet.enableSortedIndex()
+                writeFindGreater(outputFile, value, spreadsheet.findGreater(value))
             # enumerate all entries that has a value in spreadsheet
             elif command == 'E':
-                lCells = spreadsheet.entries();
-                outputFile.write("Printing output of entries(): ")
-                outputFile.write(" | ".join([cell.__str__() for cell in lCells]))
-                outputFile.write("\n")
+                writeEntries(outputFile, spreadsheet, scanner)
             else:
                 print('Unknown command.')
-                print(line)
+                print(batch[0][0])
 
         outputFile.close()
         commandFile.close()
+        if scanner is not None:
+            scanner.close()
+
+        if stats:
+            spreadsheet.dumpStats(sys.stderr)
     except FileNotFoundError as e:
         print("Command file doesn't exist.")
         usage()
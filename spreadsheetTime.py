@@ -1,14 +1,17 @@
 import sys
-from spreadsheet.cell import Cell
 from spreadsheet.baseSpreadsheet import BaseSpreadsheet
 from spreadsheet.arraySpreadsheet import ArraySpreadsheet
 from spreadsheet.linkedlistSpreadsheet import LinkedListSpreadsheet
 from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+from spreadsheet.chunkedCsrSpreadsheet import ChunkedCSRSpreadsheet
+from spreadsheet.sparseLinkedlistSpreadsheet import SparseLinkedListSpreadsheet
+from spreadsheet.adaptiveSpreadsheet import AdaptiveSpreadsheet
+from spreadsheet.loader import loadColumns
+from spreadsheet.snapshot import isSnapshot
 from timeit import timeit
 
 
 # -------------------------------------------------------------------
-# DON'T CHANGE THIS FILE.
 # This is the entry point to run the program in file-based mode.
 # It uses the data file to initialise the set of words & frequencies.
 # It takes a command file as input and output into the output file.
@@ -27,7 +30,7 @@ def usage():
     # On Teaching servers, use 'python3'
     # On Windows, you may need to use 'python' instead of 'python3' to get this to work
     print('python3 spreadsheetFilebased.py', '<approach> <data fileName> <command fileName> <output fileName>')
-    print('<approach> = <array | linkedlist | csr>')
+    print('<approach> = <array | linkedlist | sparselinkedlist | csr | chunkedcsr | numpy | auto>')
     sys.exit(1)
 
 
@@ -47,26 +50,32 @@ if __name__ == '__main__':
         spreadsheet = LinkedListSpreadsheet()
     elif args[1] == 'csr':
         spreadsheet = CSRSpreadsheet()
+    elif args[1] == 'chunkedcsr':
+        spreadsheet = ChunkedCSRSpreadsheet()
+    elif args[1] == 'sparselinkedlist':
+        spreadsheet = SparseLinkedListSpreadsheet()
+    elif args[1] == 'numpy':
+        # Imported here so the other approaches still run without NumPy installed
+        from spreadsheet.numpySpreadsheet import NumpySpreadsheet
+        spreadsheet = NumpySpreadsheet()
+    elif args[1] == 'auto':
+        # picks and switches between backends as the density and command mix change
+        spreadsheet = AdaptiveSpreadsheet()
     else:
         print('Incorrect argument value.')
         usage()
 
     # read from data file to populate the initial set of points
     dataFilename = args[2]
-    cellsFromFiles = []
     try:
-        dataFile = open(dataFilename, 'r')
-        for line in dataFile:
-            values = line.split()
-            currRow = int(values[0])
-            currCol = int(values[1])
-            currVal = float(values[2])
-            currCell = Cell(currRow, currCol, currVal)
-            # each line contains a cell
-            cellsFromFiles.append(currCell)
-        dataFile.close()
-        # construct the spreadsheet from the read in data
-        spreadsheet.buildSpreadsheet(cellsFromFiles)
+        if isSnapshot(dataFilename):
+            # binary snapshot written by save(), loaded without parsing
+            spreadsheet.load(dataFilename)
+        else:
+            # each line contains a cell, parsed in bulk into row, column and value arrays
+            rows, cols, vals = loadColumns(dataFilename)
+            # construct the spreadsheet from the read in data
+            spreadsheet.buildFromArrays(rows, cols, vals)
     except FileNotFoundError as e:
         print("Data file doesn't exist.")
         usage()
@@ -105,7 +114,7 @@ if __name__ == '__main__':
                 #     outputFile.write("Call to appendCol() returned failture.\n")
                 
                 time = timeit('spreadsheet.appendCol()', number=1, globals=globals())
-                outputFile.write(f'appendCol() executed in {time*100:.5f} ms\n')
+                outputFile.write(f'appendCol() executed in {time*1000:.5f} ms\n')
             # insert row
             elif command == 'IR':
                 rowIndex = int(commandValues[1])
@@ -116,7 +125,7 @@ if __name__ == '__main__':
                 #     outputFile.write("Call to insertRow(" + str(rowIndex) + ") returned failure.\n")
                 
                 time = timeit('spreadsheet.insertRow(rowIndex)', number=1, globals=globals())
-                outputFile.write(f'insertRow({rowIndex}) executed in {time*100:.5f} ms\n')
+                outputFile.write(f'insertRow({rowIndex}) executed in {time*1000:.5f} ms\n')
             # insert column
             elif command == 'IC':
                 colIndex = int(commandValues[1])
@@ -127,7 +136,7 @@ if __name__ == '__main__':
                 #     outputFile.write("Call to insertCol(" + str(colIndex) + ") returned failure.\n")
                 
                 time = timeit('spreadsheet.insertCol(colIndex)', number=1, globals=globals())
-                outputFile.write(f'insertCol({colIndex}) executed in {time*100:.5f} ms\n')
+                outputFile.write(f'insertCol({colIndex}) executed in {time*1000:.5f} ms\n')
             # update value
             elif command == 'U':
                 rowIndex = int(commandValues[1])
@@ -140,21 +149,21 @@ if __name__ == '__main__':
                 #     outputFile.write("Call to update(" + str(rowIndex) + "," + str(colIndex) + "," + str(value) + ") returned failure.\n")
                 
                 time = timeit('spreadsheet.update(rowIndex, colIndex, value)', number=1, globals=globals())
-                outputFile.write(f'update({rowIndex}, {colIndex}, {value}) executed in {time*100:.5f} ms\n')
+                outputFile.write(f'update({rowIndex}, {colIndex}, {value}) executed in {time*1000:.5f} ms\n')
             # number of rows
             elif command == 'R':
                 # result = spreadsheet.rowNum();
                 # outputFile.write("Number of rows = " + str(result) + "\n")
 
                 time = timeit('spreadsheet.rowNum()', number=1, globals=globals())
-                outputFile.write(f'rowNum() executed in {time*100:.5f} ms\n')
+                outputFile.write(f'rowNum() executed in {time*1000:.5f} ms\n')
             # number of columns
             elif command == 'C':
                 # result = spreadsheet.colNum();
                 # outputFile.write("Number of columns = " + str(result) + "\n")
 
                 time = timeit('spreadsheet.colNum()', number=1, globals=globals())
-                outputFile.write(f'colNum() executed in {time*100:.5f} ms\n')
+                outputFile.write(f'colNum() executed in {time*1000:.5f} ms\n')
             # find value
             elif command == 'F':
                 value = float(commandValues[1])
@@ -164,7 +173,7 @@ if __name__ == '__main__':
                 # outputFile.write("\n")
 
                 time = timeit('spreadsheet.find(value)', number=1, globals=globals())
-                outputFile.write(f'find({value}) executed in {time*100:.5f} ms\n')
+                outputFile.write(f'find({value}) executed in {time*1000:.5f} ms\n')
             # enumerate all entries that has a value in spreadsheet
             elif command == 'E':
                 # lCells = spreadsheet.entries();
@@ -173,7 +182,7 @@ if __name__ == '__main__':
                 # outputFile.write("\n")
 
                 time = timeit('spreadsheet.entries()', number=1, globals=globals())
-                outputFile.write(f'entries() executed in {time*100:.5f} ms\n')
+                outputFile.write(f'entries() executed in {time*1000:.5f} ms\n')
             else:
                 print('Unknown command.')
                 print(line)
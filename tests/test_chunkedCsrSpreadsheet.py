@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+import spreadsheet.chunkedCsrSpreadsheet as chunkedCsrSpreadsheet
+from spreadsheet.cell import Cell
+from spreadsheet.chunkedCsrSpreadsheet import ChunkedCSRSpreadsheet
+
+
+@pytest.fixture(autouse=True)
+def smallBlocks(monkeypatch):
+    # Small enough that a handful of inserts crosses block boundaries and splits blocks
+    monkeypatch.setattr(chunkedCsrSpreadsheet, 'BLOCK_ROWS', 2)
+    monkeypatch.setattr(chunkedCsrSpreadsheet, 'MAX_BLOCK_ENTRIES', 3)
+
+
+def cells(sheet) -> [(int, int, float)]:
+    return [(cell.row, cell.col, cell.val) for cell in sheet.entries()]
+
+
+def shifted(reference: dict, row: int = None, col: int = None) -> dict:
+    """
+    @return reference with a row inserted after row, or a column inserted after col.
+    """
+
+    return {(r + (row is not None and r > row), c + (col is not None and c > col)): val for (r, c), val in reference.items()}
+
+
+def check(sheet, reference: dict, rows: int, cols: int) -> None:
+    assert (sheet.rowNum(), sheet.colNum()) == (rows, cols)
+    assert cells(sheet) == sorted((row, col, val) for (row, col), val in reference.items())
+    for value in set(reference.values()):
+        assert sorted(sheet.find(value)) == sorted(position for position, val in reference.items() if val == value)
+    for row in range(rows):
+        assert sheet.rowSum(row) == pytest.approx(sum(val for (r, c), val in reference.items() if r == row))
+
+    assert sum(block.numRows for block in sheet.blocks) == rows
+    assert all(block.numRows <= 2 * chunkedCsrSpreadsheet.BLOCK_ROWS for block in sheet.blocks)
+
+
+def testBuildCutsBlocks():
+    lCells = [Cell(row, col, float(row * 10 + col)) for row in range(7) for col in range(row % 3)] + [Cell(6, 4, 1.0)]
+    sheet = ChunkedCSRSpreadsheet()
+    sheet.buildSpreadsheet(lCells)
+
+    assert len(sheet.blocks) > 1
+    check(sheet, {(cell.row, cell.col): cell.val for cell in lCells}, 7, 5)
+
+
+def testInsertsAcrossBlockBoundaries():
+    sheet = ChunkedCSRSpreadsheet()
+    sheet.buildSpreadsheet([Cell(row, 0, float(row)) for row in range(6)] + [Cell(5, 3, 9.0)])
+    reference = {(row, 0): float(row) for row in range(6)}
+    reference[(5, 3)] = 9.0
+    rows, cols = 6, 4
+
+    # Rows at every block boundary, the start and the end
+    for rowIndex in [1, 3, -1, rows - 1, 4, 4, 4]:
+        assert sheet.insertRow(rowIndex)
+        reference = shifted(reference, row=rowIndex)
+        rows += 1
+    assert sheet.insertCol(0)
+    reference = shifted(reference, col=0)
+    cols += 1
+
+    # Filling one row past MAX_BLOCK_ENTRIES leaves it in a block of its own
+    for col in range(cols):
+        sheet.update(5, col, 7.0)
+        reference[(5, col)] = 7.0
+    assert any(block.numRows == 1 and len(block.valA) == cols for block in sheet.blocks)
+    for row in range(rows):
+        sheet.update(row, row % cols, 7.0)
+        reference[(row, row % cols)] = 7.0
+
+    check(sheet, reference, rows, cols)
+
+
+def testRandomInsertsAndUpdates():
+    generator = random.Random(2123)
+    sheet = ChunkedCSRSpreadsheet()
+    sheet.buildSpreadsheet([Cell(3, 3, 1.0)])
+    reference = {(3, 3): 1.0}
+    rows, cols = 4, 4
+
+    for step in range(500):
+        action = generator.random()
+        if action < 0.7:
+            row = generator.randrange(rows)
+            col = generator.randrange(cols)
+            val = float(generator.randrange(6))
+            assert sheet.update(row, col, val)
+            reference[(row, col)] = val
+        elif action < 0.85:
+            rowIndex = generator.randrange(-1, rows)
+            assert sheet.insertRow(rowIndex)
+            reference = shifted(reference, row=rowIndex)
+            rows += 1
+        elif action < 0.9:
+            colIndex = generator.randrange(-1, cols)
+            assert sheet.insertCol(colIndex)
+            reference = shifted(reference, col=colIndex)
+            cols += 1
+        elif action < 0.95:
+            assert sheet.appendRow()
+            rows += 1
+        else:
+            value = float(generator.randrange(6))
+            assert sorted(sheet.find(value)) == sorted(position for position, val in reference.items() if val == value)
+
+    check(sheet, reference, rows, cols)
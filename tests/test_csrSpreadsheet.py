@@ -0,0 +1,218 @@
+import random
+
+import pytest
+
+import spreadsheet.csrSpreadsheet as csrSpreadsheet
+from spreadsheet.cell import Cell
+from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+
+
+class Model:
+    """
+    Plain dict of cells to check the CSR arrays against.  insertRow() inserts after rowIndex, like CSRSpreadsheet.
+    """
+
+    def __init__(self, rows: int, cols: int):
+        self.rows = rows
+        self.cols = cols
+        self.cells = {}
+
+
+    def update(self, row: int, col: int, val: float) -> None:
+        self.cells[(row, col)] = val
+
+
+    def insertRow(self, rowIndex: int) -> None:
+        self.rows += 1
+        self.cells = {(row + (row > rowIndex), col): val for (row, col), val in self.cells.items()}
+
+
+    def entries(self) -> [(int, int, float)]:
+        return sorted((row, col, val) for (row, col), val in self.cells.items())
+
+
+    def find(self, value: float) -> [(int, int)]:
+        return sorted(position for position, val in self.cells.items() if val == value)
+
+
+    def rowSum(self, row: int) -> float:
+        return sum(val for (r, col), val in self.cells.items() if r == row)
+
+
+def cells(sheet) -> [(int, int, float)]:
+    return [(cell.row, cell.col, cell.val) for cell in sheet.entries()]
+
+
+def check(sheet, model) -> None:
+    assert sheet.rowNum() == model.rows
+    assert cells(sheet) == model.entries()
+    for row in range(model.rows):
+        assert sheet.rowSum(row) == pytest.approx(model.rowSum(row))
+    assert sheet.rowRangeSum(0, model.rows) == pytest.approx(sum(model.cells.values()))
+
+
+def makeSheet(rows: int = 6, cols: int = 5) -> (CSRSpreadsheet, Model):
+    sheet = CSRSpreadsheet()
+    model = Model(rows, cols)
+    # The corner cell sizes the sheet
+    lCells = [Cell(row, (row * 3) % cols, float(row)) for row in range(rows)] + [Cell(rows - 1, cols - 1, 0.5)]
+    sheet.buildSpreadsheet(lCells)
+    for cell in lCells:
+        model.update(cell.row, cell.col, cell.val)
+
+    return sheet, model
+
+
+def testRowShiftsAreCaughtUpByReaders():
+    sheet, model = makeSheet()
+
+    # New cells in several rows leave the later row pointers pending
+    for row, col, val in [(5, 0, 7.0), (0, 4, 7.0), (2, 2, 8.0), (2, 1, 9.0), (0, 0, 7.0)]:
+        assert sheet.update(row, col, val)
+        model.update(row, col, val)
+    assert sheet.pendingRows
+
+    assert sorted(sheet.find(7.0)) == model.find(7.0)
+    assert not sheet.pendingRows and sheet.rowShift is None
+    check(sheet, model)
+
+
+@pytest.mark.parametrize('where', ['start', 'middle', 'end'])
+def testInsertRowWithPendingShifts(where):
+    sheet, model = makeSheet()
+
+    for step in range(4):
+        sheet.update(step, step, 10.0 + step)
+        model.update(step, step, 10.0 + step)
+        rowIndex = {'start': -1, 'middle': model.rows // 2, 'end': model.rows - 1}[where]
+
+        assert sheet.insertRow(rowIndex)
+        model.insertRow(rowIndex)
+
+        # Updates after the insert bisect rows through the pending shifts again
+        sheet.update(rowIndex + 1, 1, 20.0 + step)
+        model.update(rowIndex + 1, 1, 20.0 + step)
+        sheet.update(model.rows - 1, 4, 30.0)
+        model.update(model.rows - 1, 4, 30.0)
+
+    assert sorted(sheet.find(30.0)) == model.find(30.0)
+    check(sheet, model)
+
+
+def testSaveAndLoadWithPendingShifts(tmp_path):
+    path = str(tmp_path / 'sheet.snap')
+    sheet, model = makeSheet()
+
+    sheet.update(1, 3, 4.5)
+    model.update(1, 3, 4.5)
+    sheet.insertRow(0)
+    model.insertRow(0)
+    sheet.update(4, 0, 5.5)
+    model.update(4, 0, 5.5)
+    assert sheet.pendingRows
+
+    sheet.save(path)
+    loaded = CSRSpreadsheet()
+    loaded.load(path)
+    check(loaded, model)
+
+    # The loaded views take row shifts like any other arrays
+    loaded.update(0, 1, 6.5)
+    model.update(0, 1, 6.5)
+    loaded.insertRow(loaded.rowNum() - 1)
+    model.insertRow(model.rows - 1)
+    loaded.update(model.rows - 1, 2, 6.5)
+    model.update(model.rows - 1, 2, 6.5)
+    assert sorted(loaded.find(6.5)) == model.find(6.5)
+    check(loaded, model)
+
+
+def testRandomInterleaving(tmp_path):
+    path = str(tmp_path / 'sheet.snap')
+    generator = random.Random(2123)
+    sheet, model = makeSheet(8, 6)
+
+    for step in range(600):
+        action = generator.random()
+        if action < 0.6:
+            row = generator.randrange(model.rows)
+            col = generator.randrange(model.cols)
+            val = float(generator.randrange(10))
+            assert sheet.update(row, col, val)
+            model.update(row, col, val)
+        elif action < 0.75:
+            rowIndex = generator.choice([-1, model.rows // 2, model.rows - 1])
+            assert sheet.insertRow(rowIndex)
+            model.insertRow(rowIndex)
+        elif action < 0.85:
+            value = float(generator.randrange(10))
+            assert sorted(sheet.find(value)) == model.find(value)
+        elif action < 0.95:
+            row = generator.randrange(model.rows)
+            assert sheet.rowSum(row) == pytest.approx(model.rowSum(row))
+        elif action < 0.98:
+            assert cells(sheet) == model.entries()
+        else:
+            sheet.save(path)
+            sheet = CSRSpreadsheet()
+            sheet.load(path)
+
+    check(sheet, model)
+
+
+def shiftColumns(reference: dict, colIndex: int) -> dict:
+    """
+    @return reference with a column inserted after colIndex.
+    """
+
+    return {(row, col + (col > colIndex)): val for (row, col), val in reference.items()}
+
+
+def checkColumns(sheet, reference: dict) -> None:
+    colPtr, rowIdx, vals = sheet.cscArrays()
+    assert len(colPtr) == sheet.colNum() + 1
+
+    for col in range(sheet.colNum()):
+        column = sorted((row, val) for (row, c), val in reference.items() if c == col)
+        assert list(zip(rowIdx[colPtr[col]:colPtr[col + 1]], vals[colPtr[col]:colPtr[col + 1]])) == column
+        assert [(cell.row, cell.val) for cell in sheet.colEntries(col)] == column
+        assert sheet.colSum(col) == pytest.approx(sum(val for row, val in column))
+        for value in {val for row, val in column}:
+            assert sheet.findInCol(col, value) == [(row, col) for row, val in column if val == value]
+
+
+@pytest.mark.parametrize('aggregates', [False, True])
+def testColumnScansAfterChanges(aggregates):
+    sheet, model = makeSheet(8, 6)
+    reference = model.cells
+    if aggregates:
+        sheet.enableAggregates()
+    checkColumns(sheet, reference)
+
+    # Each change lands while a CSC mirror from the previous check is cached
+    for colIndex in [-1, 2]:
+        sheet.insertCol(colIndex)
+        reference = shiftColumns(reference, colIndex)
+    checkColumns(sheet, reference)
+
+    # A small batch goes through update() cell by cell
+    updates = [(0, 0, 3.0), (1, 2, 4.0), (7, 7, 5.0), (1, 2, 6.0)]
+    sheet.updateMany(updates)
+    reference.update({(row, col): val for row, col, val in updates})
+    checkColumns(sheet, reference)
+
+    # A batch of new cells past MERGE_MIN_INSERTS is merged in one pass
+    sheet.insertCol(7)
+    reference = shiftColumns(reference, 7)
+    checkColumns(sheet, reference)
+    updates = [(row, col, float(row + col)) for row in range(8) for col in range(0, 9, 2)]
+    assert len(updates) >= csrSpreadsheet.MERGE_MIN_INSERTS
+    sheet.updateMany(updates)
+    reference.update({(row, col): val for row, col, val in updates})
+    checkColumns(sheet, reference)
+
+    sheet.insertRow(3)
+    reference = {(row + (row > 3), col): val for (row, col), val in reference.items()}
+    sheet.update(4, 8, 1.5)
+    reference[(4, 8)] = 1.5
+    checkColumns(sheet, reference)
@@ -0,0 +1,203 @@
+import pytest
+
+import spreadsheet.adaptiveSpreadsheet as adaptiveSpreadsheet
+import spreadsheet.formula as formula
+from spreadsheet.adaptiveSpreadsheet import AdaptiveSpreadsheet
+from spreadsheet.arraySpreadsheet import ArraySpreadsheet
+from spreadsheet.cell import Cell
+from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+from spreadsheet.formula import FormulaError, FormulaGraph, FormulaSpreadsheet, parseFormula
+from spreadsheet.linkedlistSpreadsheet import LinkedListSpreadsheet
+
+
+# Backend class, and the index to pass insertRow() so the new row lands at index 2
+BACKENDS = [(ArraySpreadsheet, 2), (CSRSpreadsheet, 1), (LinkedListSpreadsheet, 1)]
+
+
+def makeSheet(backend, rows: int = 6, cols: int = 6) -> FormulaSpreadsheet:
+    sheet = FormulaSpreadsheet(backend())
+    sheet.buildSpreadsheet([Cell(rows - 1, cols - 1, 0.0)])
+    return sheet
+
+
+def value(sheet, row: int, col: int) -> float:
+    cells = sheet.getRange(row, col, row + 1, col + 1)
+    return cells[0].val if cells else None
+
+
+# ----- parsing -----
+
+def testParseAndPrint():
+    assert parseFormula('=sum(a1:b10)*2+-C3/(D4-1)').text() == '=SUM(A1:B10) * 2 + -C3 / (D4 - 1)'
+    assert parseFormula('1-(2-3)').text() == '=1 - (2 - 3)'
+    assert parseFormula('=(1-2)-3').text() == '=1 - 2 - 3'
+    assert parseFormula('=AA1').tree == ('ref', 0, 26)
+
+
+@pytest.mark.parametrize('text', ['=1+', '=FOO(1)', '=A1:B2', '=(1', '=1 2', '=A0'])
+def testParseRejects(text):
+    with pytest.raises(FormulaError):
+        parseFormula(text)
+
+
+# ----- dependency graph -----
+
+def testDownstreamIsTopological():
+    graph = FormulaGraph()
+    assert graph.set((0, 2), parseFormula('=B1 + A1'))
+    assert graph.set((0, 1), parseFormula('=A1 * 2'))
+    assert graph.set((3, 3), parseFormula('=SUM(A1:C1)'))
+    assert graph.set((5, 5), parseFormula('=E5'))
+
+    order = graph.downstream([(0, 0)])
+    assert set(order) == {(0, 1), (0, 2), (3, 3)}
+    assert order.index((0, 1)) < order.index((0, 2)) < order.index((3, 3))
+
+
+def testReadersAcrossTiles(monkeypatch):
+    monkeypatch.setattr(formula, 'TILE_SIZE', 2)
+
+    graph = FormulaGraph()
+    graph.set((9, 9), parseFormula('=SUM(B2:E7)'))
+    graph.set((8, 8), parseFormula('=C3'))
+
+    assert graph.readers((2, 2)) == {(9, 9), (8, 8)}
+    assert graph.readers((6, 4)) == {(9, 9)}
+    assert graph.readers((7, 4)) == set()
+    assert sorted(graph.within((0, 0, 10, 10))) == [(8, 8), (9, 9)]
+    assert graph.within((0, 0, 9, 9)) == [(8, 8)]
+
+    graph.remove((9, 9))
+    assert graph.readers((6, 4)) == set()
+    assert graph.rangeReaders == {}
+
+
+def testRepeatedReferenceRemoves():
+    graph = FormulaGraph()
+    graph.set((1, 1), parseFormula('=A1 + A1 + SUM(A1:A2) + SUM(A1:A2)'))
+    graph.remove((1, 1))
+
+    assert graph.cellReaders == {} and graph.rangeReaders == {} and graph.formulaTiles == {}
+
+
+# ----- cycles -----
+
+@pytest.mark.parametrize('backend, after', BACKENDS)
+def testCyclesAreRefused(backend, after):
+    sheet = makeSheet(backend)
+    assert sheet.setFormula(0, 1, '=A1 + 1')
+    assert sheet.setFormula(0, 2, '=B1 * 2')
+
+    assert not sheet.setFormula(0, 0, '=A1')
+    assert not sheet.setFormula(0, 0, '=C1')
+    assert not sheet.setFormula(0, 0, '=SUM(A1:F6)')
+    # A refused formula leaves the previous one in place
+    assert not sheet.setFormula(0, 1, '=C1')
+    assert sheet.getFormula(0, 1) == '=A1 + 1'
+
+
+# ----- recalculation -----
+
+@pytest.mark.parametrize('backend, after', BACKENDS)
+def testRecalculatesOnlyDownstream(backend, after):
+    sheet = makeSheet(backend)
+    sheet.update(0, 0, 2.0)
+    sheet.setFormula(0, 1, '=A1 * 10')
+    sheet.setFormula(1, 1, '=SUM(A1:B1)')
+    sheet.setFormula(4, 4, '=D4 + 1')
+    assert value(sheet, 1, 1) == 22.0
+
+    written = []
+    inner = sheet.spreadsheet
+    update = inner.update
+    inner.update = lambda row, col, val: written.append((row, col)) or update(row, col, val)
+
+    sheet.update(0, 0, 3.0)
+    # Some backends apply the plain update itself through update() too
+    assert [position for position in written if position != (0, 0)] == [(0, 1), (1, 1)]
+    assert value(sheet, 0, 1) == 30.0 and value(sheet, 1, 1) == 33.0
+    assert value(sheet, 4, 4) == 1.0
+
+
+@pytest.mark.parametrize('backend, after', BACKENDS)
+def testPlainUpdateReplacesFormula(backend, after):
+    sheet = makeSheet(backend)
+    sheet.setFormula(0, 1, '=A1 + 1')
+    sheet.setFormula(0, 2, '=B1 + 1')
+
+    sheet.update(0, 1, 10.0)
+    assert sheet.getFormula(0, 1) is None
+    assert value(sheet, 0, 2) == 11.0
+
+    sheet.update(0, 0, 5.0)
+    assert value(sheet, 0, 1) == 10.0
+
+
+@pytest.mark.parametrize('backend, after', BACKENDS)
+def testInsertsRewriteReferences(backend, after):
+    sheet = makeSheet(backend)
+    sheet.update(1, 1, 4.0)
+    sheet.update(3, 1, 5.0)
+    sheet.setFormula(0, 0, '=SUM(B2:B4) + B2')
+
+    # New row lands at index 2, inside the range, and a new first column
+    sheet.insertRow(after)
+    sheet.insertCol(after - 2)
+
+    assert sheet.getFormula(0, 1) == '=SUM(C2:C5) + C2'
+    sheet.update(4, 2, 6.0)
+    assert value(sheet, 0, 1) == 4.0 + 6.0 + 4.0
+
+
+# ----- errors -----
+
+@pytest.mark.parametrize('backend, after', BACKENDS)
+def testErrorsPropagate(backend, after):
+    sheet = makeSheet(backend)
+    sheet.update(0, 0, 6.0)
+    sheet.setFormula(0, 1, '=A1 / A2')
+    sheet.setFormula(0, 2, '=B1 + 1')
+    sheet.setFormula(0, 3, '=SUM(A1:C1)')
+
+    assert sheet.errors[(0, 1)] == 'division by zero'
+    assert (0, 2) in sheet.errors and (0, 3) in sheet.errors
+
+    sheet.update(1, 0, 2.0)
+    assert sheet.errors == {}
+    assert value(sheet, 0, 1) == 3.0 and value(sheet, 0, 2) == 4.0 and value(sheet, 0, 3) == 13.0
+
+
+def testAverageOfEmptyRange():
+    sheet = makeSheet(ArraySpreadsheet)
+    sheet.setFormula(0, 0, '=AVERAGE(B1:B3)')
+    assert sheet.errors[(0, 0)] == 'AVERAGE of an empty range'
+
+    sheet.update(1, 1, 4.0)
+    assert (0, 0) not in sheet.errors and value(sheet, 0, 0) == 4.0
+
+
+# ----- rebuilds -----
+
+def testFormulasSurviveMigration(monkeypatch):
+    monkeypatch.setattr(adaptiveSpreadsheet, 'MIN_WINDOW', 7)
+    monkeypatch.setattr(adaptiveSpreadsheet, 'MIGRATION_FACTOR', 0)
+
+    backend = AdaptiveSpreadsheet()
+    sheet = FormulaSpreadsheet(backend)
+    sheet.buildSpreadsheet([Cell(0, 1, 2.0), Cell(1, 2, 3.0), Cell(299, 29, 1.0)])
+    sheet.setFormula(0, 0, '=SUM(B1:C3)')
+    for i in range(600):
+        sheet.update(10 + i % 200, i % 30, 1.0)
+
+    assert backend.migrations > 0
+    assert sheet.getFormula(0, 0) == '=SUM(B1:C3)'
+    sheet.update(1, 1, 10.0)
+    assert value(sheet, 0, 0) == 15.0
+
+
+def testBuildDropsFormulas():
+    sheet = makeSheet(CSRSpreadsheet)
+    sheet.setFormula(0, 0, '=1')
+    sheet.buildSpreadsheet([Cell(2, 2, 1.0)])
+
+    assert sheet.getFormula(0, 0) is None and sheet.graph.formulas == {}
@@ -0,0 +1,28 @@
+import pytest
+
+from spreadsheet.instrumentation import percentile, summarise
+
+
+@pytest.mark.parametrize('values, fraction, expected', [
+    (range(1, 11), 0.5, 5),
+    (range(1, 11), 0.9, 9),
+    (range(1, 11), 1.0, 10),
+    (range(1, 5), 0.5, 2),
+    (range(1, 101), 0.07, 7),
+    (range(1, 101), 0.95, 95),
+    (range(1, 101), 0.99, 99),
+    (range(1, 21), 0.95, 19),
+    ([7], 0.5, 7),
+    (range(1, 11), 0.0, 1),
+])
+def testNearestRank(values, fraction, expected):
+    assert percentile(list(values), fraction) == expected
+
+
+def testSummarise():
+    summary = summarise([4000, 1000, 3000, 2000])
+
+    assert summary['count'] == 4
+    assert summary['mean_us'] == 2.5
+    assert summary['median_us'] == 2.0
+    assert summary['p95_us'] == summary['p99_us'] == summary['max_us'] == 4.0
@@ -0,0 +1,43 @@
+from spreadsheet.cell import Cell
+from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+
+
+def cells(sheet) -> [(int, int, float)]:
+    return [(cell.row, cell.col, cell.val) for cell in sheet.entries()]
+
+
+def testSaveOverLoadedSnapshot(tmp_path):
+    path = str(tmp_path / 'sheet.snap')
+    original = CSRSpreadsheet()
+    original.buildSpreadsheet([Cell(row, (row * 7) % 50, row + 0.5) for row in range(2000)])
+    original.save(path)
+
+    # The loaded arrays are views over a mapping of path, which save() must not truncate under them
+    sheet = CSRSpreadsheet()
+    sheet.load(path)
+    assert sheet.mapped
+    sheet.save(path)
+    assert cells(sheet) == cells(original)
+
+    reloaded = CSRSpreadsheet()
+    reloaded.load(path)
+    assert cells(reloaded) == cells(original)
+    assert reloaded.rowRangeSum(0, reloaded.rowNum()) == original.rowRangeSum(0, original.rowNum())
+    assert [entry.name for entry in tmp_path.iterdir()] == ['sheet.snap']
+
+
+def testSaveOverLoadedSnapshotAfterChanges(tmp_path):
+    path = str(tmp_path / 'sheet.snap')
+    sheet = CSRSpreadsheet()
+    sheet.buildSpreadsheet([Cell(0, 0, 1.0), Cell(3, 2, 2.0)])
+    sheet.save(path)
+
+    sheet.load(path)
+    sheet.save(path)
+    sheet.update(1, 1, 5.0)
+    sheet.insertRow(0)
+    sheet.save(path)
+
+    reloaded = CSRSpreadsheet()
+    reloaded.load(path, mapped=False)
+    assert cells(reloaded) == [(0, 0, 1.0), (2, 1, 5.0), (4, 2, 2.0)]
@@ -0,0 +1,129 @@
+import random
+
+import pytest
+
+from spreadsheet.arraySpreadsheet import ArraySpreadsheet
+from spreadsheet.cell import Cell
+from spreadsheet.chunkedCsrSpreadsheet import ChunkedCSRSpreadsheet
+from spreadsheet.csrSpreadsheet import CSRSpreadsheet
+from spreadsheet.linkedlistSpreadsheet import LinkedListSpreadsheet
+from spreadsheet.numpySpreadsheet import NumpySpreadsheet
+from spreadsheet.sparseLinkedlistSpreadsheet import SparseLinkedListSpreadsheet
+from spreadsheet.valueIndex import ValueIndex
+
+
+# Backend class, and what to subtract from a position to get the insertRow()/insertCol() index that puts the
+# new line there: 0 for backends that insert before the index, 1 for those that insert after it
+BACKENDS = [(ArraySpreadsheet, 0), (NumpySpreadsheet, 0), (CSRSpreadsheet, 1), (ChunkedCSRSpreadsheet, 1),
+            (LinkedListSpreadsheet, 1), (SparseLinkedListSpreadsheet, 1)]
+
+CELLS = [Cell(1, 1, 5.0), Cell(2, 3, 5.0), Cell(3, 0, 7.0), Cell(4, 4, 5.0)]
+
+
+def makeSheets(backend) -> (object, object):
+    """
+    @return A sheet whose find() goes through a value index, and the same sheet without one, whose find() scans.
+    """
+
+    indexed = backend()
+    indexed.buildSpreadsheet(CELLS)
+    indexed.enableValueIndex()
+
+    scanned = backend()
+    scanned.buildSpreadsheet(CELLS)
+
+    return indexed, scanned
+
+
+def checkFind(indexed, scanned) -> None:
+    values = {cell.val for cell in scanned.entries()}
+    for value in values | {-1.0}:
+        assert sorted(indexed.find(value)) == sorted(scanned.find(value))
+
+
+@pytest.mark.parametrize('backend, offset', BACKENDS)
+def testFindAfterInserts(backend, offset):
+    indexed, scanned = makeSheets(backend)
+    checkFind(indexed, scanned)
+
+    # Before, between and after the indexed cells, and at the far edges
+    for position in [0, 2, 4, 6, 9, 0]:
+        for sheet in (indexed, scanned):
+            assert sheet.insertRow(min(position, sheet.rowNum()) - offset)
+            assert sheet.insertCol(min(position, sheet.colNum()) - offset)
+        checkFind(indexed, scanned)
+
+    # New cells in the inserted lines, and changed ones on either side of them
+    for row, col, val in [(0, 0, 5.0), (2, 2, 7.0), (3, 1, 5.0), (indexed.rowNum() - 1, indexed.colNum() - 1, 9.0)]:
+        for sheet in (indexed, scanned):
+            assert sheet.update(row, col, val)
+    checkFind(indexed, scanned)
+
+
+@pytest.mark.parametrize('backend, offset', BACKENDS)
+def testFindAfterRandomChanges(backend, offset):
+    generator = random.Random(2123)
+    indexed, scanned = makeSheets(backend)
+
+    for step in range(300):
+        action = generator.random()
+        if action < 0.6:
+            row = generator.randrange(scanned.rowNum())
+            col = generator.randrange(scanned.colNum())
+            val = float(generator.randrange(5))
+            assert indexed.update(row, col, val) and scanned.update(row, col, val)
+        elif action < 0.75:
+            position = generator.randrange(scanned.rowNum() + 1)
+            assert indexed.insertRow(position - offset) and scanned.insertRow(position - offset)
+        elif action < 0.9:
+            position = generator.randrange(scanned.colNum() + 1)
+            assert indexed.insertCol(position - offset) and scanned.insertCol(position - offset)
+        else:
+            checkFind(indexed, scanned)
+
+    checkFind(indexed, scanned)
+
+
+def testIdsStayAPermutation():
+    index = ValueIndex([Cell(1, 1, 5.0)])
+    index.insertRow(0)
+    index.insertRow(5)
+    index.update(7, 0, None, 6.0)
+    index.insertRow(7)
+    index.update(3, 0, None, 6.0)
+
+    assert sorted(index.rowIds) == list(range(len(index.rowIds)))
+    assert index.find(5.0) == [(2, 1)]
+    assert index.find(6.0) == [(3, 0), (8, 0)]
+
+
+class Listener:
+    needsCells = False
+
+    def __init__(self):
+        self.rebuilds = []
+
+    def rebuild(self, lCells):
+        self.rebuilds.append(lCells)
+
+
+@pytest.mark.parametrize('backend, offset', BACKENDS)
+def testBuildListsCellsOnlyForIndexesThatReadThem(backend, offset, monkeypatch):
+    sheet = backend()
+    listener = Listener()
+    sheet.addIndex(listener)
+
+    listed = []
+    entries = sheet.entries
+    monkeypatch.setattr(sheet, 'entries', lambda: listed.append(True) or entries())
+
+    sheet.buildSpreadsheet(CELLS)
+    assert listener.rebuilds == [None] and listed == []
+
+    # Two indexes that read the cells share one listing
+    sheet.enableValueIndex()
+    sheet.addIndex(ValueIndex())
+    listed.clear()
+    sheet.buildSpreadsheet(CELLS)
+    assert listed == [True]
+    assert sorted(sheet.find(5.0)) == [(1, 1), (2, 3), (4, 4)]